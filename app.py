@@ -1,23 +1,34 @@
 # ===== app.py =====
+#
+# Reruns are kept small:
+#   - the inputs live in a form: editing them does not rerun the script, only "Dự đoán" does
+#   - the diagnostics expander and the result view are fragments (their widgets rerun only themselves)
+#   - the plotly figures are memoized on the prediction result (st.cache_resource)
+#   - results are kept in a per-session history (st.session_state['history'])
+#   - every prediction is also logged to the shared store (utils.history, pages/2_Prediction_History.py)
 
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from utils.predictor import WeatherPredictor
-import json
+from utils.app_cache import load_predictor
 
-# Page config
-st.set_page_config(
-    page_title="Weather Prediction",
-    page_icon="🌤️",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+# Results kept per session
+HISTORY_SIZE = 20
 
-# Custom CSS
-st.markdown("""
+# Features shown one by one in the explanation waterfalls (the rest are summed)
+WATERFALL_FEATURES = 10
+
+# Weather icon mapping
+WEATHER_ICONS = {
+    'Clear': '☀️',
+    'Clouds': '☁️',
+    'Rain': '🌧️',
+    'Drizzle': '🌦️',
+    'Thunderstorm': '⛈️',
+    'Snow': '❄️',
+    'Mist': '🌫️'
+}
+
+CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -47,205 +58,353 @@ st.markdown("""
         border-left: 5px solid #1E88E5;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Initialize predictor
-@st.cache_resource
-def load_predictor():
-    return WeatherPredictor()
 
-try:
-    predictor = load_predictor()
-    provinces = predictor.get_provinces()
-    weather_classes = predictor.get_weather_classes()
-except Exception as e:
-    st.error(f"❌ Lỗi load models: {e}")
-    st.info("📥 Hãy đảm bảo file weather_models.zip đã được giải nén vào thư mục gốc!")
-    st.stop()
+def input_card_html(time_text, province, temperature, humidity):
+    return f"""
+    <div class="metric-card">
+        <strong>📅 Thời gian:</strong><br/>
+        {time_text}<br/><br/>
+        <strong>📍 Địa điểm:</strong><br/>
+        {province}<br/><br/>
+        <strong>🌡️ Nhiệt độ:</strong><br/>
+        {f"{temperature}°C" if temperature else "Tự động"}<br/><br/>
+        <strong>💧 Độ ẩm:</strong><br/>
+        {f"{humidity}%" if humidity else "Tự động"}
+    </div>
+    """
 
-# Header
-st.markdown('<div class="main-header">🌤️ Weather Prediction System</div>', unsafe_allow_html=True)
-st.markdown('<div class="sub-header">Dự đoán thời tiết sử dụng Big Data & Machine Learning</div>', unsafe_allow_html=True)
 
-# Sidebar
-with st.sidebar:
-    st.image("https://cdn-icons-png.flaticon.com/512/1163/1163661.png", width=100)
-    st.title("⚙️ Cấu hình")
+def prediction_html(weather_main, probability):
+    icon = WEATHER_ICONS.get(weather_main, '🌤️')
+    return f"""
+        <div class="prediction-box">
+            <div style="font-size: 5rem;">{icon}</div>
+            <h1 style="margin: 1rem 0;">{weather_main}</h1>
+            <h3>Độ tin cậy: {probability*100:.1f}%</h3>
+        </div>
+        """
+
+
+def top_3_html(weather, prob):
+    icon = WEATHER_ICONS.get(weather, '🌤️')
+    return f"""
+            <div style="text-align: center; padding: 1rem; background: #f5f5f5; border-radius: 10px;">
+                <div style="font-size: 3rem;">{icon}</div>
+                <h3>{weather}</h3>
+                <p style="font-size: 1.5rem; color: #1E88E5; font-weight: bold;">{prob*100:.1f}%</p>
+            </div>
+            """
+
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def probability_figure(top_3):
+    """
+    Bar chart of the top 3 classes, built once per distinct result
+    (a cached resource survives reruns and is shared read-only between
+    sessions: st.plotly_chart only serializes it)
     
-    st.markdown("---")
+    Args:
+        top_3: tuple of (weather, probability) pairs
+    """
+    # plotly is only imported once a chart is actually rendered
+    import plotly.graph_objects as go
     
-    # Input mode
-    input_mode = st.radio(
-        "Chế độ nhập liệu:",
-        ["Đơn giản (Time + Province)", "Chi tiết (Thêm nhiệt độ, độ ẩm)"],
-        index=0
-    )
-    
-    st.markdown("---")
+    # Create chart data
+    weathers = [w for w, _ in top_3]
+    percents = [p*100 for _, p in top_3]
     
-    # Model info
-    with st.expander("📊 Thông tin Models"):
-        st.write("**Classification:**")
-        st.write("- Model: Random Forest")
-        st.write("- Accuracy: 92.12%")
-        st.write("- F1-Score: 0.9195")
-        
-        st.write("\n**Regression:**")
-        st.write("- Model: GBT")
-        st.write("- RMSE: 0.64°C")
-        st.write("- R²: 0.9637")
+    fig = go.Figure(go.Bar(
+        x=weathers,
+        y=percents,
+        marker=dict(color=percents, colorscale='Blues', showscale=True)
+    ))
     
-    st.markdown("---")
-    st.markdown("**💡 Hướng dẫn:**")
-    st.markdown("""
-    1. Chọn thời gian
-    2. Chọn tỉnh/thành phố
-    3. (Tùy chọn) Nhập nhiệt độ/độ ẩm
-    4. Nhấn **Dự đoán**
-    """)
+    fig.update_layout(
+        title='Xác suất dự đoán (%)',
+        showlegend=False,
+        height=400,
+        xaxis_title="Loại thời tiết",
+        yaxis_title="Xác suất (%)"
+    )
+    return fig
 
-# Main content
-col1, col2 = st.columns([2, 1])
 
-with col1:
-    st.subheader("📝 Nhập thông tin dự đoán")
+@st.cache_resource(max_entries=256, show_spinner=False)
+def waterfall_figure(title, base_value, contributions, unit=''):
+    """
+    Waterfall from the model's average output to this prediction: the
+    WATERFALL_FEATURES largest TreeSHAP contributions, then the others summed
     
-    # Date & Time
-    col_date, col_time = st.columns(2)
+    Args:
+        title: Chart title
+        base_value: Average model output (TreeSHAP expected value)
+        contributions: tuple of (feature, contribution) pairs
+        unit: Suffix of the value labels
+    """
+    import plotly.graph_objects as go
     
-    with col_date:
-        selected_date = st.date_input(
-            "Ngày:",
-            value=datetime.now(),
-            min_value=datetime.now() - timedelta(days=365),
-            max_value=datetime.now() + timedelta(days=365)
-        )
+    ranked = sorted(contributions, key=lambda item: abs(item[1]), reverse=True)
+    shown = ranked[:WATERFALL_FEATURES]
+    rest = sum(value for _, value in ranked[WATERFALL_FEATURES:])
+    if len(ranked) > WATERFALL_FEATURES:
+        shown.append((f"{len(ranked) - WATERFALL_FEATURES} feature khác", rest))
+    total = base_value + sum(value for _, value in contributions)
     
-    with col_time:
-        selected_time = st.time_input(
-            "Giờ:",
-            value=datetime.now().time()
-        )
+    fig = go.Figure(go.Waterfall(
+        orientation='h',
+        measure=['absolute'] + ['relative'] * len(shown) + ['total'],
+        y=['Trung bình model'] + [name for name, _ in shown] + ['Dự đoán'],
+        x=[base_value] + [value for _, value in shown] + [total],
+        text=[f"{base_value:.3f}{unit}"] + [f"{value:+.3f}{unit}" for _, value in shown] + [f"{total:.3f}{unit}"],
+        textposition='outside',
+        increasing=dict(marker=dict(color='#e4572e')),
+        decreasing=dict(marker=dict(color='#1f77b4')),
+        totals=dict(marker=dict(color='#667eea'))
+    ))
     
-    # Combine datetime
-    selected_datetime = datetime.combine(selected_date, selected_time)
-    
-    # Province
-    selected_province = st.selectbox(
-        "Tỉnh/Thành phố:",
-        options=provinces,
-        index=0
+    fig.update_layout(
+        title=title,
+        showlegend=False,
+        height=120 + 30 * (len(shown) + 2),
+        yaxis=dict(autorange='reversed'),
+        margin=dict(l=10, r=10, t=50, b=10)
     )
+    return fig
+
+
+def render_explanation(explanation):
+    """Waterfalls of the TreeSHAP contributions (predictor.explain)"""
+    weather = explanation['weather']
+    st.plotly_chart(waterfall_figure(
+        f"Đóng góp của từng feature vào xác suất '{weather['class']}'",
+        weather['base_value'], tuple(weather['contributions'].items())
+    ), use_container_width=True)
     
-    # Optional inputs
-    if "Chi tiết" in input_mode:
-        st.markdown("---")
-        st.markdown("**🌡️ Thông tin chi tiết (Tùy chọn):**")
+    temperature = explanation.get('temperature')
+    if temperature is not None:
+        st.plotly_chart(waterfall_figure(
+            "Đóng góp của từng feature vào nhiệt độ dự đoán",
+            temperature['base_value'], tuple(temperature['contributions'].items()), unit='°C'
+        ), use_container_width=True)
+    st.caption("TreeSHAP (path-dependent): trung bình model + tổng đóng góp = giá trị dự đoán")
+
+
+@st.fragment
+def diagnostics_panel(predictor):
+    # Stage timings (the predictor is shared: this applies to every session)
+    with st.expander("🩺 Chẩn đoán hiệu năng"):
+        instrument = st.toggle("Đo thời gian từng bước", value=predictor.metrics is not None)
+        profile_percent = st.number_input(
+            "Lấy mẫu cProfile (% số lần gọi)", min_value=0.0, max_value=100.0,
+            value=predictor.profiler.rate * 100 if predictor.profiler else 0.0, step=1.0
+        )
         
-        col_temp, col_hum = st.columns(2)
+        if instrument:
+            profile_rate = profile_percent / 100
+            current_rate = predictor.profiler.rate if predictor.profiler else 0.0
+            if predictor.metrics is None or current_rate != profile_rate:
+                predictor.enable_instrumentation(profile_rate)
+        elif predictor.metrics is not None:
+            predictor.disable_instrumentation()
         
-        with col_temp:
-            input_temp = st.number_input(
-                "Nhiệt độ hiện tại (°C):",
-                min_value=-10.0,
-                max_value=50.0,
-                value=28.0,
-                step=0.5
+        if predictor.metrics is not None:
+            diagnostics = predictor.metrics.to_dict()
+            st.dataframe(
+                [{'Bước': stage, **{k: round(v, 3) if v is not None else None for k, v in values.items()}}
+                 for stage, values in diagnostics['stages'].items()],
+                hide_index=True
             )
-        
-        with col_hum:
-            input_humidity = st.number_input(
-                "Độ ẩm hiện tại (%):",
-                min_value=0.0,
-                max_value=100.0,
-                value=75.0,
-                step=1.0
+            st.write(diagnostics['counters'])
+            if predictor.profiler:
+                st.caption(f"📁 {predictor.profiler.captured} file .prof trong `{predictor.profiler.output_dir}/`")
+            st.download_button(
+                "⬇️ Prometheus metrics", predictor.metrics.to_prometheus(),
+                file_name="metrics.prom", mime="text/plain"
             )
-    else:
-        input_temp = None
-        input_humidity = None
+        
+        if predictor.drift_monitor is not None:
+            drift_panel(predictor.drift_monitor.report())
+
+
+def drift_panel(report):
+    st.markdown(f"**📉 Drift dữ liệu đầu vào** (so với `{report['reference']}`, "
+                f"{report['rows']:.0f} dòng đã dự đoán)")
+    if report['alerts']:
+        st.warning(f"🚨 {len(report['alerts'])} cảnh báo drift")
+        st.dataframe(
+            [{'Feature': alert['feature'], 'Tỉnh': alert['province'] or 'Tất cả', 'Số dòng': alert['rows'],
+              'PSI': alert.get('psi'), 'KS': alert.get('ks'), 'Tỷ lệ': alert.get('share')}
+             for alert in report['alerts']],
+            hide_index=True
+        )
+    st.dataframe(
+        [{'Feature': name, 'PSI': stats['psi'], 'KS': stats['ks'], 'Ngoài khoảng': stats['out_of_range'],
+          **stats['quantiles']}
+         for name, stats in report['features'].items()],
+        hide_index=True
+    )
+    unknown = report['unknown_provinces']
+    if unknown['rows']:
+        st.caption(f"Tỉnh không có trong model: {unknown['share']:.1%} số dòng "
+                   f"({', '.join(name for name, _ in unknown['top'])})")
+
+
+def add_to_history(result, input_info):
+    history = st.session_state.setdefault('history', [])
+    history.insert(0, {'result': result, 'input_info': input_info})
+    del history[HISTORY_SIZE:]
+    st.session_state['history_index'] = 0
     
-    st.markdown("---")
+    # Latest result (kept for code reading these keys)
+    st.session_state['prediction_result'] = result
+    st.session_state['input_info'] = input_info
+
+
+@st.fragment
+def prediction_panel(predictor, provinces, detailed):
+    # Widget defaults are fixed once per session: datetime.now() would change them on every rerun
+    now = st.session_state.setdefault('session_start', datetime.now().replace(second=0, microsecond=0))
     
-    # Predict button
-    if st.button("🔮 Dự đoán thời tiết", type="primary", use_container_width=True):
-        with st.spinner("Đang dự đoán..."):
-            try:
-                # Format datetime
-                time_str = selected_datetime.strftime("%m/%d/%Y %H:%M")
-                
-                # Predict
-                result = predictor.predict(
-                    time_str=time_str,
-                    province=selected_province,
-                    temperature=input_temp,
-                    humidity=input_humidity
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.subheader("📝 Nhập thông tin dự đoán")
+        
+        # Inputs are only sent with the submit button (no rerun per edit)
+        with st.form("prediction_form", border=False):
+            # Date & Time
+            col_date, col_time = st.columns(2)
+            
+            with col_date:
+                selected_date = st.date_input(
+                    "Ngày:",
+                    value=now,
+                    min_value=now - timedelta(days=365),
+                    max_value=now + timedelta(days=365)
                 )
+            
+            with col_time:
+                selected_time = st.time_input(
+                    "Giờ:",
+                    value=now.time()
+                )
+            
+            # Province
+            selected_province = st.selectbox(
+                "Tỉnh/Thành phố:",
+                options=provinces,
+                index=0
+            )
+            
+            # Optional inputs
+            input_temp = None
+            input_humidity = None
+            if detailed:
+                st.markdown("---")
+                st.markdown("**🌡️ Thông tin chi tiết (Tùy chọn):**")
                 
-                # Store result in session state
-                st.session_state['prediction_result'] = result
-                st.session_state['input_info'] = {
-                    'time': selected_datetime,
-                    'province': selected_province,
-                    'temperature': input_temp,
-                    'humidity': input_humidity
-                }
+                col_temp, col_hum = st.columns(2)
                 
-                st.success("✅ Dự đoán thành công!")
+                with col_temp:
+                    input_temp = st.number_input(
+                        "Nhiệt độ hiện tại (°C):",
+                        min_value=-10.0,
+                        max_value=50.0,
+                        value=28.0,
+                        step=0.5
+                    )
                 
-            except Exception as e:
-                st.error(f"❌ Lỗi khi dự đoán: {e}")
-                st.exception(e)
-
-with col2:
-    st.subheader("📋 Thông tin nhập")
+                with col_hum:
+                    input_humidity = st.number_input(
+                        "Độ ẩm hiện tại (%):",
+                        min_value=0.0,
+                        max_value=100.0,
+                        value=75.0,
+                        step=1.0
+                    )
+            
+            st.markdown("---")
+            
+            # Predict button
+            submitted = st.form_submit_button("🔮 Dự đoán thời tiết", type="primary", use_container_width=True)
+        
+        if submitted:
+            # Combine datetime
+            selected_datetime = datetime.combine(selected_date, selected_time)
+            with st.spinner("Đang dự đoán..."):
+                try:
+                    # Predict
+                    result = predictor.predict(
+                        time_str=selected_datetime.strftime("%m/%d/%Y %H:%M"),
+                        province=selected_province,
+                        temperature=input_temp,
+                        humidity=input_humidity
+                    )
+                    
+                    add_to_history(result, {
+                        'time': selected_datetime,
+                        'province': selected_province,
+                        'temperature': input_temp,
+                        'humidity': input_humidity
+                    })
+                    
+                    st.success("✅ Dự đoán thành công!")
+                    if result.get('fallback'):
+                        st.info("ℹ️ Tỉnh chưa có trong model: kết quả lấy từ xác suất tiên nghiệm của cụm tỉnh gần nhất")
+                
+                except Exception as e:
+                    st.error(f"❌ Lỗi khi dự đoán: {e}")
+                    st.exception(e)
     
-    st.markdown(f"""
-    <div class="metric-card">
-        <strong>📅 Thời gian:</strong><br/>
-        {selected_datetime.strftime('%d/%m/%Y %H:%M')}<br/><br/>
-        <strong>📍 Địa điểm:</strong><br/>
-        {selected_province}<br/><br/>
-        <strong>🌡️ Nhiệt độ:</strong><br/>
-        {f"{input_temp}°C" if input_temp else "Tự động"}<br/><br/>
-        <strong>💧 Độ ẩm:</strong><br/>
-        {f"{input_humidity}%" if input_humidity else "Tự động"}
-    </div>
-    """, unsafe_allow_html=True)
+    history = st.session_state.get('history', [])
+    
+    with col2:
+        st.subheader("📋 Thông tin nhập")
+        if history:
+            input_info = history[st.session_state.get('history_index', 0)]['input_info']
+            st.markdown(input_card_html(
+                input_info['time'].strftime('%d/%m/%Y %H:%M'), input_info['province'],
+                input_info['temperature'], input_info['humidity']
+            ), unsafe_allow_html=True)
+        else:
+            st.caption("Chưa có dự đoán: chọn thông tin rồi nhấn **Dự đoán thời tiết**")
+    
+    if history:
+        render_history(history)
+
 
-# Display prediction result
-if 'prediction_result' in st.session_state:
+def render_history(history):
     st.markdown("---")
     st.subheader("🎯 Kết quả dự đoán")
     
-    result = st.session_state['prediction_result']
-    input_info = st.session_state['input_info']
+    if len(history) > 1:
+        index = st.selectbox(
+            "🕘 Lịch sử dự đoán:",
+            options=range(len(history)),
+            format_func=lambda i: (f"{history[i]['input_info']['time'].strftime('%d/%m/%Y %H:%M')} · "
+                                   f"{history[i]['input_info']['province']} · {history[i]['result']['weather_main']}"),
+            key='history_index'
+        )
+    else:
+        index = 0
+    
+    entry = history[index]
+    render_result(entry)
+
+
+def render_result(entry):
+    result = entry['result']
+    input_info = entry['input_info']
+    input_temp = input_info['temperature']
+    input_humidity = input_info['humidity']
     
     # Main prediction
     col_pred1, col_pred2, col_pred3 = st.columns([2, 1, 1])
     
     with col_pred1:
-        # Weather icon mapping
-        weather_icons = {
-            'Clear': '☀️',
-            'Clouds': '☁️',
-            'Rain': '🌧️',
-            'Drizzle': '🌦️',
-            'Thunderstorm': '⛈️',
-            'Snow': '❄️',
-            'Mist': '🌫️'
-        }
-        
-        weather_main = result['weather_main']
-        icon = weather_icons.get(weather_main, '🌤️')
-        
-        st.markdown(f"""
-        <div class="prediction-box">
-            <div style="font-size: 5rem;">{icon}</div>
-            <h1 style="margin: 1rem 0;">{weather_main}</h1>
-            <h3>Độ tin cậy: {result['probability']*100:.1f}%</h3>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(prediction_html(result['weather_main'], result['probability']), unsafe_allow_html=True)
     
     with col_pred2:
         st.metric(
@@ -265,51 +424,102 @@ if 'prediction_result' in st.session_state:
     st.markdown("---")
     st.subheader("📊 Top 3 Dự đoán có khả năng cao nhất")
     
-    top_3 = result['top_3_predictions']
+    top_3 = tuple((weather, float(prob)) for weather, prob in result['top_3_predictions'])
     
     cols = st.columns(3)
     for i, (weather, prob) in enumerate(top_3):
         with cols[i]:
-            icon = weather_icons.get(weather, '🌤️')
-            st.markdown(f"""
-            <div style="text-align: center; padding: 1rem; background: #f5f5f5; border-radius: 10px;">
-                <div style="font-size: 3rem;">{icon}</div>
-                <h3>{weather}</h3>
-                <p style="font-size: 1.5rem; color: #1E88E5; font-weight: bold;">{prob*100:.1f}%</p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(top_3_html(weather, prob), unsafe_allow_html=True)
     
     # Probability chart
     st.markdown("---")
     st.subheader("📈 Phân phối xác suất")
+    st.plotly_chart(probability_figure(top_3), use_container_width=True)
     
-    # Create chart data
-    chart_data = pd.DataFrame([
-        {'Weather': w, 'Probability': p*100} 
-        for w, p in top_3
-    ])
-    
-    fig = px.bar(
-        chart_data,
-        x='Weather',
-        y='Probability',
-        color='Probability',
-        color_continuous_scale='Blues',
-        title='Xác suất dự đoán (%)'
-    )
+    # Details expander
+    with st.expander("🔍 Xem chi tiết dự đoán"):
+        explanation = entry.get('explanation')
+        if explanation is None and not result.get('fallback'):
+            # TreeSHAP only on request (~tens of ms per prediction), kept with the history entry
+            if st.button("🧮 Giải thích dự đoán (TreeSHAP)", key='explain'):
+                with st.spinner("Đang tính đóng góp của từng feature..."):
+                    explanation = entry['explanation'] = load_predictor().explain(
+                        input_info['time'], input_info['province'],
+                        input_info['temperature'], input_info['humidity']
+                    )
+        if explanation is not None:
+            render_explanation(explanation)
+        st.json({key: value for key, value in result.items() if key != 'explanation'})
+
+
+# Page config
+st.set_page_config(
+    page_title="Weather Prediction",
+    page_icon="🌤️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS
+st.markdown(CSS, unsafe_allow_html=True)
+
+# Initialize predictor
+try:
+    predictor = load_predictor()
+    provinces = predictor.get_provinces()
+    weather_classes = predictor.get_weather_classes()
+except Exception as e:
+    st.error(f"❌ Lỗi load models: {e}")
+    st.info("📥 Hãy đảm bảo file weather_models.zip đã được giải nén vào thư mục gốc!")
+    st.stop()
+
+# Header
+st.markdown('<div class="main-header">🌤️ Weather Prediction System</div>', unsafe_allow_html=True)
+st.markdown('<div class="sub-header">Dự đoán thời tiết sử dụng Big Data & Machine Learning</div>', unsafe_allow_html=True)
+
+# Sidebar
+with st.sidebar:
+    st.image("https://cdn-icons-png.flaticon.com/512/1163/1163661.png", width=100)
+    st.title("⚙️ Cấu hình")
     
-    fig.update_layout(
-        showlegend=False,
-        height=400,
-        xaxis_title="Loại thời tiết",
-        yaxis_title="Xác suất (%)"
+    st.markdown("---")
+    
+    # Input mode
+    input_mode = st.radio(
+        "Chế độ nhập liệu:",
+        ["Đơn giản (Time + Province)", "Chi tiết (Thêm nhiệt độ, độ ẩm)"],
+        index=0
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.markdown("---")
     
-    # Details expander
-    with st.expander("🔍 Xem chi tiết dự đoán"):
-        st.json(result)
+    # Model info
+    with st.expander("📊 Thông tin Models"):
+        st.write("**Classification:**")
+        st.write("- Model: Random Forest")
+        st.write("- Accuracy: 92.12%")
+        st.write("- F1-Score: 0.9195")
+        
+        st.write("\n**Regression:**")
+        st.write("- Model: GBT")
+        st.write("- RMSE: 0.64°C")
+        st.write("- R²: 0.9637")
+        
+        st.caption(f"Phiên bản model: {predictor.model_version}")
+    
+    diagnostics_panel(predictor)
+    
+    st.markdown("---")
+    st.markdown("**💡 Hướng dẫn:**")
+    st.markdown("""
+    1. Chọn thời gian
+    2. Chọn tỉnh/thành phố
+    3. (Tùy chọn) Nhập nhiệt độ/độ ẩm
+    4. Nhấn **Dự đoán**
+    """)
+
+# Main content
+prediction_panel(predictor, provinces, "Chi tiết" in input_mode)
 
 # Footer
 st.markdown("---")
@@ -318,4 +528,4 @@ st.markdown("""
     <p>🎓 <strong>Đồ án Big Data & Ứng dụng</strong></p>
     <p>Phát triển bởi PySpark & Streamlit | 2025</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
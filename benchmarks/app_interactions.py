@@ -0,0 +1,216 @@
+# ===== benchmarks/app_interactions.py =====
+# Server CPU time per Streamlit interaction under a scripted multi-session load
+# (streamlit.testing.v1.AppTest, one AppTest per simulated browser session).
+#
+# Every session replays the same interaction script round-robin with the others.
+# CPU is time.process_time() around each rerun the interaction causes; editing a
+# widget inside a form causes none (the browser keeps the value until submit),
+# so it is recorded as 0 ms. Each app runs in a fresh process, copied as app.py
+# into an empty directory (AppTest's per-rerun cost depends on the script's folder).
+#
+# AppTest reruns the whole script even for widgets inside an st.fragment, so the
+# numbers for fragment-local interactions (history selectbox, diagnostics) are an
+# upper bound for the fragment version.
+#
+# Usage:
+#   git show HEAD~1:app.py > /tmp/app_before.py
+#   python benchmarks/app_interactions.py --before /tmp/app_before.py
+#   python benchmarks/app_interactions.py --sessions 8 --rounds 5 --output app_interactions.json
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Widget labels shared by every version of app.py
+DATE_LABEL = "Ngày:"
+TIME_LABEL = "Giờ:"
+PROVINCE_LABEL = "Tỉnh/Thành phố:"
+MODE_LABEL = "Chế độ nhập liệu:"
+SUBMIT_LABEL = "🔮 Dự đoán thời tiết"
+HISTORY_LABEL = "🕘 Lịch sử dự đoán:"
+
+
+def _widget(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    return None
+
+
+def _set(at, kind, label, value):
+    """
+    Set a widget like a user would
+
+    Returns:
+        bool: True if the change triggers a rerun (False inside a form)
+    """
+    widget = _widget(at, kind, label)
+    widget.set_value(value)
+    return not widget.proto.form_id
+
+
+def change_date(at, step):
+    return _set(at, 'date_input', DATE_LABEL, date(2025, 6, 1 + step % 28))
+
+
+def change_time(at, step):
+    return _set(at, 'time_input', TIME_LABEL, dtime(step % 24, 0))
+
+
+def change_province(at, step):
+    options = _widget(at, 'selectbox', PROVINCE_LABEL).options
+    return _set(at, 'selectbox', PROVINCE_LABEL, options[step % len(options)])
+
+
+def submit(at, step):
+    _widget(at, 'button', SUBMIT_LABEL).click()
+    return True
+
+
+def toggle_mode(at, step):
+    options = _widget(at, 'radio', MODE_LABEL).options
+    return _set(at, 'radio', MODE_LABEL, options[step % len(options)])
+
+
+def select_history(at, step):
+    history = _widget(at, 'selectbox', HISTORY_LABEL)
+    if history is None:  # no history in this version: nothing to click
+        return None
+    history.set_value(step % len(history.options))
+    return True
+
+
+# One user visit: pick inputs, predict, look at an older result, predict again
+SCRIPT = (
+    ('change_date', change_date),
+    ('change_time', change_time),
+    ('change_province', change_province),
+    ('submit', submit),
+    ('change_time', change_time),
+    ('submit', submit),
+    ('select_history', select_history),
+    ('toggle_mode', toggle_mode),
+    ('change_province', change_province),
+    ('submit', submit),
+)
+
+
+def run_sessions(app_path, sessions, rounds, timeout):
+    """
+    Replay SCRIPT on `sessions` AppTests, round-robin
+
+    Returns:
+        dict: {'open_ms': [...], 'interactions': {name: [cpu ms, ...]}}
+    """
+    from streamlit.testing.v1 import AppTest
+
+    # Warm-up session: loads the models (st.cache_resource) and the imports outside the measurement
+    warm = AppTest.from_file(app_path, default_timeout=timeout)
+    warm.run()
+    _widget(warm, 'button', SUBMIT_LABEL).click()
+    warm.run()
+    from utils.app_cache import load_predictor
+    load_predictor().wait_until_loaded()  # lazy components load on background threads (process CPU)
+
+    apps = [AppTest.from_file(app_path, default_timeout=timeout) for _ in range(sessions)]
+    results = {'open_ms': [], 'interactions': {}}
+    for at in apps:
+        start = time.process_time()
+        at.run()
+        results['open_ms'].append((time.process_time() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f'{app_path}: {at.exception[0].message}')
+
+    for step in range(rounds * len(SCRIPT)):
+        name, action = SCRIPT[step % len(SCRIPT)]
+        for at in apps:
+            rerun = action(at, step)
+            if rerun is None:
+                continue
+            elapsed = 0.0
+            if rerun:
+                start = time.process_time()
+                at.run()
+                elapsed = (time.process_time() - start) * 1000
+                if at.exception:
+                    raise RuntimeError(f'{app_path} ({name}): {at.exception[0].message}')
+            results['interactions'].setdefault(name, []).append(elapsed)
+    return results
+
+
+def measure(app_path, sessions, rounds, timeout):
+    """run_sessions in a fresh process (no imports / caches shared between apps)"""
+    with tempfile.TemporaryDirectory() as folder:
+        script = os.path.join(folder, 'app.py')
+        shutil.copyfile(app_path, script)
+        code = (
+            'import json, sys; '
+            f'sys.path.insert(0, {ROOT!r}); '
+            'from benchmarks.app_interactions import run_sessions; '
+            f'print(json.dumps(run_sessions({script!r}, {sessions}, {rounds}, {timeout})))'
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(results):
+    """{interaction: mean cpu ms} + 'per_interaction' (mean over every scripted interaction)"""
+    summary = {name: statistics.fmean(values) for name, values in results['interactions'].items()}
+    every = [value for values in results['interactions'].values() for value in values]
+    summary['per_interaction'] = statistics.fmean(every)
+    summary['open'] = statistics.fmean(results['open_ms'])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streamlit server CPU per interaction (AppTest load)')
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    parser.add_argument('--before', default=None, help='Older app.py to compare against')
+    parser.add_argument('--sessions', type=int, default=4, help='Concurrent simulated sessions')
+    parser.add_argument('--rounds', type=int, default=3, help='Times each session replays the script')
+    parser.add_argument('--timeout', type=float, default=60.0, help='AppTest timeout per rerun (s)')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    apps = {'after': args.app}
+    if args.before:
+        apps = {'before': args.before, **apps}
+
+    summaries = {}
+    output = {'sessions': args.sessions, 'rounds': args.rounds}
+    for label, path in apps.items():
+        results = measure(path, args.sessions, args.rounds, args.timeout)
+        summaries[label] = summarize(results)
+        output[label] = {'app': path, 'summary': summaries[label], **results}
+
+    names = ['open'] + list(dict.fromkeys(name for name, _ in SCRIPT)) + ['per_interaction']
+    header = f"{'CPU ms (mean)':<18}" + ''.join(f'{label:>10}' for label in summaries)
+    if len(summaries) == 2:
+        header += f"{'change':>10}"
+    print(f"ℹ️ {args.sessions} sessions x {args.rounds} rounds x {len(SCRIPT)} interactions")
+    print(header)
+    for name in names:
+        values = [summary.get(name) for summary in summaries.values()]
+        row = f'{name:<18}' + ''.join(f'{value:10.1f}' if value is not None else f"{'-':>10}" for value in values)
+        if len(values) == 2 and None not in values and values[0]:
+            row += f'{(values[1] - values[0]) / values[0] * 100:+9.0f}%'
+        print(row)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# ===== benchmarks/import_time.py =====
+# Cold-start benchmark: `python -X importtime` for the predictor/service modules
+# plus wall time of a fresh process constructing WeatherPredictor (with per-component
+# load times, and the time until a lazy predictor can list provinces).
+# Exits with status 1 when a budget is exceeded or a heavy module leaks into the core.
+#
+# Usage:
+#   python benchmarks/import_time.py
+#   python benchmarks/import_time.py --import-budget-ms 300 --output import_time.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules measured with -X importtime and their budgets (cumulative import time, ms)
+IMPORT_BUDGETS_MS = {
+    'utils.predictor': 250.0,
+    'server': 300.0,
+}
+
+# Fresh process: import + WeatherPredictor(...) until ready (ms)
+COLD_START_BUDGET_MS = 1500.0
+
+# Must not be imported by the predictor core / service path
+HEAVY_MODULES = ('pandas', 'pyarrow', 'plotly', 'streamlit', 'pyspark')
+
+
+def _python(code, *flags):
+    result = subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def import_time_ms(module):
+    """Cumulative import time of a module from `-X importtime` (fresh process)"""
+    stderr = _python(f'import {module}', '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise RuntimeError(f'{module} not found in -X importtime output')
+
+
+def heavy_imports(module):
+    """Heavy modules pulled in by importing `module`"""
+    code = (
+        f'import sys, {module}; '
+        f'print(" ".join(sorted({{m.split(".")[0] for m in sys.modules}} & {set(HEAVY_MODULES)!r})))'
+    )
+    return _python(code).stdout.split()
+
+
+def cold_start_ms(model_path, lazy=False):
+    """
+    Wall time from interpreter start of the import to a ready predictor
+    (lazy: until the province list is available)
+
+    Returns:
+        tuple: (ms, {component: load seconds})
+    """
+    code = (
+        'import json, time; start = time.perf_counter(); '
+        'from utils.predictor import WeatherPredictor; '
+        f'predictor = WeatherPredictor({model_path!r}, cache_size=0, lazy={lazy!r}); '
+        'predictor.get_provinces(); '
+        'elapsed = (time.perf_counter() - start) * 1000; '
+        'print(json.dumps([elapsed, predictor.wait_until_loaded().load_timings]))'
+    )
+    elapsed, timings = json.loads(_python(code).stdout.strip().splitlines()[-1])
+    return elapsed, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start / import-time benchmark')
+    parser.add_argument('--model-path', default='weather_models')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median is kept)')
+    parser.add_argument('--import-budget-ms', type=float, default=None,
+                        help='Override the budget for every measured module')
+    parser.add_argument('--cold-start-budget-ms', type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    failures = []
+    results = {'import_ms': {}, 'heavy_imports': {}}
+
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        budget = args.import_budget_ms or budget
+        elapsed = statistics.median(import_time_ms(module) for _ in range(args.repeat))
+        heavy = heavy_imports(module)
+        results['import_ms'][module] = elapsed
+        results['heavy_imports'][module] = heavy
+
+        status = '✅' if elapsed <= budget and not heavy else '❌'
+        print(f"{status} import {module}: {elapsed:.1f} ms (budget {budget:.0f} ms)"
+              + (f", heavy imports: {heavy}" if heavy else ''))
+        if elapsed > budget:
+            failures.append(f'import {module} {elapsed:.1f} ms > {budget:.0f} ms')
+        if heavy:
+            failures.append(f'import {module} pulls in {heavy}')
+
+    runs = sorted((cold_start_ms(args.model_path) for _ in range(args.repeat)), key=lambda run: run[0])
+    elapsed, timings = runs[len(runs) // 2]
+    results['cold_start_ms'] = elapsed
+    results['load_seconds'] = timings
+    status = '✅' if elapsed <= args.cold_start_budget_ms else '❌'
+    print(f"{status} cold start WeatherPredictor('{args.model_path}'): {elapsed:.1f} ms "
+          f"(budget {args.cold_start_budget_ms:.0f} ms)")
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"     {name:<24} {seconds * 1000:8.1f} ms")
+    if elapsed > args.cold_start_budget_ms:
+        failures.append(f'cold start {elapsed:.1f} ms > {args.cold_start_budget_ms:.0f} ms')
+
+    elapsed = statistics.median(cold_start_ms(args.model_path, lazy=True)[0] for _ in range(args.repeat))
+    results['lazy_ready_ms'] = elapsed
+    print(f"ℹ️ WeatherPredictor(lazy=True) provinces ready: {elapsed:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if failures:
+        print('\n'.join(['⚠️ Budget exceeded:'] + failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
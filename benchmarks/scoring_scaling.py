@@ -0,0 +1,55 @@
+# ===== benchmarks/scoring_scaling.py =====
+# Throughput of score.py with 1..N worker processes on a synthetic file
+#
+# Usage:
+#   python benchmarks/scoring_scaling.py --rows 10000000 --workers 1 2 4 8
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import write_synthetic  # noqa: E402
+from score import score_file  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='score.py scaling with worker count')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    parser.add_argument('--chunk-size', type=int, default=200_000)
+    parser.add_argument('--input', default=None, help='Existing input file (default: synthetic)')
+    parser.add_argument('--output', default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count()
+    workers = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = args.input
+        if input_path is None:
+            input_path = os.path.join(tmp, 'synthetic.parquet')
+            write_synthetic(input_path, args.rows)
+            print(f"✅ Wrote {args.rows} synthetic rows")
+
+        results = []
+        for n in workers:
+            result = score_file(input_path, os.path.join(tmp, 'scored.parquet'),
+                                os.path.join(ROOT, 'weather_models'), n, args.chunk_size)
+            result['workers'] = n
+            result['speedup'] = result['rows_per_second'] / results[0]['rows_per_second'] if results else 1.0
+            results.append(result)
+            print(f"📊 {n} workers: {result['rows_per_second']:.0f} rows/s "
+                  f"(x{result['speedup']:.2f}, ideal x{n / workers[0]:.0f})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': cpus, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
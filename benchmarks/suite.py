@@ -0,0 +1,235 @@
+# ===== benchmarks/suite.py =====
+# Reproducible benchmarks of the prediction paths, saved as JSON and compared across commits.
+# Every case runs in a fresh process, so its peak RSS is its own.
+#
+# Usage:
+#   python benchmarks/suite.py run --output bench/$(git rev-parse --short HEAD).json
+#   python benchmarks/suite.py run --cases predict_single batch_10k --quick
+#   python benchmarks/suite.py compare bench/base.json bench/new.json --threshold 0.10
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import synthetic_rows  # noqa: E402
+
+# Metric name -> True if higher is better (everything else: lower is better)
+HIGHER_IS_BETTER = {'rows_per_second': True, 'cells_per_second': True}
+
+
+def _predictor(model_path, **kwargs):
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(model_path, **kwargs)
+
+
+def _timings(fn, repeat):
+    """Run fn repeat times, return wall times in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def case_load(model_path, quick):
+    repeat = 3 if quick else 10
+    times = _timings(lambda: _predictor(model_path, cache_size=0), repeat)
+    return {'median_ms': statistics.median(times) * 1000, 'min_ms': min(times) * 1000}
+
+
+def case_predict_single(model_path, quick):
+    predictor = _predictor(model_path, cache_size=0)
+    n = 300 if quick else 3000
+    rows = synthetic_rows(n, seed=1)
+    args = list(zip(rows['time'], rows['province'], rows['temperature'], rows['humidity']))
+
+    for time_str, province, temperature, humidity in args[:50]:  # warm-up
+        predictor.predict(time_str, province, temperature, humidity)
+
+    latencies = np.empty(n)
+    for i, (time_str, province, temperature, humidity) in enumerate(args):
+        start = time.perf_counter()
+        predictor.predict(time_str, province, float(temperature), float(humidity))
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1000
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+    }
+
+
+def _case_batch(n):
+    def case(model_path, quick):
+        predictor = _predictor(model_path, cache_size=0)
+        rows = synthetic_rows(n, seed=2)
+        repeat = 1 if n >= 1_000_000 else (3 if quick else 20 if n <= 100 else 5)
+
+        def run():
+            predictor.predict_batch(rows['time'], rows['province'], rows['temperature'], rows['humidity'])
+
+        run()  # warm-up
+        seconds = statistics.median(_timings(run, repeat))
+        return {'median_ms': seconds * 1000, 'rows_per_second': n / seconds}
+    return case
+
+
+def _case_grid(hours, rollout=False):
+    def case(model_path, quick):
+        predictor = _predictor(model_path, cache_size=0)
+        fn = predictor.rollout if rollout else predictor.forecast_grid
+        repeat = 2 if quick else 5
+        fn('6/30/2025 00:00', hours=hours)  # warm-up
+        seconds = statistics.median(_timings(lambda: fn('6/30/2025 00:00', hours=hours), repeat))
+        cells = predictor.province_table.num_provinces * hours
+        return {'median_ms': seconds * 1000, 'cells_per_second': cells / seconds}
+    return case
+
+
+CASES = {
+    'load': case_load,
+    'predict_single': case_predict_single,
+    'batch_1': _case_batch(1),
+    'batch_100': _case_batch(100),
+    'batch_10k': _case_batch(10_000),
+    'batch_1m': _case_batch(1_000_000),
+    'grid_24h': _case_grid(24),
+    'grid_168h': _case_grid(168),
+    'rollout_24h': _case_grid(24, rollout=True),
+}
+
+
+def run_case(name, model_path, quick):
+    """Run one case in this process; prints a JSON line (metrics + peak RSS)"""
+    result = CASES[name](model_path, quick)
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    print(json.dumps(result))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    cases = args.cases or list(CASES)
+    results = {
+        'commit': _git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'model_path': args.model_path,
+        'quick': args.quick,
+        'cases': {},
+    }
+
+    for name in cases:
+        command = [sys.executable, os.path.abspath(__file__), '_case', name, '--model-path', args.model_path]
+        if args.quick:
+            command.append('--quick')
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        metrics = json.loads(output.strip().splitlines()[-1])
+        results['cases'][name] = metrics
+        print(f"📊 {name}: " + ', '.join(f'{key}={value:.4g}' for key, value in metrics.items()))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Saved {args.output}")
+
+
+def compare(base, new, threshold=0.10):
+    """
+    Compare two result files
+
+    Returns:
+        list of (case, metric, base value, new value, relative change, regressed)
+    """
+    rows = []
+    for case, new_metrics in new['cases'].items():
+        base_metrics = base['cases'].get(case)
+        if base_metrics is None:
+            continue
+        for metric, new_value in new_metrics.items():
+            base_value = base_metrics.get(metric)
+            if not base_value:
+                continue
+            change = (new_value - base_value) / base_value
+            worse = -change if HIGHER_IS_BETTER.get(metric, False) else change
+            rows.append((case, metric, base_value, new_value, change, worse > threshold))
+    return rows
+
+
+def report(args):
+    with open(args.base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"Base {str(base.get('commit'))[:10]} vs new {str(new.get('commit'))[:10]} "
+          f"(threshold {args.threshold:.0%})")
+    rows = compare(base, new, args.threshold)
+    for case, metric, base_value, new_value, change, regressed in rows:
+        status = '❌' if regressed else '✅'
+        print(f"{status} {case:15s} {metric:16s} {base_value:12.4g} -> {new_value:12.4g} ({change:+.1%})")
+
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"⚠️ {len(regressions)} regression(s)")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prediction benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run benchmarks')
+    run_parser.add_argument('--cases', nargs='+', choices=list(CASES), default=None)
+    run_parser.add_argument('--model-path', default='weather_models')
+    run_parser.add_argument('--quick', action='store_true', help='Fewer repeats (smoke run)')
+    run_parser.add_argument('--output', help='Write results as JSON')
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Relative slowdown flagged as a regression')
+
+    case_parser = commands.add_parser('_case')  # internal: one case per process
+    case_parser.add_argument('name', choices=list(CASES))
+    case_parser.add_argument('--model-path', default='weather_models')
+    case_parser.add_argument('--quick', action='store_true')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'compare':
+        report(args)
+    else:
+        run_case(args.name, args.model_path, args.quick)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# ===== benchmarks/synthetic.py =====
+# Synthetic hourly observations built from province_stats.csv (reproducible with a seed)
+#
+# Usage:
+#   python benchmarks/synthetic.py synthetic_10m.parquet --rows 10000000
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_province_stats(path=os.path.join(ROOT, 'weather_models', 'province_stats.csv')):
+    with open(path, 'r', encoding='utf-8') as f:
+        records = list(csv.DictReader(f))
+    names = np.array([record['province'] for record in records], dtype=object)
+    columns = {
+        name: np.array([float(record[name]) for record in records])
+        for name in records[0] if name != 'province'
+    }
+    return names, columns
+
+
+def synthetic_rows(n, seed=0, start='2025-06-01T00:00'):
+    """
+    n random (time, province, temperature, humidity) rows
+
+    Temperatures / humidities follow each province's mean and std;
+    times are whole hours in the 30 days from start.
+
+    Returns:
+        dict of arrays: time ("6/30/2025 14:00" strings), province, temperature, humidity
+    """
+    rng = np.random.default_rng(seed)
+    names, stats = load_province_stats()
+
+    province = rng.integers(0, len(names), n)
+    hours = np.datetime64(start, 'h') + rng.integers(0, 30 * 24, n).astype('timedelta64[h]')
+
+    # Format the 720 distinct hours once, then gather
+    unique, inverse = np.unique(hours, return_inverse=True)
+    labels = np.array([
+        f'{t.month}/{t.day}/{t.year} {t.hour:02d}:00' for t in unique.astype(object)
+    ], dtype=object)
+
+    temperature = rng.normal(stats['avg_temp_province'][province], stats['std_temp_province'][province])
+    humidity = rng.normal(stats['avg_humidity_province'][province], stats['std_humidity_province'][province])
+
+    return {
+        'time': labels[inverse],
+        'province': names[province],
+        'temperature': np.round(temperature, 1),
+        'humidity': np.clip(np.round(humidity), 0, 100),
+    }
+
+
+def write_synthetic(path, n, seed=0, chunk_size=1_000_000):
+    """Write n synthetic rows to a parquet or CSV file in chunks"""
+    import pyarrow as pa
+
+    writer = None
+    try:
+        for i, offset in enumerate(range(0, n, chunk_size)):
+            rows = synthetic_rows(min(chunk_size, n - offset), seed=seed + i)
+            table = pa.table({name: pa.array(values.tolist() if values.dtype == object else values)
+                              for name, values in rows.items()})
+            if writer is None:
+                if path.endswith('.parquet'):
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    import pyarrow.csv as pv
+                    writer = pv.CSVWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic observations')
+    parser.add_argument('output', help='.parquet or .csv')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_synthetic(args.output, args.rows, args.seed)
+    print(f"✅ Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
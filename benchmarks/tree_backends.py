@@ -0,0 +1,79 @@
+# ===== benchmarks/tree_backends.py =====
+# Forest throughput (RF + GBT) of the NumPy traversal vs the compiled kernels at 1..N threads
+#
+# Usage:
+#   python benchmarks/tree_backends.py --rows 200000 --threads 1 2 4 8
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import synthetic_rows  # noqa: E402
+from utils import tree_kernels  # noqa: E402
+
+
+def _forest_rows_per_second(predictor, X, repeat):
+    predictor.rf_model.predict_raw(X[:1000])  # warm-up (JIT compile / cache load)
+    predictor.gbt_model.predict(X[:1000])
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.rf_model.predict_raw(X)
+        predictor.gbt_model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tree backend throughput')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, nargs='+', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--model-path', default='weather_models')
+    parser.add_argument('--output', default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = WeatherPredictor(args.model_path, cache_size=0)
+    rows = synthetic_rows(args.rows, seed=3)
+    X = predictor._feature_matrix(
+        predictor._time_features(rows['time']), predictor.province_table.rows(rows['province']),
+        rows['temperature'], rows['humidity']
+    )
+
+    tree_kernels.set_backend('numpy')
+    base = _forest_rows_per_second(predictor, X, args.repeat)
+    results = [{'backend': 'numpy', 'threads': 1, 'rows_per_second': base, 'speedup': 1.0}]
+    print(f"📊 numpy: {base:.0f} rows/s")
+
+    cpus = os.cpu_count()
+    threads = args.threads or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1)))
+    try:
+        for n in threads:
+            tree_kernels.set_backend('numba', num_threads=n)
+            speed = _forest_rows_per_second(predictor, X, args.repeat)
+            results.append({'backend': 'numba', 'threads': n, 'rows_per_second': speed, 'speedup': speed / base})
+            print(f"📊 numba x{n} threads: {speed:.0f} rows/s (x{speed / base:.2f} vs numpy)")
+    except ImportError as e:
+        print(f"⚠️ {e}")
+    finally:
+        tree_kernels.set_backend('auto')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': cpus, 'rows': args.rows, 'numpy': np.__version__, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
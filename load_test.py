@@ -0,0 +1,113 @@
+# ===== load_test.py =====
+# Load generator for server.py (run the server first)
+#
+# Usage:
+#   python load_test.py --concurrency 64 --duration 10
+#   python load_test.py --endpoint /predict_batch --rows 100
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+
+import numpy as np
+
+
+def load_provinces(path='weather_models/province_stats.csv'):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [row['province'] for row in csv.DictReader(f)]
+
+
+def random_request(provinces, rows):
+    """One random request body; rows=None builds a /predict body"""
+    def one():
+        return (
+            f'{random.randint(6, 7)}/{random.randint(1, 28)}/2025 {random.randint(0, 23):02d}:00',
+            random.choice(provinces),
+            round(random.uniform(20, 35), 1),
+            round(random.uniform(50, 95), 0),
+        )
+
+    if rows is None:
+        time_str, province, temperature, humidity = one()
+        return {'time': time_str, 'province': province, 'temperature': temperature, 'humidity': humidity}
+
+    columns = list(zip(*[one() for _ in range(rows)]))
+    return dict(zip(['time', 'province', 'temperature', 'humidity'], map(list, columns)))
+
+
+async def client(host, port, endpoint, provinces, rows, stop_at, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop_at:
+            body = json.dumps(random_request(provinces, rows)).encode('utf-8')
+            start = time.perf_counter()
+            writer.write(
+                f'POST {endpoint} HTTP/1.1\r\nHost: {host}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+            )
+            await writer.drain()
+
+            length = 0
+            status = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+
+            if b' 200 ' not in status:
+                raise RuntimeError(f'Request failed: {status!r}')
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        writer.close()
+
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET /stats HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def run(args):
+    provinces = load_provinces()
+    rows = args.rows if args.endpoint == '/predict_batch' else None
+    latencies = []
+    stop_at = time.perf_counter() + args.duration
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(args.host, args.port, args.endpoint, provinces, rows, stop_at, latencies)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    rows_per_request = rows or 1
+    print(f"📊 {len(latencies)} requests in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.0f} req/s, {len(latencies) * rows_per_request / elapsed:.0f} rows/s)")
+    print(f"📊 Client latency p50={np.percentile(latencies, 50):.1f}ms "
+          f"p99={np.percentile(latencies, 99):.1f}ms max={latencies.max():.1f}ms")
+    print(f"📊 Server stats: {json.dumps(await fetch_stats(args.host, args.port))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for server.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--endpoint', default='/predict', choices=['/predict', '/predict_batch'])
+    parser.add_argument('--rows', type=int, default=100, help='Rows per /predict_batch request')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# ===== pages/1_Forecast_Grid.py =====
+
+import streamlit as st
+from datetime import datetime, timedelta
+from utils.app_cache import load_predictor
+
+# Page config
+st.set_page_config(
+    page_title="Forecast Grid",
+    page_icon="🗺️",
+    layout="wide"
+)
+
+try:
+    predictor = load_predictor()
+    provinces = predictor.get_provinces()
+    weather_classes = predictor.get_weather_classes()
+except Exception as e:
+    st.error(f"❌ Lỗi load models: {e}")
+    st.stop()
+
+st.title("🗺️ Dự báo toàn bộ tỉnh/thành theo giờ")
+
+# Inputs
+col_date, col_time, col_hours = st.columns(3)
+
+with col_date:
+    start_date = st.date_input(
+        "Ngày bắt đầu:",
+        value=datetime.now(),
+        min_value=datetime.now() - timedelta(days=365),
+        max_value=datetime.now() + timedelta(days=365)
+    )
+
+with col_time:
+    start_hour = st.number_input("Giờ bắt đầu:", min_value=0, max_value=23, value=datetime.now().hour)
+
+with col_hours:
+    hours = st.slider("Số giờ dự báo:", min_value=24, max_value=168, value=72, step=24)
+
+selected_provinces = st.multiselect(
+    "Tỉnh/Thành phố (để trống = tất cả):",
+    options=provinces
+)
+
+value_options = ["Nhiệt độ dự đoán (°C)", "Độ tin cậy (%)"] + [f"Xác suất {cls} (%)" for cls in weather_classes]
+value_choice = st.selectbox("Giá trị hiển thị:", options=value_options)
+
+if st.button("🔮 Dự báo", type="primary", use_container_width=True):
+    with st.spinner("Đang dự báo..."):
+        start = datetime.combine(start_date, datetime.min.time()) + timedelta(hours=int(start_hour))
+        try:
+            st.session_state['forecast_grid'] = predictor.forecast_grid(
+                start, hours=hours, provinces=selected_provinces or None
+            )
+        except RuntimeError as e:  # rule-based only: no grid
+            st.error(f"❌ {e}")
+
+if 'forecast_grid' in st.session_state:
+    import plotly.graph_objects as go
+
+    grid = st.session_state['forecast_grid']
+
+    if value_choice.startswith("Nhiệt độ"):
+        z = grid['predicted_temp']
+        colorscale = 'RdYlBu_r'
+    elif value_choice.startswith("Độ tin cậy"):
+        z = grid['probability'] * 100
+        colorscale = 'Blues'
+    else:
+        cls = value_choice[len("Xác suất "):-len(" (%)")]
+        z = grid['probabilities'][:, :, weather_classes.index(cls)] * 100
+        colorscale = 'Blues'
+
+    # Predicted class per cell in the hover text
+    labels = [[weather_classes[i] for i in row] for row in grid['class_index']]
+
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=[str(t).replace('T', ' ') + ':00' for t in grid['times']],
+        y=grid['provinces'],
+        colorscale=colorscale,
+        customdata=labels,
+        hovertemplate="%{y}<br>%{x}<br>%{z:.1f}<br>%{customdata}<extra></extra>"
+    ))
+
+    fig.update_layout(
+        title=value_choice,
+        height=max(400, 18 * len(grid['provinces'])),
+        xaxis_title="Thời gian",
+        yaxis_title="Tỉnh/Thành phố",
+        yaxis=dict(autorange='reversed')
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
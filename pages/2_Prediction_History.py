@@ -0,0 +1,99 @@
+# ===== pages/2_Prediction_History.py =====
+
+import streamlit as st
+from datetime import datetime, timedelta
+from utils.app_cache import load_history, load_predictor
+
+# Page config
+st.set_page_config(
+    page_title="Prediction History",
+    page_icon="🕘",
+    layout="wide"
+)
+
+ALL_PROVINCES = "Tất cả"
+
+try:
+    load_predictor()  # attaches the history store to the live model
+    history = load_history()
+except Exception as e:
+    st.error(f"❌ Lỗi load lịch sử dự đoán: {e}")
+    st.stop()
+
+st.title("🕘 Lịch sử dự đoán")
+st.caption("Mọi dự đoán của app (mọi phiên) được ghi vào kho lịch sử, lọc theo thời điểm được dự đoán")
+
+# Inputs
+col_province, col_dates = st.columns([1, 2])
+
+with col_province:
+    province = st.selectbox("Tỉnh/Thành phố:", options=[ALL_PROVINCES] + history.provinces())
+
+with col_dates:
+    today = datetime.now().date()
+    dates = st.date_input(
+        "Khoảng thời gian dự đoán:",
+        value=(today - timedelta(days=7), today + timedelta(days=7))
+    )
+
+if len(dates) != 2:
+    st.info("ℹ️ Chọn ngày bắt đầu và ngày kết thúc")
+    st.stop()
+
+start = datetime.combine(dates[0], datetime.min.time())
+end = datetime.combine(dates[1], datetime.min.time()) + timedelta(hours=23, minutes=59)
+segments_before = history.segments_read
+table = history.query(None if province == ALL_PROVINCES else province, start, end)
+
+if table.num_rows == 0:
+    st.info("Chưa có dự đoán nào trong khoảng thời gian này")
+    st.stop()
+
+frame = table.to_pandas()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Số dự đoán", f"{len(frame)}")
+col2.metric("Nhiệt độ dự đoán TB", f"{frame['predicted_temp'].mean():.1f}°C")
+col3.metric("Thời tiết phổ biến nhất", frame['weather_main'].mode().iloc[0])
+
+if province != ALL_PROVINCES:
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=frame['time'], y=frame['predicted_temp'], mode='lines+markers', name="Nhiệt độ dự đoán (°C)",
+        customdata=frame['weather_main'], hovertemplate="%{x}<br>%{y:.1f}°C<br>%{customdata}<extra></extra>"
+    ))
+    fig.add_trace(go.Scatter(
+        x=frame['time'], y=frame['probability'] * 100, mode='markers', name="Độ tin cậy (%)", yaxis='y2'
+    ))
+    fig.update_layout(
+        title=f"Dự đoán cho {province}",
+        xaxis_title="Thời gian",
+        yaxis=dict(title="°C"),
+        yaxis2=dict(title="%", overlaying='y', side='right', range=[0, 100]),
+        height=400
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+columns = ['time', 'province', 'weather_main', 'probability', 'predicted_temp', 'temperature', 'humidity',
+           'fallback', 'model_version', 'logged_at']
+st.dataframe(
+    frame[columns].rename(columns={
+        'time': 'Thời gian', 'province': 'Tỉnh', 'weather_main': 'Thời tiết', 'probability': 'Độ tin cậy',
+        'predicted_temp': 'Nhiệt độ dự đoán', 'temperature': 'Nhiệt độ nhập', 'humidity': 'Độ ẩm nhập',
+        'fallback': 'Dự phòng', 'model_version': 'Phiên bản model', 'logged_at': 'Lúc dự đoán'
+    }),
+    hide_index=True,
+    use_container_width=True
+)
+
+st.download_button(
+    "⬇️ Tải CSV", frame.to_csv(index=False).encode('utf-8'),
+    file_name="prediction_history.csv", mime="text/csv"
+)
+
+stats = history.stats()
+st.caption(f"📁 `{history.directory}/`: {stats['rows']} dòng đã ghi trong {stats['segments']} segment "
+           f"({stats['days']} ngày), {stats['buffered_rows']} dòng chờ ghi; truy vấn này đọc "
+           f"{history.segments_read - segments_before} segment")
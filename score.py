@@ -0,0 +1,204 @@
+# ===== score.py =====
+# Offline batch scoring of large CSV/parquet files with a process pool
+#
+# Input columns: time ("6/30/2025 14:00" strings or timestamps), province,
+# and optional temperature / humidity (missing -> province average).
+# The output parquet keeps the input columns and adds weather_main, probability,
+# predicted_temp and one prob_<class> column per weather class.
+#
+# With --drift-report, every worker bins its inputs (utils.drift) and hands its
+# sketches back with each chunk; they are merged into one report.
+#
+# Usage:
+#   python score.py history.csv scored.parquet --workers 8 --chunk-size 200000
+#   python score.py history.csv scored.parquet --drift-report drift.json
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.bundle import BUNDLE_FILENAME, bundle_is_stale, export_bundle
+
+_predictor = None  # per worker process
+
+
+def _load_predictor(bundle_path):
+    import contextlib
+    import io
+
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(bundle_path, cache_size=0)
+
+
+def _init_worker(bundle_path, drift=False, num_threads=1):
+    global _predictor
+
+    from utils import tree_kernels
+
+    # The pool already runs one process per core: the compiled tree kernels get a
+    # share of the cores instead of a thread per core each (oversubscription)
+    tree_kernels.set_backend(num_threads=num_threads)
+
+    # All workers memory-map the same bundle file: the model pages are shared
+    _predictor = _load_predictor(bundle_path)
+    if drift:
+        _predictor.enable_drift_monitor(max_rows=None)  # every row of every chunk is binned
+
+
+def _score_chunk(columns):
+    """
+    Featurize + RF + GBT for one chunk (runs in a worker)
+
+    Returns:
+        tuple: (output columns, drift sketches of the chunk or None)
+    """
+    batch = _predictor.predict_batch(
+        columns['time'], columns['province'], columns.get('temperature'), columns.get('humidity')
+    )
+    result = {
+        'weather_main': batch['weather_main'],
+        'probability': batch['probability'],
+        'predicted_temp': batch['predicted_temp'],
+    }
+    for j, name in enumerate(_predictor.weather_classes):
+        result[f'prob_{name}'] = batch['probabilities'][:, j].astype(np.float32)
+    monitor = _predictor.drift_monitor
+    return result, monitor.drain() if monitor is not None else None
+
+
+def read_batches(path, chunk_size):
+    """Stream pyarrow RecordBatches of about chunk_size rows from a CSV or parquet file"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+        return
+
+    import pyarrow.csv as pv
+
+    # CSV blocks are sized in bytes; ~64 bytes per row is typical for these files
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=max(chunk_size * 64, 1 << 20)),
+        convert_options=pv.ConvertOptions(column_types={'time': 'string', 'province': 'string'})
+    )
+    yield from reader
+
+
+def _chunk_columns(record_batch):
+    """Input columns of a RecordBatch as NumPy arrays (what the workers receive)"""
+    columns = {}
+    for name in ('time', 'province', 'temperature', 'humidity'):
+        index = record_batch.schema.get_field_index(name)
+        if index < 0:
+            continue
+        column = record_batch.column(index)
+        if name in ('temperature', 'humidity'):
+            columns[name] = column.to_numpy(zero_copy_only=False).astype(np.float64)
+        else:
+            columns[name] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+
+def score_file(input_path, output_path, model_path='weather_models', workers=None,
+               chunk_size=200_000, drift_report=None):
+    """
+    Score a CSV/parquet file chunk by chunk and append the results to a parquet file
+
+    At most 2 x workers chunks are in flight, so memory stays bounded
+    regardless of the input size; output order follows the input.
+
+    Args:
+        input_path: .csv or .parquet file
+        output_path: Parquet file to write
+        model_path: Models folder (model.bundle is exported first if missing or stale) or bundle file
+        workers: Worker processes (default: os.cpu_count())
+        chunk_size: Rows per chunk
+        drift_report: Write the merged input drift report (utils.drift) to this JSON file
+
+    Returns:
+        dict: rows, seconds, rows_per_second (+ drift_alerts with drift_report)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    bundle_path = model_path if os.path.isfile(model_path) else os.path.join(model_path, BUNDLE_FILENAME)
+    if not os.path.isfile(bundle_path) or (bundle_path != model_path and bundle_is_stale(bundle_path, model_path)):
+        export_bundle(model_path, bundle_path)
+        print(f"✅ Exported {bundle_path}")
+
+    workers = workers or os.cpu_count()
+    max_pending = 2 * workers
+    # The worker sketches are merged into a monitor with the same reference
+    monitor = _load_predictor(bundle_path).enable_drift_monitor() if drift_report else None
+
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    pending = []  # (RecordBatch, future), in input order
+
+    def write_next():
+        nonlocal writer, rows
+        record_batch, future = pending.pop(0)
+        columns, drift = future.result()
+        if drift is not None:
+            monitor.merge(drift)
+        table = pa.Table.from_batches([record_batch])
+        for name, values in columns.items():
+            table = table.append_column(name, pa.array(values))
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table)
+        rows += table.num_rows
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(bundle_path, drift_report is not None,
+                                           max(1, (os.cpu_count() or 1) // workers))) as pool:
+            for record_batch in read_batches(input_path, chunk_size):
+                pending.append((record_batch, pool.submit(_score_chunk, _chunk_columns(record_batch))))
+                if len(pending) >= max_pending:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    seconds = time.perf_counter() - start
+    result = {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+    if monitor is not None:
+        report = monitor.report()
+        with open(drift_report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        result['drift_alerts'] = len(report['alerts'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV/parquet file into parquet')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--model-path', default='weather_models')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=200_000)
+    parser.add_argument('--drift-report', default=None, help='Write the input drift report (JSON) here')
+    args = parser.parse_args()
+
+    result = score_file(args.input, args.output, args.model_path, args.workers, args.chunk_size,
+                        args.drift_report)
+    print(f"📊 {result['rows']} rows in {result['seconds']:.1f}s "
+          f"({result['rows_per_second']:.0f} rows/s)")
+    if args.drift_report:
+        print(f"{'🚨' if result['drift_alerts'] else '✅'} Drift: {result['drift_alerts']} alerts "
+              f"({args.drift_report})")
+
+
+if __name__ == '__main__':
+    main()
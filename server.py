@@ -0,0 +1,251 @@
+# ===== server.py =====
+# HTTP prediction service with request micro-batching
+#
+# Usage:
+#   python server.py --port 8000 --max-batch-size 1024 --max-wait-ms 5
+#   python server.py --observations-dir observations/ --observations-port 8001
+#   python server.py --model-path models/ --reload-interval 5   (hot reload of versioned models)
+#   python server.py --instrument --drift                        (feature drift gauges in /metrics)
+#   python server.py --history-dir prediction_history            (log every prediction, GET /history)
+#
+# Endpoints:
+#   POST /predict        {"time": "6/30/2025 14:00", "province": "Ha Noi", "temperature": 28.5, "humidity": 75}
+#   POST /predict_batch  {"time": [...], "province": [...], "temperature": [...], "humidity": [...]}
+#   GET  /stats          latency p50/p99, batch-size stats, model registry status
+#                        (+ stage timings with --instrument)
+#   GET  /metrics        Prometheus text (stage histograms, with --instrument; drift_* gauges with --drift)
+#   GET  /drift          Feature drift report and alerts (with --drift, see utils.drift)
+#   GET  /history?province=Da%20Nang&start=6/23/2025%2000:00&end=6/30/2025%2023:00
+#                        Logged predictions, oldest first (with --history-dir, see utils.history)
+#   GET  /health
+
+import argparse
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from utils.batcher import MicroBatcher
+from utils.history import PredictionHistory, to_records
+from utils.observations import DirectoryTailer, ObservationStore, serve_socket
+from utils.registry import ModelRegistry
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class PredictionServer:
+    """Minimal HTTP/1.1 server (keep-alive, JSON bodies) on asyncio streams"""
+
+    def __init__(self, registry, max_batch_size=1024, max_wait_ms=5.0):
+        self.registry = registry
+        # Every batch leases the live version (ModelRegistry.predict_batch)
+        self.batcher = MicroBatcher(registry, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @property
+    def predictor(self):
+        return self.registry.current
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"✅ Serving on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                path, _, query = path.partition('?')
+                try:
+                    status, payload = await self._route(method, path, body, query)
+                except Exception as e:  # answer instead of dropping the connection
+                    status, payload = 500, {'error': str(e)}
+                if isinstance(payload, str):
+                    content_type = 'text/plain; version=0.0.4'
+                    data = payload.encode('utf-8')
+                else:
+                    content_type = 'application/json; charset=utf-8'
+                    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status} {_REASONS[status]}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Length: {len(data)}\r\n\r\n'.encode('latin-1') + data
+                )
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body, query=''):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            summary = self.batcher.stats.summary()
+            summary['model'] = self.registry.status()
+            if self.predictor.metrics is not None:
+                summary['stages'] = self.predictor.metrics.to_dict()
+            return 200, summary
+        if path == '/metrics':
+            if self.predictor.metrics is None:
+                return 404, {'error': 'Instrumentation is off (start with --instrument)'}
+            return 200, self.predictor.metrics.to_prometheus()
+        if path == '/drift':
+            if self.predictor.drift_monitor is None:
+                return 404, {'error': 'Drift monitoring is off (start with --drift)'}
+            return 200, self.predictor.drift_monitor.report()
+        if path == '/history':
+            history = self.predictor.history
+            if history is None:
+                return 404, {'error': 'Prediction history is off (start with --history-dir)'}
+            params = {name: values[-1] for name, values in parse_qs(query).items()}
+            try:
+                table = history.query(params.get('province'), params.get('start'), params.get('end'))
+            except ValueError as e:
+                return 400, {'error': f'Invalid request: {e}'}
+            return 200, {'rows': table.num_rows, 'predictions': to_records(table)}
+        if path not in ('/predict', '/predict_batch'):
+            return 404, {'error': f'Unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+
+        try:
+            request = json.loads(body or b'{}')
+            single = path == '/predict'
+            if single:
+                request = {key: [value] for key, value in request.items()}
+            times = request['time']
+            provinces = request['province']
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            return 400, {'error': f'Invalid request: {e}'}
+
+        try:
+            result = await self.batcher.submit(
+                times, provinces, request.get('temperature'), request.get('humidity')
+            )
+        except ValueError as e:  # rejected before queuing
+            return 400, {'error': f'Invalid request: {e}'}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+        return 200, self._to_json(result, single)
+
+    def _to_json(self, result, single):
+        weather_classes = self.predictor.weather_classes
+        if single:
+            return {
+                'weather_main': result['weather_main'][0],
+                'probability': float(result['probability'][0]),
+                'predicted_temp': float(result['predicted_temp'][0]),
+                'all_probabilities': dict(zip(weather_classes, result['probabilities'][0].tolist())),
+                'fallback': bool(result['fallback'][0]),
+                'model_version': result['model_version'],
+            }
+        return {
+            'weather_classes': weather_classes,
+            'weather_main': result['weather_main'].tolist(),
+            'probability': result['probability'].tolist(),
+            'predicted_temp': result['predicted_temp'].tolist(),
+            'probabilities': result['probabilities'].tolist(),
+            'fallback': result['fallback'].tolist(),
+            'model_version': result['model_version'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weather prediction HTTP service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model-path', default='weather_models',
+                        help='Models folder, or a root of versioned model folders (newest is served)')
+    parser.add_argument('--reload-interval', type=float, default=5.0,
+                        help='Seconds between checks for a new model version (0 = no hot reload)')
+    parser.add_argument('--variant', default=None, help='Reduced forest variant (python -m utils.variants build)')
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help='Answer from cluster priors while the model would exceed this latency')
+    parser.add_argument('--max-batch-size', type=int, default=1024)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--observations-dir', default=None,
+                        help='Tail JSON-lines/CSV observation files for live lag features')
+    parser.add_argument('--observations-port', type=int, default=None,
+                        help='Also accept JSON-lines observations on this TCP port')
+    parser.add_argument('--checkpoint', default=None, help='Observation state checkpoint file')
+    parser.add_argument('--instrument', action='store_true', help='Time prediction stages (/metrics)')
+    parser.add_argument('--profile-rate', type=float, default=0.0,
+                        help='Fraction of batches captured with cProfile into profiles/')
+    parser.add_argument('--drift', action='store_true',
+                        help='Monitor input drift against the training distributions (/drift)')
+    parser.add_argument('--history-dir', default=None,
+                        help='Log every prediction to this append-only store (/history)')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model_path, poll_interval=args.reload_interval,
+                             instrument=args.instrument, profile_rate=args.profile_rate,
+                             variant=args.variant, latency_budget_ms=args.latency_budget_ms)
+    predictor = registry.current
+    if args.drift:
+        predictor.enable_drift_monitor()  # restarted for later versions
+    history = None
+    if args.history_dir:
+        history = PredictionHistory(args.history_dir).start()
+        predictor.attach_history(history)  # carried over to later versions
+    server = PredictionServer(
+        registry,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms
+    )
+
+    tailer = None
+    if args.observations_dir or args.observations_port:
+        store = ObservationStore(predictor.province_table)
+        predictor.attach_observations(store)  # carried over to later versions
+        tailer = DirectoryTailer(store, args.observations_dir, args.checkpoint)
+        if args.observations_dir:
+            tailer.start()
+        elif args.checkpoint and os.path.isfile(args.checkpoint):
+            store.restore(args.checkpoint)
+
+    async def run():
+        tasks = [server.serve(args.host, args.port)]
+        if args.observations_port:
+            tasks.append(serve_socket(store, args.host, args.observations_port))
+        await asyncio.gather(*tasks)
+
+    if args.reload_interval > 0:
+        registry.start()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.stop()
+        if tailer is not None:
+            tailer.stop()
+        if history is not None:
+            history.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# ===== tests/test_explain.py =====
+# TreeSHAP (utils.explain) against brute-force Shapley values of a hand-built ensemble,
+# and local accuracy on the saved models, on the NumPy and (if installed) Numba paths
+
+import contextlib
+import io
+import itertools
+import math
+import os
+
+import numpy as np
+import pytest
+
+from utils import tree_kernels
+from utils.explain import TreeExplainer
+from utils.trees import TreeEnsemble
+
+MODEL_PATH = 'weather_models'
+
+# (backend, kernel threads): several threads split a small batch by paths
+BACKENDS = [('numpy', None)] + (
+    [('numba', 1), ('numba', 3)] if tree_kernels.compiled_kernels() is not None else []
+)
+
+# Two trees over 3 features; tree 0 splits twice on feature 0 along one path
+#   0: x0 <= 0.5 ? 1 : 2        7: x2 <= 1.0 ? 8 : 9
+#   1: x1 <= 0.0 ? 3 : 4        9: x1 <= -1.0 ? 10 : 11
+#   2: x0 <= 2.0 ? 5 : 6
+FEATURE = np.array([0, 1, 0, 0, 0, 0, 0, 2, 0, 1, 0, 0])
+THRESHOLD = np.array([0.5, 0.0, 2.0, np.inf, np.inf, np.inf, np.inf, 1.0, np.inf, -1.0, np.inf, np.inf])
+LEFT = np.array([1, 3, 5, 3, 4, 5, 6, 8, 8, 10, 10, 11])
+RIGHT = np.array([2, 4, 6, 3, 4, 5, 6, 9, 8, 11, 10, 11])
+COVER = np.array([10.0, 6.0, 4.0, 2.0, 4.0, 1.0, 3.0, 8.0, 5.0, 3.0, 1.0, 2.0])
+# Output per node when it is the leaf reached (2 outputs)
+LEAF_VALUES = np.array([
+    [0, 0], [0, 0], [0, 0], [1.0, -2.0], [3.0, 0.5], [-1.5, 4.0], [2.5, 1.0],
+    [0, 0], [0.25, -0.75], [0, 0], [-3.0, 2.0], [1.75, 0.5],
+])
+
+ROWS = np.array([
+    [0.0, -0.5, 0.5],
+    [1.0, 0.5, 2.0],
+    [3.0, -2.0, 5.0],
+    [np.nan, 0.0, np.nan],  # NaN goes right like in the trees
+])
+
+
+@pytest.fixture(params=BACKENDS, ids=lambda backend: f'{backend[0]}-{backend[1]}')
+def backend(request):
+    name, threads = request.param
+    tree_kernels.set_backend(name, num_threads=threads)
+    yield name
+    tree_kernels.set_backend('auto')
+
+
+def small_ensemble():
+    return TreeEnsemble(FEATURE, THRESHOLD, LEFT, RIGHT, np.zeros(len(FEATURE)), np.array([0, 7]),
+                        np.ones(2), max_depth=3, cover=COVER)
+
+
+def expected_output(x, known, node):
+    """E[output | features in known are x] with cover-weighted branches (path-dependent)"""
+    if LEFT[node] == node:
+        return LEAF_VALUES[node]
+    if FEATURE[node] in known:
+        return expected_output(x, known, LEFT[node] if x[FEATURE[node]] <= THRESHOLD[node] else RIGHT[node])
+    return sum(COVER[child] / COVER[node] * expected_output(x, known, child)
+               for child in (LEFT[node], RIGHT[node]))
+
+
+def brute_force_shap(x):
+    """Shapley values over every coalition of the 3 features, shape (3, 2)"""
+    num_features = 3
+
+    def value(known):
+        return sum(expected_output(x, set(known), root) for root in (0, 7))
+
+    phi = np.zeros((num_features, 2))
+    for i in range(num_features):
+        others = [f for f in range(num_features) if f != i]
+        for size in range(num_features):
+            weight = math.factorial(size) * math.factorial(num_features - size - 1) / math.factorial(num_features)
+            for known in itertools.combinations(others, size):
+                phi[i] += weight * (value(known + (i,)) - value(known))
+    return phi
+
+
+def brute_force_base():
+    """Output with no feature known: the explainer's expected value"""
+    return sum(expected_output(None, set(), root) for root in (0, 7))
+
+
+def test_matches_brute_force(backend):
+    explainer = TreeExplainer(small_ensemble(), LEAF_VALUES)
+    phi = explainer.shap_values(ROWS)
+    for x, row_phi in zip(ROWS, phi):
+        np.testing.assert_allclose(row_phi, brute_force_shap(x), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(explainer.expected_value, brute_force_base(), rtol=1e-12)
+
+
+def test_selected_outputs(backend):
+    explainer = TreeExplainer(small_ensemble(), LEAF_VALUES)
+    np.testing.assert_array_equal(explainer.shap_values(ROWS, outputs=[1])[..., 0],
+                                  explainer.shap_values(ROWS)[..., 1])
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    pytest.importorskip('pyarrow')
+    if not os.path.isdir(os.path.join(MODEL_PATH, 'rf_classifier')):
+        pytest.skip('Spark models folder not available')
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(MODEL_PATH, cache_size=0)
+
+
+def test_local_accuracy(predictor, backend):
+    rng = np.random.default_rng(7)
+    provinces = ['Da Nang', 'Ha Noi', 'An Giang-Chau Doc', 'Atlantis']
+    n = 12
+    times = [f'{rng.integers(1, 13)}/{rng.integers(1, 29)}/2025 {rng.integers(0, 24):02d}:00' for _ in range(n)]
+    rows = [provinces[i % len(provinces)] for i in range(n)]
+    temperatures = np.where(rng.random(n) < 0.3, np.nan, rng.uniform(15, 38, n))
+    batch = predictor.explain_batch(times, rows, temperatures)
+    X = predictor.feature_matrix(times, rows, temperatures)
+
+    # base value + sum(phi) == model output, for every class
+    probabilities = predictor.rf_model.predict_proba(X)[:, :len(predictor.weather_classes)]
+    np.testing.assert_allclose(batch['weather_base'] + batch['weather_shap'].sum(axis=1), probabilities,
+                               rtol=0, atol=1e-12)
+    temperature = batch['temperature_base'] + batch['temperature_shap'].sum(axis=1)
+    np.testing.assert_allclose(temperature, predictor.gbt_model.predict(X), rtol=1e-12)
+
+
+def test_predict_explanation_sums_to_prediction(predictor, backend):
+    result = predictor.predict('6/30/2025 14:00', 'Da Nang', explain=True)
+    weather = result['explanation']['weather']
+    assert weather['class'] == result['weather_main']
+    assert weather['base_value'] + sum(weather['contributions'].values()) == pytest.approx(result['probability'],
+                                                                                         abs=1e-12)
+    temperature = result['explanation']['temperature']
+    assert temperature['base_value'] + sum(temperature['contributions'].values()) == pytest.approx(
+        result['predicted_temp'], rel=1e-12)
@@ -0,0 +1,120 @@
+# ===== tests/test_features.py =====
+# The fused FeatureTransform against recorded inputs of the Spark pipeline it replaces:
+# the createDataFrame dict of weather_models/predict_example.py -> StringIndexer ->
+# VectorAssembler -> StandardScaler (withMean=false)
+#
+# RAW / EXPECTED were recorded once, independently of utils.features: province stats
+# from province_stats.csv (round-trip float parsing), indexer codes from the position
+# of the label in the indexer parquet (handleInvalid=keep: unknown = number of labels,
+# city = part after '-'), unknown provinces with the column means of province_stats.csv,
+# and EXPECTED = RAW * (1 / std) of scaler/data (0 where std == 0), as StandardScalerModel
+# does. day_of_week follows Spark's dayofweek (1 = Sunday), which the models were trained
+# on (predict_example.py's weekday() + 1 comment is off by one).
+
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+MODEL_PATH = 'weather_models'
+
+if not os.path.isdir(os.path.join(MODEL_PATH, 'scaler')):
+    pytest.skip('Spark models folder not available', allow_module_level=True)
+
+# (time, province, temperature, humidity): known / unknown provinces, missing values
+ROWS = [
+    ('6/30/2025 14:00', 'An Giang-Chau Doc', None, None),
+    ('7/1/2025 08:00', 'Da Nang', 28.5, 75.0),
+    ('1/5/2025 03:00', 'Atlantis', 31.5, None),
+    ('12/31/2024 23:00', 'Ha Noi', None, 60.0),
+]
+
+# VectorAssembler output (metadata.json all_features order)
+RAW = np.array([
+    [14.0, 2.0, 6.0, 30.0, 1.0, 60.0, 61.0, 28.53534704429579, 27.53534704429579, 29.53534704429579, 2.0,
+     73.39937562161899, 1007.772669648003, 4.19989461130568, 6.2998419169585205, 50.0, 0.0, 10000.0,
+     28.53534704429579, 28.53534704429579, 2.6633544673015197, 73.39937562161899, 1007.772669648003,
+     4.19989461130568, 28.53534704429579, 28.53534704429579, 73.39937562161899, 1007.772669648003,
+     28.53534704429579, 28.53534704429579, 73.39937562161899, 0.0],
+    [8.0, 3.0, 7.0, 1.0, 1.0, 2.0, 2.0, 28.5, 27.5, 29.5, 2.0, 75.0, 1006.3944760260199, 2.2807724150966964,
+     3.4211586226450446, 50.0, 0.0, 10000.0, 28.5, 28.513087555223304, 2.9617818191040053, 78.61100244166838,
+     1006.3944760260199, 2.2807724150966964, 28.5, 28.5, 75.0, 1006.3944760260199, 28.5, 28.5, 75.0, 0.0],
+    [3.0, 1.0, 1.0, 5.0, 0.0, 78.0, 78.0, 31.5, 30.5, 32.5, 2.0, 81.53397589831523, 1007.1868422033033,
+     2.691129962556635, 4.036694943834952, 50.0, 0.0, 10000.0, 31.5, 27.25940828595719, 2.9604034569801034,
+     81.53397589831523, 1007.1868422033033, 2.691129962556635, 31.5, 31.5, 81.53397589831523,
+     1007.1868422033033, 31.5, 31.5, 81.53397589831523, 0.0],
+    [23.0, 3.0, 12.0, 31.0, 0.0, 3.0, 3.0, 28.322555535485204, 27.322555535485204, 29.322555535485204, 2.0,
+     60.0, 1006.1607407413694, 2.724226570274814, 4.086339855412221, 50.0, 0.0, 10000.0, 28.322555535485204,
+     28.322555535485204, 3.460915884597587, 78.76275132050013, 1006.1607407413694, 2.724226570274814,
+     28.322555535485204, 28.322555535485204, 60.0, 1006.1607407413694, 28.322555535485204, 28.322555535485204,
+     60.0, 0.0],
+])
+
+# StandardScaler output
+EXPECTED = np.array([
+    [2.02575094817612, 1.001531679092262, 5.229739256633679, 3.3264389268890455, 2.0162126831652945,
+     2.6641077303378826, 2.70850952584352, 8.461820477629658, 8.17980684341056, 8.744582785176233,
+     12.336733060929163, 5.752837819429411, 239.3285418379138, 2.2328214487756495, 1.7731917666358148,
+     1.6638869414015558, 0.0, 8.08906779469727, 5.263060412950626, 18.5494168728424, 5.401136286630832,
+     17.857759023856634, 1075.0734818442525, 3.916989416858868, 8.466383483593045, 8.47516373724548,
+     5.752649564146145, 239.48768039385845, 8.637558551092155, 9.07287538977649, 5.914336712908615, 0.0],
+    [1.157571970386354, 1.502297518638393, 6.101362466072626, 0.11088129756296819, 2.0162126831652945,
+     0.08880359101126276, 0.08880359101126295, 8.451338728703266, 8.169306449340354, 8.734117522838456,
+     12.336733060929163, 5.878290282487405, 239.00124474021146, 1.2125441325349227, 0.9629400835756337,
+     1.6638869414015558, 0.0, 8.08906779469727, 5.2565410028569195, 18.53494708063903, 6.00633053265872,
+     19.125725884426195, 1073.60325005442, 2.1271394258676497, 8.455896082421608, 8.464665459878484,
+     5.878097921910419, 239.16016566399617, 8.626859113505537, 9.061636720493976, 6.043310991565109, 0.0],
+    [0.43408948889488275, 0.500765839546131, 0.8716232094389466, 0.5544064878148409, 0.0, 3.4633400494392474,
+     3.463340049439255, 9.340953331724663, 9.06050351654112, 9.622332864144063, 12.336733060929163,
+     6.39040504287505, 239.18941797364232, 1.4307055909603457, 1.136192674860684, 1.6638869414015558, 0.0,
+     8.08906779469727, 5.809861108420806, 17.71999223343291, 6.003535290127196, 19.836873018579126,
+     1074.4485318235763, 2.5098552602607027, 9.34599040688704, 9.355682876707798, 6.390195923906413,
+     239.34846402089292, 9.53494954650612, 10.015493217388078, 6.569802303097242, 0.0],
+    [3.328019414860768, 1.502297518638393, 10.459478513267358, 3.437320224452014, 0.0, 0.13320538651689412,
+     0.13320538651689443, 8.398719666417374, 8.116593787218154, 8.68158122430119, 12.336733060929163,
+     4.702632225989924, 238.94573666132, 1.4483009885676894, 1.1501660331805503, 1.6638869414015558, 0.0,
+     8.08906779469727, 5.223813139577902, 18.41109164421275, 7.0185469485090675, 19.16264574767255,
+     1073.3539055208091, 2.540722478170662, 8.403248645497465, 8.411963423744272, 4.702478337528335,
+     239.10462067569372, 8.573147239967271, 9.005217868722198, 4.834648793252088, 0.0],
+])
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(MODEL_PATH, cache_size=0)
+
+
+def columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+
+def test_fused_matrix_is_bit_identical(predictor):
+    X = predictor.feature_matrix(*columns(ROWS))
+    assert X.dtype == np.float64
+    assert X.shape == (len(ROWS), 32)
+    assert np.array_equal(X, EXPECTED)
+
+
+def test_rows_match_one_by_one(predictor):
+    # predict() builds one row at a time through the same transform
+    for row, expected in zip(ROWS, EXPECTED):
+        assert np.array_equal(predictor.feature_matrix(*columns([row]))[0], expected)
+
+
+def test_missing_values_as_nan(predictor):
+    # NaN means "not given", like None
+    rows = [(time_str, province, np.nan if temperature is None else temperature,
+             np.nan if humidity is None else humidity) for time_str, province, temperature, humidity in ROWS]
+    assert np.array_equal(predictor.feature_matrix(*columns(rows)), EXPECTED)
+
+
+def test_inverse_recovers_the_assembled_row(predictor):
+    X = predictor.feature_matrix(*columns(ROWS))
+    np.testing.assert_allclose(predictor.feature_transform.inverse(X), RAW, rtol=1e-12)
@@ -0,0 +1,41 @@
+# ===== tests/test_observations.py =====
+# Observation timestamps: every accepted form on the same local wall-clock hour axis
+
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from utils.observations import parse_time
+
+HOUR = parse_time('6/30/2025 14:00')
+
+
+@pytest.mark.parametrize('value', [
+    '6/30/2025 14:00',
+    '2025-06-30T14:00',
+    '2025-06-30 14:00:00',
+    '2025-06-30T14:00+07:00',
+    '2025-06-30T14:00:00Z',
+    '2025-06-30T14:59:59-05:00',
+    datetime(2025, 6, 30, 14),
+    datetime(2025, 6, 30, 14, tzinfo=timezone(timedelta(hours=7))),
+    np.datetime64('2025-06-30T14:30'),
+])
+def test_wall_clock_hour(value):
+    # Every form is the local wall-clock hour; an offset never shifts it (nor warns)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert parse_time(value) == HOUR
+
+
+def test_mixed_inputs_share_the_hour_axis():
+    values = ['6/30/2025 13:00', '2025-06-30T14:00+07:00', '2025-06-30T15:00Z', datetime(2025, 6, 30, 16)]
+    assert [parse_time(value) - HOUR for value in values] == [-1, 0, 1, 2]
+    assert HOUR == int((np.datetime64('2025-06-30T14', 'h') - np.datetime64(0, 'h')).astype(np.int64))
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        parse_time('30/06/2025 14:00')
@@ -0,0 +1,167 @@
+# ===== tests/test_tree_parity.py =====
+# The compiled flat-array ensembles (utils.trees) against a plain recursive walk of
+# the Spark node rows in weather_models/, on the NumPy and (if installed) Numba paths.
+# These are self-consistency checks: both sides read the same saved parquet, so a
+# misreading of Spark's format shared by both would pass. They are not parity with
+# Spark's model.transform, which needs pyspark to record.
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from utils import tree_kernels
+from utils.spark_io import read_parquet_dir
+from utils.trees import GBTRegressionModel, RandomForestModel
+
+MODEL_PATH = 'weather_models'
+
+if not os.path.isdir(os.path.join(MODEL_PATH, 'rf_classifier')):
+    pytest.skip('Spark models folder not available', allow_module_level=True)
+
+# Recorded from the recursive reference walk (self-consistency, not Spark output):
+# (time, province, temperature, humidity) -> RF probabilities in weather_classes order
+EXPECTED = {
+    ('6/30/2025 14:00', 'An Giang-Chau Doc', None, None):
+        [0.9556260921004086, 0.024910126004027585, 0.017916322249635647, 0.0011273047553153636,
+         0.0002455794332014185, 0.00017331006176442979, 1.2653956470389745e-06, 0.0],
+    ('1/5/2025 03:00', 'Da Nang', 31.5, 60.0):
+        [0.9548870319753081, 0.03304187991276357, 0.010625120929148123, 0.0007529378923716915,
+         0.0006522372272088321, 3.6199818127094036e-05, 3.4132778477575014e-06, 1.1789672247111527e-06],
+}
+
+# Same rows -> GBT predicted temperature, also from the recursive walk (not Spark output)
+EXPECTED_TEMPERATURE = {
+    ('6/30/2025 14:00', 'An Giang-Chau Doc', None, None): 28.0179469874095,
+    ('1/5/2025 03:00', 'Da Nang', 31.5, 60.0): 31.23425883451938,
+}
+
+BACKENDS = ['numpy'] + (['numba'] if tree_kernels.compiled_kernels() is not None else [])
+
+
+class SparkTrees:
+    """Spark's saved node rows, walked one node at a time like DecisionTreeModel.predict"""
+
+    def __init__(self, model_dir):
+        rows = read_parquet_dir(os.path.join(model_dir, 'data')).to_pylist()
+        self.trees = {}
+        for row in rows:
+            self.trees.setdefault(row['treeID'], {})[row['nodeData']['id']] = row['nodeData']
+        weights = read_parquet_dir(os.path.join(model_dir, 'treesMetadata')).to_pylist()
+        self.weights = {row['treeID']: row['weights'] for row in weights}
+
+    def leaf(self, tree, x, node_id=0):
+        node = self.trees[tree][node_id]
+        if node['leftChild'] < 0:
+            return node
+        split = node['split']
+        # Continuous split: x <= threshold goes left (NaN compares False: right)
+        go_left = x[split['featureIndex']] <= split['leftCategoriesOrThreshold'][0]
+        return self.leaf(tree, x, node['leftChild'] if go_left else node['rightChild'])
+
+    def forest_probability(self, x):
+        """RandomForestClassificationModel: normalized leaf counts summed over trees, normalized"""
+        raw = 0.0
+        for tree in sorted(self.trees):
+            counts = np.asarray(self.leaf(tree, x)['impurityStats'], dtype=np.float64)
+            raw = raw + counts / counts.sum()
+        return raw / raw.sum()
+
+    def gbt_prediction(self, x):
+        """GBTRegressionModel: weighted sum of the leaf predictions, in tree order"""
+        return sum(self.weights[tree] * self.leaf(tree, x)['prediction'] for tree in sorted(self.trees))
+
+
+@pytest.fixture(scope='module')
+def spark_forest():
+    return SparkTrees(os.path.join(MODEL_PATH, 'rf_classifier'))
+
+
+@pytest.fixture(scope='module')
+def spark_gbt():
+    return SparkTrees(os.path.join(MODEL_PATH, 'gbt_regressor'))
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    import contextlib
+    import io
+
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(MODEL_PATH, cache_size=0)
+
+
+@pytest.fixture(scope='module')
+def rows(predictor):
+    """Real model inputs (known / unknown provinces, given / missing values) + random scaled rows"""
+    times = ['6/30/2025 14:00', '1/5/2025 03:00', '8/17/2025 22:00', '6/30/2025 14:00', '3/1/2025 09:00']
+    provinces = ['An Giang-Chau Doc', 'Da Nang', 'Ha Noi', 'Atlantis', 'Can Tho']
+    X = predictor.feature_matrix(times, provinces, [None, 31.5, 18.0, None, np.nan], [None, 60, None, 90, 100])
+    random = np.random.default_rng(0).normal(0, 2, (40, X.shape[1]))
+    random[::7, 7] = np.nan
+    return np.vstack([X, random])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    tree_kernels.set_backend(request.param)
+    yield request.param
+    tree_kernels.set_backend('auto')
+
+
+def test_forest_matches_recursive_walk(rows, spark_forest, backend):
+    model = RandomForestModel.load(os.path.join(MODEL_PATH, 'rf_classifier'))
+    expected = np.array([spark_forest.forest_probability(x) for x in rows])
+    # Batches below and above RandomForestModel.small_batch take different NumPy paths
+    np.testing.assert_allclose(model.predict_proba(rows[:3]), expected[:3], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(model.predict_proba(np.tile(rows, (2, 1))), np.tile(expected, (2, 1)),
+                               rtol=0, atol=1e-12)
+
+
+def test_forest_leaves_match_recursive_walk(rows, spark_forest, backend):
+    ensemble = RandomForestModel.load(os.path.join(MODEL_PATH, 'rf_classifier')).ensemble
+    leaves = ensemble.apply(rows)
+    for tree in range(ensemble.num_trees):
+        expected = [ensemble.roots[tree] + spark_forest.leaf(tree, x)['id'] for x in rows]
+        assert leaves[:, tree].tolist() == expected
+
+
+def test_stored_predictions(predictor, spark_forest, backend):
+    """Self-consistency: EXPECTED was recorded from SparkTrees, not from Spark's transform"""
+    for (time_str, province, temperature, humidity), probabilities in EXPECTED.items():
+        batch = predictor.predict_batch([time_str], [province], [temperature], [humidity])
+        np.testing.assert_allclose(batch['probabilities'][0], probabilities, rtol=0, atol=1e-12)
+
+        x = predictor.feature_matrix([time_str], [province], [temperature], [humidity])[0]
+        # The forest has one count column per label index, the predictor one per weather class
+        reference = spark_forest.forest_probability(x)
+        np.testing.assert_allclose(reference[:len(probabilities)], probabilities, rtol=0, atol=1e-12)
+        assert not reference[len(probabilities):].any()
+
+
+def test_gbt_matches_recursive_walk(rows, spark_gbt, backend):
+    """Self-consistency: the compiled GBT against SparkTrees over the same parquet"""
+    model = GBTRegressionModel.load(os.path.join(MODEL_PATH, 'gbt_regressor'))
+    ensemble = model.ensemble
+    expected = np.array([spark_gbt.gbt_prediction(x) for x in rows])
+    # Numba sums in the same tree order; NumPy's matmul may round the last bits differently
+    np.testing.assert_allclose(model.predict(rows), expected, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(model.predict(np.tile(rows, (8, 1))), np.tile(expected, 8), rtol=0, atol=1e-10)
+
+    leaves = ensemble.apply(rows)
+    for tree in range(ensemble.num_trees):
+        assert leaves[:, tree].tolist() == [ensemble.roots[tree] + spark_gbt.leaf(tree, x)['id'] for x in rows]
+
+
+def test_stored_temperatures(predictor, spark_gbt, backend):
+    """Self-consistency: EXPECTED_TEMPERATURE was recorded from SparkTrees, not from Spark's transform"""
+    for (time_str, province, temperature, humidity), predicted in EXPECTED_TEMPERATURE.items():
+        batch = predictor.predict_batch([time_str], [province], [temperature], [humidity])
+        assert batch['predicted_temp'][0] == pytest.approx(predicted, rel=0, abs=1e-10)
+
+        x = predictor.feature_matrix([time_str], [province], [temperature], [humidity])[0]
+        assert spark_gbt.gbt_prediction(x) == pytest.approx(predicted, rel=0, abs=1e-10)
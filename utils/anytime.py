@@ -0,0 +1,372 @@
+# ===== utils/anytime.py =====
+# Anytime / early-exit Random Forest inference
+#
+# Trees are evaluated chunk by chunk in an order chosen offline (greedy, on a
+# selection CSV). After every chunk, rows whose leading class can no longer be
+# overtaken by the remaining trees stop; a deadline stops every row early.
+#
+# "Can no longer flip" is exact: every remaining tree adds at least its
+# smallest leaf probability to the leading class and at most its largest leaf
+# probability to any other class, so early-exit rows get the same class as the
+# full forest (the probabilities are those of the trees evaluated so far).
+#
+# Usage:
+#   python -m utils.anytime order weather_models selection.csv
+#   python -m utils.anytime report weather_models validation.csv --budget-ms 0.5 1 --output anytime_report.json
+#   predictor.predict('6/30/2025 14:00', 'Ha Noi', early_exit=True, budget_ms=2)
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from utils import tree_kernels
+from utils.trees import RandomForestModel, TreeEnsemble, _as_matrix
+
+# Tree order file, next to the model (see order_trees)
+ORDER_FILENAME = 'tree_order.json'
+
+# Trees evaluated between two exit checks
+CHUNK_TREES = 10
+
+
+def order_path(model_path):
+    """<model folder>/tree_order.json (model_path may be a bundle file)"""
+    folder = os.path.dirname(model_path) if os.path.isfile(model_path) else model_path
+    return os.path.join(folder, ORDER_FILENAME)
+
+
+def read_order(model_path, model_version):
+    """Saved tree order, or None when missing or written for another model version"""
+    path = order_path(model_path)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('model_version') != model_version:
+        return None
+    return saved['order']
+
+
+class AnytimeForest:
+    """
+    Early-exit evaluation of a RandomForestModel
+
+    With Numba (utils.tree_kernels) one kernel walks the ordered trees and
+    checks every row after each chunk; the NumPy path evaluates chunk views of
+    the ensemble (same node arrays, a subset of roots) on the rows still active.
+    """
+
+    def __init__(self, model, order=None, chunk_trees=CHUNK_TREES):
+        """
+        Args:
+            model: RandomForestModel
+            order: Tree indices in evaluation order (default: saved order of the trees)
+            chunk_trees: Trees evaluated between two exit checks
+        """
+        ensemble = model.ensemble
+        order = np.arange(ensemble.num_trees) if order is None else np.asarray(order, dtype=np.intp)
+        if sorted(order.tolist()) != list(range(ensemble.num_trees)):
+            raise ValueError("Tree order must be a permutation of every tree")
+        self.model = model
+        self.order = order
+        self.num_trees = ensemble.num_trees
+        self.roots = np.ascontiguousarray(ensemble.roots[order], dtype=np.intp)
+        self.chunk_starts = np.r_[np.arange(0, self.num_trees, chunk_trees), self.num_trees].astype(np.intp)
+
+        self.chunks = [
+            RandomForestModel(TreeEnsemble(
+                feature=ensemble.feature, threshold=ensemble.threshold, left=ensemble.left,
+                right=ensemble.right, value=ensemble.value, roots=self.roots[start:end],
+                tree_weights=ensemble.tree_weights[order[start:end]], max_depth=ensemble.max_depth,
+                children=ensemble.children
+            ), model.leaf_probability)
+            for start, end in zip(self.chunk_starts[:-1], self.chunk_starts[1:])
+        ]
+
+        # Per tree, smallest / largest leaf probability of every class (nodes of a tree are contiguous)
+        index = np.arange(ensemble.num_nodes)
+        is_leaf = (ensemble.left == index)[:, None]
+        probability = model.leaf_probability.astype(np.float64)
+        starts = np.asarray(ensemble.roots, dtype=np.intp)
+        tree_max = np.maximum.reduceat(np.where(is_leaf, probability, -np.inf), starts, axis=0)[order]
+        tree_min = np.minimum.reduceat(np.where(is_leaf, probability, np.inf), starts, axis=0)[order]
+
+        # remaining_*[c]: sum over the trees of chunks c.. (last row: nothing left), in leaf_probability units
+        self.remaining_max = np.array([tree_max[start:].sum(axis=0) for start in self.chunk_starts])
+        self.remaining_min = np.array([tree_min[start:].sum(axis=0) for start in self.chunk_starts])
+
+    @property
+    def num_chunks(self):
+        return len(self.chunks)
+
+    def predict_raw(self, X, early_exit=True, deadline=None):
+        """
+        Partial sums of per-tree class probabilities
+
+        Args:
+            X: Scaled feature matrix
+            early_exit: Stop rows whose class is settled
+            deadline: time.perf_counter() value after which no further chunk starts
+                      (the first chunk always runs)
+
+        Returns:
+            tuple: raw votes (n, num_classes), trees used per row (n,)
+        """
+        X = _as_matrix(X)
+        raw = np.zeros((len(X), self.model.num_classes))
+        trees_used = np.zeros(len(X), dtype=np.intp)
+
+        kernels = tree_kernels.compiled_kernels()
+        if kernels is not None:
+            self._run_kernel(kernels[3], X, early_exit, deadline, raw, trees_used)
+        elif len(X) < self.model.small_batch:
+            self._run_small(X, early_exit, raw, trees_used)
+        else:
+            self._run_chunks(X, early_exit, deadline, raw, trees_used)
+
+        if self.model.probability_scale != 1.0:
+            raw *= self.model.probability_scale
+        return raw, trees_used
+
+    def _run_kernel(self, kernel, X, early_exit, deadline, raw, trees_used):
+        ensemble = self.model.ensemble
+        done = np.zeros(len(X), dtype=np.bool_)
+        args = (X, ensemble._feature, ensemble.threshold, ensemble.children, self.roots, ensemble.max_depth,
+                self.model.leaf_probability, self.chunk_starts)
+        bounds = (self.remaining_min, self.remaining_max, early_exit, raw, trees_used, done)
+        if deadline is None:
+            tree_kernels.run_blocks(kernel, len(X), *args, 0, self.num_chunks, *bounds, outputs=3)
+            return
+        # One call per chunk so the deadline is checked in between
+        for c in range(self.num_chunks):
+            if c and time.perf_counter() >= deadline:
+                break
+            tree_kernels.run_blocks(kernel, len(X), *args, c, c + 1, *bounds, outputs=3)
+
+    def _run_chunks(self, X, early_exit, deadline, raw, trees_used):
+        active = np.arange(len(X))
+        votes = np.zeros_like(raw)  # raw of the active rows, compacted with X
+        for c, chunk in enumerate(self.chunks):
+            if c and deadline is not None and time.perf_counter() >= deadline:
+                break
+            votes += chunk._vote(X)
+            trees_used[active] += chunk.ensemble.num_trees
+
+            if early_exit and c + 1 < self.num_chunks:
+                settled = self._settled(votes, c + 1)
+                if np.any(settled):
+                    raw[active[settled]] = votes[settled]
+                    keep = ~settled
+                    active, X, votes = active[keep], X[keep], votes[keep]
+                    if not len(active):
+                        return
+        raw[active] = votes
+
+    def _run_small(self, X, early_exit, raw, trees_used):
+        # A few rows on NumPy: a chunk costs as much as the whole forest (per-call
+        # overhead), so every tree is walked at once and each row keeps the sums
+        # up to the chunk where it settles (no deadline: this is a single step)
+        leaves = self.model.ensemble.apply(X)[:, self.order]
+        sums = np.add.reduceat(self.model.leaf_probability[leaves], self.chunk_starts[:-1], axis=1, dtype=np.float64)
+        totals = np.cumsum(sums, axis=1)  # (rows, chunks, classes): votes after each chunk
+
+        exit_chunk = np.full(len(X), self.num_chunks - 1)
+        if early_exit and self.num_chunks > 1:
+            # _settled for every chunk boundary at once
+            votes = totals[:, :-1]
+            chunks = np.arange(self.num_chunks - 1)
+            top = np.argmax(votes, axis=2)[..., None]
+            floor = np.take_along_axis(votes, top, axis=2)[..., 0] + self.remaining_min[chunks + 1, top[..., 0]]
+            ceiling = votes + self.remaining_max[1:-1]
+            np.put_along_axis(ceiling, top, -np.inf, axis=2)
+            settled = floor > ceiling.max(axis=2)
+            exit_chunk = np.where(settled.any(axis=1), np.argmax(settled, axis=1), exit_chunk)
+        raw[:] = totals[np.arange(len(X)), exit_chunk]
+        trees_used[:] = self.chunk_starts[exit_chunk + 1]
+
+    def _settled(self, votes, next_chunk):
+        """Rows whose leading class the trees of chunks next_chunk.. cannot overtake"""
+        rows = np.arange(len(votes))
+        top = np.argmax(votes, axis=1)
+        floor = votes[rows, top] + self.remaining_min[next_chunk][top]
+        ceiling = votes + self.remaining_max[next_chunk]
+        ceiling[rows, top] = -np.inf
+        return floor > ceiling.max(axis=1)
+
+    def predict_proba(self, X, early_exit=True, deadline=None):
+        """Class probabilities from the evaluated trees, and trees used per row"""
+        raw, trees_used = self.predict_raw(X, early_exit, deadline)
+        totals = raw.sum(axis=1, keepdims=True)
+        return np.divide(raw, totals, out=np.zeros_like(raw), where=totals != 0), trees_used
+
+
+def order_trees(model, X, target):
+    """Greedy order of every tree (see utils.variants.select_trees): strong trees vote first"""
+    from utils.variants import select_trees
+
+    return select_trees(model, X, target, model.ensemble.num_trees)
+
+
+def evaluate(forest, X, full_predicted, target=None, budget_ms=None, repeat=3, single_rows=300):
+    """
+    Average trees evaluated, agreement with the full forest, batch throughput and
+    single-row latency of one anytime setting (budget_ms is per call)
+    """
+    def deadline():
+        return time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+
+    forest.predict_raw(X[:1000])  # warm-up
+    batch_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        raw, trees_used = forest.predict_raw(X, deadline=deadline())
+        batch_seconds = min(batch_seconds, time.perf_counter() - start)
+    predicted = np.argmax(raw, axis=1)
+
+    latencies = np.empty(min(single_rows, len(X)))
+    single_trees = np.empty(len(latencies))
+    for i in range(len(latencies)):
+        start = time.perf_counter()
+        _, used = forest.predict_raw(X[i:i + 1], deadline=deadline())
+        latencies[i] = time.perf_counter() - start
+        single_trees[i] = used[0]
+
+    result = {
+        'budget_ms': budget_ms,
+        'mean_trees': float(trees_used.mean()),
+        'mean_trees_single': float(single_trees.mean()),
+        'agreement': float(np.mean(predicted == full_predicted)),
+        'rows_per_second': len(X) / batch_seconds,
+        'single_p50_us': float(np.median(latencies) * 1e6),
+    }
+    if target is not None:
+        result['accuracy'] = float(np.mean(predicted == target))
+    return result
+
+
+def _full_forest(model, X, repeat=3, single_rows=300):
+    model.predict_raw(X[:1000])
+    batch_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        raw = model.predict_raw(X)
+        batch_seconds = min(batch_seconds, time.perf_counter() - start)
+    latencies = np.empty(min(single_rows, len(X)))
+    for i in range(len(latencies)):
+        start = time.perf_counter()
+        model.predict_raw(X[i:i + 1])
+        latencies[i] = time.perf_counter() - start
+    return np.argmax(raw, axis=1), len(X) / batch_seconds, float(np.median(latencies) * 1e6)
+
+
+def report(model_path, validation_path, budgets=(), chunk_trees=CHUNK_TREES, label_column='weather_main'):
+    """
+    Anytime inference vs the full forest on a validation CSV
+
+    Returns:
+        dict: full-forest figures plus one entry per setting (early exit, then each budget)
+    """
+    from utils.variants import _load_rows, _predictor
+
+    predictor = _predictor(model_path)
+    X, target = _load_rows(predictor, validation_path, label_column)
+    model = predictor.rf_model
+    num_classes = len(predictor.weather_classes)
+    forest = AnytimeForest(model, read_order(model_path, predictor.model_version), chunk_trees)
+
+    full_predicted, rows_per_second, single_p50_us = _full_forest(model, X)
+    full_predicted = np.minimum(full_predicted, num_classes - 1)
+    full = {'trees': model.ensemble.num_trees, 'rows_per_second': rows_per_second, 'single_p50_us': single_p50_us}
+    if target is not None:
+        full['accuracy'] = float(np.mean(full_predicted == target))
+
+    settings = {'early_exit': evaluate(forest, X, full_predicted, target)}
+    for budget_ms in budgets:
+        settings[f'budget_{budget_ms:g}ms'] = evaluate(forest, X, full_predicted, target, budget_ms)
+    for result in settings.values():
+        result['speedup'] = result['rows_per_second'] / rows_per_second
+
+    return {
+        'validation': validation_path,
+        'rows': len(X),
+        'backend': tree_kernels.active_backend(),
+        'tree_order': 'saved' if forest.order.tolist() != list(range(forest.num_trees)) else 'index',
+        'chunk_trees': chunk_trees,
+        'full': full,
+        'settings': settings,
+    }
+
+
+def save_order(args):
+    from utils.variants import _load_rows, _predictor
+
+    predictor = _predictor(args.model_path)
+    model = predictor.rf_model
+    X, target = _load_rows(predictor, args.selection, args.label_column, args.selection_rows)
+    if target is None:
+        target = model.predict(X)  # agreement with the full forest
+    order = order_trees(model, X, target)
+
+    path = order_path(args.model_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_version': predictor.model_version,
+            'order': [int(t) for t in order],
+            'selection': os.path.basename(args.selection),
+            'rows': len(X),
+        }, f)
+    print(f"✅ Wrote {path} (first trees: {order[:10]})")
+
+
+def print_report(args):
+    result = report(args.model_path, args.validation, args.budget_ms, args.chunk_trees, args.label_column)
+    full = result['full']
+    print(f"Validation {result['rows']} rows, backend {result['backend']}, "
+          f"{result['tree_order']} tree order, exit check every {result['chunk_trees']} trees")
+    print(f"{'setting':16s} {'trees':>6s} {'1-row':>6s} {'agree':>7s} {'acc':>7s} {'rows/s':>9s} {'x':>5s} "
+          f"{'1-row µs':>8s}")
+    accuracy = f"{full['accuracy']:7.2%}" if 'accuracy' in full else f"{'-':>7s}"
+    print(f"{'full':16s} {full['trees']:6d} {full['trees']:6d} {1:7.2%} {accuracy} "
+          f"{full['rows_per_second']:9.0f} {1:5.2f} {full['single_p50_us']:8.0f}")
+    for name, m in result['settings'].items():
+        accuracy = f"{m['accuracy']:7.2%}" if 'accuracy' in m else f"{'-':>7s}"
+        print(f"{name:16s} {m['mean_trees']:6.1f} {m['mean_trees_single']:6.1f} {m['agreement']:7.2%} {accuracy} "
+              f"{m['rows_per_second']:9.0f} {m['speedup']:5.2f} {m['single_p50_us']:8.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Saved {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Anytime / early-exit Random Forest inference')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    order_parser = commands.add_parser('order', help='Choose and save the tree evaluation order')
+    order_parser.add_argument('model_path', nargs='?', default='weather_models')
+    order_parser.add_argument('selection', help='CSV the order is chosen on')
+    order_parser.add_argument('--selection-rows', type=int, default=20_000)
+    order_parser.add_argument('--label-column', default='weather_main')
+
+    report_parser = commands.add_parser('report', help='Trees evaluated / agreement with the full forest')
+    report_parser.add_argument('model_path', nargs='?', default='weather_models')
+    report_parser.add_argument('validation')
+    report_parser.add_argument('--budget-ms', type=float, nargs='*', default=[],
+                               help='Also measure these per-call time budgets')
+    report_parser.add_argument('--chunk-trees', type=int, default=CHUNK_TREES)
+    report_parser.add_argument('--label-column', default='weather_main')
+    report_parser.add_argument('--output', help='Write the report as JSON')
+
+    args = parser.parse_args()
+    if args.command == 'order':
+        save_order(args)
+    else:
+        print_report(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# ===== utils/app_cache.py =====
+# Streamlit resources shared by app.py and the pages/ scripts
+
+import os
+
+import streamlit as st
+
+from utils.history import PredictionHistory
+from utils.observations import DirectoryTailer, ObservationStore
+from utils.registry import ModelRegistry
+
+# Observation files (JSON lines / CSV) tailed for live lag features, if the folder exists
+OBSERVATIONS_DIR = 'observations'
+# Versioned models root watched for new versions (see utils.registry); the flat folder otherwise
+MODELS_ROOT = 'models' if os.path.isdir('models') else 'weather_models'
+# Every prediction of every session is logged here (utils.history, pages/2_Prediction_History.py)
+HISTORY_DIR = 'prediction_history'
+
+
+@st.cache_resource
+def load_registry():
+    # Shared by all sessions and pages: the prediction cache is thread-safe
+    live = os.path.isdir(OBSERVATIONS_DIR)
+    # lazy: pages render (provinces, classes) while the forest is still decoding
+    registry = ModelRegistry(MODELS_ROOT, lazy=True, prewarm_cache=not live)  # the cache is bypassed with live data
+    
+    if live:
+        store = ObservationStore(registry.current.province_table)
+        DirectoryTailer(store, OBSERVATIONS_DIR, f'{OBSERVATIONS_DIR}/state.npz').start()
+        registry.current.attach_observations(store)  # carried over to later versions
+    
+    # Input drift of the app's predictions against the training distribution (utils.drift)
+    registry.current.enable_drift_monitor()
+    registry.current.attach_history(load_history())  # carried over to later versions
+    
+    return registry.start()
+
+
+@st.cache_resource
+def load_history():
+    # One writer per folder: shared by all sessions, flushed and compacted in the background
+    return PredictionHistory(HISTORY_DIR).start()
+
+
+def load_predictor():
+    # The live version: a rerun after a swap picks up the new predictor
+    return load_registry().current
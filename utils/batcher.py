@@ -0,0 +1,184 @@
+# ===== utils/batcher.py =====
+# Request micro-batching: concurrent callers are scored together in one predict_batch call
+
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LatencyStats:
+    """Bounded window of latency samples and batch sizes"""
+
+    def __init__(self, window=10000):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+
+    def record_batch(self, rows):
+        self.batches += 1
+        self.rows += rows
+        self.batch_sizes.append(rows)
+
+    def record_request(self, latency_ms):
+        self.requests += 1
+        self.latencies_ms.append(latency_ms)
+
+    def summary(self):
+        latencies = np.fromiter(self.latencies_ms, dtype=np.float64)
+        sizes = np.fromiter(self.batch_sizes, dtype=np.float64)
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'rows': self.rows,
+            'latency_ms': {
+                'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'max': float(latencies.max()) if len(latencies) else None,
+            },
+            'batch_size': {
+                'mean': float(sizes.mean()) if len(sizes) else None,
+                'p50': float(np.percentile(sizes, 50)) if len(sizes) else None,
+                'max': int(sizes.max()) if len(sizes) else None,
+            },
+        }
+
+
+def validate_rows(times, provinces, temperatures=None, humidities=None):
+    """
+    Check one request's columns and parse its times
+
+    Returns:
+        tuple: (datetime64[m] times, provinces, temperatures, humidities) lists of equal length
+
+    Raises:
+        ValueError: Columns that are not lists of the same length, unparseable times,
+                    non-numeric temperatures / humidities
+    """
+    from utils.predictor import WeatherPredictor
+
+    columns = {'time': times, 'province': provinces, 'temperature': temperatures, 'humidity': humidities}
+    for name, values in columns.items():
+        if values is not None and (isinstance(values, (str, bytes, dict)) or not hasattr(values, '__len__')):
+            raise ValueError(f"'{name}' must be a list")
+    n = len(times)
+    for name, values in columns.items():
+        if values is not None and len(values) != n:
+            raise ValueError(f"'{name}' has {len(values)} values, 'time' has {n}")
+
+    try:
+        parsed = WeatherPredictor._to_datetime64(list(times))
+        numbers = [np.array(values, dtype=np.float64) if values is not None else np.full(n, np.nan)  # None -> NaN
+                   for values in (temperatures, humidities)]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value: {e}") from None
+    if parsed.ndim != 1 or any(values.ndim != 1 for values in numbers):
+        raise ValueError("Values must not be nested lists")
+    return list(parsed), [str(province) for province in provinces], numbers[0].tolist(), numbers[1].tolist()
+
+
+class MicroBatcher:
+    """
+    Collect concurrent prediction requests and score them in one vectorized call
+
+    A batch is closed when it reaches max_batch_size rows or when the first
+    request in it has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(self, predictor, max_batch_size=1024, max_wait_ms=5.0):
+        """
+        Args:
+            predictor: WeatherPredictor
+            max_batch_size: Maximum rows scored in one predict_batch call
+            max_wait_ms: Latency budget spent waiting for more requests
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.stats = LatencyStats()
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, times, provinces, temperatures=None, humidities=None):
+        """
+        Queue rows for scoring and wait for their results
+
+        Raises:
+            ValueError: Malformed rows (checked before queuing: they never reach a shared batch)
+
+        Returns:
+            dict of arrays for these rows (same keys as predict_batch)
+        """
+        rows = validate_rows(times, provinces, temperatures, humidities)
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self._queue.put((rows, future))
+        result = await future
+        self.stats.record_request((time.perf_counter() - start) * 1000)
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0][0])
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0][0])
+
+            await self._score(loop, pending)
+
+    async def _score(self, loop, pending):
+        columns = [[], [], [], []]
+        for rows, _ in pending:
+            for column, values in zip(columns, rows):
+                column.extend(values)
+
+        self.stats.record_batch(len(columns[0]))
+        try:
+            # Score off the event loop so new requests keep being accepted
+            result = await loop.run_in_executor(None, self.predictor.predict_batch, *columns)
+        except Exception as e:
+            if len(pending) == 1:
+                if not pending[0][1].done():
+                    pending[0][1].set_exception(e)
+                return
+            # One request spoiled the batch: score each on its own so only it fails
+            for item in pending:
+                await self._score(loop, [item])
+            return
+
+        start = 0
+        for rows, future in pending:
+            stop = start + len(rows[0])
+            if not future.done():
+                future.set_result({
+                    key: value[start:stop] if isinstance(value, np.ndarray) else value
+                    for key, value in result.items()
+                })
+            start = stop
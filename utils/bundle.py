@@ -0,0 +1,272 @@
+# ===== utils/bundle.py =====
+# Single-file model bundle: fixed-layout NumPy arrays + JSON header, opened with np.memmap
+#
+# Layout:
+#   magic (8 bytes) | format version (uint32) | reserved (uint32) | header size (uint64)
+#   header (UTF-8 JSON) | arrays, each starting on a 64-byte boundary
+#
+# The header records a fingerprint of the Spark files it was exported from: a bundle
+# next to Spark models that changed since is stale (bundle_is_stale).
+#
+# Usage:
+#   python -m utils.bundle weather_models        # -> weather_models/model.bundle
+
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+BUNDLE_MAGIC = b'WXMODEL\0'
+BUNDLE_VERSION = 1
+BUNDLE_FILENAME = 'model.bundle'
+# Reduced model variants (utils/variants.py): <model_path>/variants/<name>.bundle
+VARIANTS_DIR = 'variants'
+
+_PREAMBLE = struct.Struct('<8sIIQ')
+_ALIGNMENT = 64
+
+_ENSEMBLE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'tree_weights', 'children')
+# Written when the ensemble has them (older bundles / reduced variants do not)
+_OPTIONAL_ENSEMBLE_ARRAYS = ('cover',)
+
+# Spark models folder entries a bundle is exported from
+SOURCE_ENTRIES = ('metadata.json', 'province_stats.csv', 'rf_classifier', 'gbt_regressor', 'kmeans_clustering',
+                  'scaler', 'province_indexer', 'city_indexer', 'weather_indexer')
+# Files up to this size are hashed (metadata, CSV, the .crc checksums of the parquet
+# files); larger ones only by size
+_HASHED_SIZE = 64 * 1024
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def variant_path(model_path, name):
+    """Bundle file of the reduced variant `name` saved next to the models in model_path"""
+    return os.path.join(model_path, VARIANTS_DIR, f'{name}.bundle')
+
+
+def source_fingerprint(model_path):
+    """
+    Content fingerprint of the Spark models in a folder
+
+    Independent of file times, so a copy or checkout of the same models matches.
+
+    Returns:
+        str or None: Hex digest, None if the folder holds no Spark models
+    """
+    if not os.path.isdir(os.path.join(model_path, 'rf_classifier')):
+        return None
+    digest = hashlib.sha256()
+    for entry in SOURCE_ENTRIES:
+        path = os.path.join(model_path, entry)
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+        for file in files:
+            size = os.path.getsize(file)
+            digest.update(f'{os.path.relpath(file, model_path)}\0{size}\0'.encode('utf-8'))
+            if size <= _HASHED_SIZE:
+                with open(file, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def bundle_is_stale(bundle_path, model_path):
+    """
+    Whether a bundle was exported from other Spark models than the ones in model_path
+
+    Bundles without a recorded fingerprint (older exports) count as stale when
+    Spark models are present; a folder holding only the bundle never is.
+    """
+    fingerprint = source_fingerprint(model_path)
+    if fingerprint is None:
+        return False
+    return ModelBundle(bundle_path).header.get('source_fingerprint') != fingerprint
+
+
+def write_bundle(path, header, arrays):
+    """
+    Write a bundle file
+
+    Args:
+        path: Output file
+        header: JSON-serializable dict (array table is added under 'arrays')
+        arrays: dict name -> np.ndarray
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # The array offsets depend on the header size and vice versa: grow until stable
+    header = dict(header, arrays={})
+    data_start = 0
+    while True:
+        table = {}
+        offset = data_start
+        for name, array in arrays.items():
+            table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _align(offset + array.nbytes)
+        header['arrays'] = table
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        needed = _align(_PREAMBLE.size + len(header_bytes))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(table[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+class ModelBundle:
+    """
+    Read-only view of a bundle file
+
+    Arrays are views into one np.memmap of the file, so opening is
+    O(header size) and worker processes share the same page-cache pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, _, header_size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"'{path}' is not a model bundle")
+            if version != BUNDLE_VERSION:
+                raise ValueError(f"Unsupported bundle version {version} (expected {BUNDLE_VERSION})")
+            self.header = json.loads(f.read(header_size).decode('utf-8'))
+
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            self.arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=spec['offset']
+            ).reshape(spec['shape'])
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def ensemble(self, prefix):
+        """Rebuild a TreeEnsemble from '<prefix>/...' arrays (no copies)"""
+        from utils.trees import TreeEnsemble
+
+        params = {name: self.arrays[f'{prefix}/{name}'] for name in _ENSEMBLE_ARRAYS}
+        for name in _OPTIONAL_ENSEMBLE_ARRAYS:
+            params[name] = self.arrays.get(f'{prefix}/{name}')
+        return TreeEnsemble(max_depth=self.header[prefix]['max_depth'], **params)
+
+
+def _ensemble_arrays(prefix, ensemble):
+    arrays = {f'{prefix}/{name}': getattr(ensemble, name) for name in _ENSEMBLE_ARRAYS}
+    for name in _OPTIONAL_ENSEMBLE_ARRAYS:
+        if getattr(ensemble, name) is not None:
+            arrays[f'{prefix}/{name}'] = getattr(ensemble, name)
+    return arrays
+
+
+def export_bundle(model_path='weather_models', out_path=None):
+    """
+    Convert a Spark weather_models folder into one bundle file
+
+    Packs RF, GBT, KMeans, scaler, the three StringIndexers, province
+    stats, metadata.json and the province cluster priors.
+
+    Args:
+        model_path: Folder with the Spark models
+        out_path: Output file (default: <model_path>/model.bundle)
+
+    Returns:
+        str: Path of the written bundle
+    """
+    from utils.province_table import ProvinceTable
+    from utils.spark_io import read_kmeans_centers, read_model_metadata, read_scaler, read_string_indexer_labels
+    from utils.trees import GBTRegressionModel, RandomForestModel
+
+    if out_path is None:
+        out_path = os.path.join(model_path, BUNDLE_FILENAME)
+
+    with open(os.path.join(model_path, 'metadata.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    labels = {
+        name: read_string_indexer_labels(os.path.join(model_path, f'{name}_indexer'))
+        for name in ('province', 'city', 'weather')
+    }
+
+    table = ProvinceTable.read_csv(
+        os.path.join(model_path, 'province_stats.csv'), labels['province'], labels['city']
+    )
+
+    rf_model = RandomForestModel.load(os.path.join(model_path, 'rf_classifier'))
+    gbt_model = GBTRegressionModel.load(os.path.join(model_path, 'gbt_regressor'))
+    mean, std, with_mean, with_std = read_scaler(os.path.join(model_path, 'scaler'))
+
+    arrays = {}
+    arrays.update(_ensemble_arrays('rf', rf_model.ensemble))
+    arrays['rf/leaf_probability'] = rf_model.leaf_probability
+    arrays.update(_ensemble_arrays('gbt', gbt_model.ensemble))
+    arrays['kmeans/centers'] = read_kmeans_centers(os.path.join(model_path, 'kmeans_clustering'))
+    arrays['scaler/mean'] = mean
+    arrays['scaler/std'] = std
+    arrays['province/province_codes'] = table.province_codes
+    arrays['province/city_codes'] = table.city_codes
+    for name, column in table.columns.items():
+        arrays[f'province/{name}'] = column
+
+    header = {
+        'model_version': str(read_model_metadata(os.path.join(model_path, 'rf_classifier'))['timestamp']),
+        'source_fingerprint': source_fingerprint(model_path),
+        'metadata': metadata,
+        'labels': labels,
+        'provinces': table.names,
+        'province_columns': list(table.columns),
+        'scaler': {'with_mean': with_mean, 'with_std': with_std},
+        'rf': {'max_depth': rf_model.ensemble.max_depth},
+        'gbt': {'max_depth': gbt_model.ensemble.max_depth},
+    }
+
+    write_bundle(out_path, header, arrays)
+
+    # Cluster priors are scored with the models: load the bundle just written, then add them
+    header['clusters'], cluster_arrays = _cluster_priors(out_path)
+    arrays.update(cluster_arrays)
+    write_bundle(out_path, header, arrays)
+    return out_path
+
+
+def _cluster_priors(bundle_path):
+    """(header entry, arrays) of the province clusters and their priors"""
+    import contextlib
+    import io
+
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor = WeatherPredictor(bundle_path, cache_size=0)
+    predictor._ensure_clusters()
+    clusters, priors = predictor.province_clusters, predictor.cluster_priors
+    return {'columns': list(clusters.columns), 'source': clusters.source}, {
+        'clusters/centers': clusters.centers,
+        'clusters/mean': clusters.mean,
+        'clusters/std': clusters.std,
+        'clusters/priors': priors.probabilities,
+        'clusters/temperature': priors.temperature,
+    }
+
+
+if __name__ == '__main__':
+    path = export_bundle(*sys.argv[1:3])
+    print(f"✅ Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
@@ -0,0 +1,260 @@
+# ===== utils/clusters.py =====
+# Province clusters (KMeans) and cluster x month x hour priors, used as an instant fallback
+#
+# The fallback answers from precomputed tables (no trees) for:
+#   - provinces the models do not know: assigned to the nearest centroid using whatever
+#     statistics exist (running stats of ingested observations, the given temperature / humidity)
+#   - calls the full model cannot serve within its latency budget (LatencyBudget)
+
+import threading
+import time
+
+import numpy as np
+
+# Province statistics the clusters are built on (z-scored across provinces)
+CLUSTER_COLUMNS = (
+    'avg_temp_province', 'std_temp_province', 'avg_humidity_province',
+    'std_humidity_province', 'avg_pressure_province', 'avg_wind_province',
+)
+
+# Priors are scored on the 15th of every month of this year (the training data is June 2025)
+PRIOR_YEAR = 2025
+
+
+def nearest_centroid(points, centers):
+    """
+    Index of the nearest center for every row (squared euclidean distance)
+
+    NaN coordinates are ignored, so rows with partial statistics are assigned
+    on the dimensions they have; rows without any value get -1.
+
+    Args:
+        points: shape (n, d), may contain NaN
+        centers: shape (k, d)
+
+    Returns:
+        np.ndarray: shape (n,) intp
+    """
+    points = np.asarray(points, dtype=np.float64)
+    known = ~np.isnan(points)
+    diff = np.where(known[:, None, :], points[:, None, :] - centers[None, :, :], 0.0)
+    labels = np.argmin(np.einsum('nkd,nkd->nk', diff, diff), axis=1)
+    labels[~known.any(axis=1)] = -1
+    return labels
+
+
+def kmeans(points, k, seed=42, iterations=100):
+    """
+    Lloyd's KMeans with k-means++ initialization (deterministic for a seed)
+
+    Returns:
+        np.ndarray: centers, shape (k, d)
+    """
+    rng = np.random.default_rng(seed)
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        distance = np.min([np.sum((points - center) ** 2, axis=1) for center in centers], axis=0)
+        centers.append(points[rng.choice(len(points), p=distance / distance.sum())])
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        labels = nearest_centroid(points, centers)
+        updated = np.array([
+            points[labels == c].mean(axis=0) if np.any(labels == c) else centers[c] for c in range(k)
+        ])
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+    return centers
+
+
+class ProvinceClusters:
+    """
+    Nearest-centroid province clusters on z-scored province statistics
+
+    The saved Spark KMeans (kmeans_clustering) was fitted on a 7-column
+    scaled_features vector whose columns and scaler were not exported; its
+    centers are used when their width matches CLUSTER_COLUMNS, otherwise the
+    clusters are refitted here with the same k and seed.
+    """
+
+    def __init__(self, centers, mean, std, columns=CLUSTER_COLUMNS, source='refit'):
+        """
+        Args:
+            centers: (k, d) centers in z-score space
+            mean, std: (d,) statistics used to z-score the columns
+            columns: Province stat columns, in center order
+            source: 'spark' or 'refit'
+        """
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.columns = tuple(columns)
+        self.source = source
+        # Cluster for rows without any statistic: the one nearest the average province
+        self.default_cluster = int(nearest_centroid(np.zeros((1, len(self.columns))), self.centers)[0])
+
+    @property
+    def k(self):
+        return len(self.centers)
+
+    @classmethod
+    def fit(cls, province_table, spark_centers=None, seed=42):
+        """
+        Clusters of the provinces of a ProvinceTable
+
+        Args:
+            province_table: ProvinceTable
+            spark_centers: Centers of the saved Spark KMeans (None = k of 4)
+            seed: KMeans seed when refitting (Spark's seed param)
+        """
+        n = province_table.num_provinces
+        points = np.column_stack([province_table.column(name)[:n] for name in CLUSTER_COLUMNS])
+        mean = points.mean(axis=0)
+        std = points.std(axis=0)
+        std[std == 0] = 1.0
+        z = (points - mean) / std
+
+        if spark_centers is not None and spark_centers.shape[1] == z.shape[1]:
+            return cls(spark_centers, mean, std, source='spark')
+        k = len(spark_centers) if spark_centers is not None else 4
+        return cls(kmeans(z, min(k, n), seed), mean, std, source='refit')
+
+    def assign(self, stats):
+        """
+        Vectorized nearest-centroid assignment of raw province statistics
+
+        Args:
+            stats: (n, d) array in `columns` order, or dict column -> (n,) array;
+                   NaN / missing columns are ignored
+
+        Returns:
+            np.ndarray: cluster per row, shape (n,)
+        """
+        if isinstance(stats, dict):
+            n = len(next(iter(stats.values())))
+            stats = np.column_stack([
+                np.asarray(stats[name], dtype=np.float64) if name in stats else np.full(n, np.nan)
+                for name in self.columns
+            ])
+        labels = nearest_centroid((stats - self.mean) / self.std, self.centers)
+        labels[labels < 0] = self.default_cluster
+        return labels
+
+    def table_labels(self, province_table):
+        """Cluster of every ProvinceTable row (the unseen row gets the average-province cluster)"""
+        return self.assign({name: province_table.column(name) for name in self.columns})
+
+
+class ClusterPriors:
+    """
+    Class probabilities and next-hour temperature per cluster x month x hour
+
+    Built by averaging the full model's output over the provinces of each
+    cluster, scored at their average conditions on the 15th of every month.
+    """
+
+    def __init__(self, probabilities, temperature):
+        """
+        Args:
+            probabilities: (k, 12, 24, num_classes) float32
+            temperature: (k, 12, 24) float32
+        """
+        self.probabilities = probabilities
+        self.temperature = temperature
+
+    @classmethod
+    def compute(cls, score, province_table, labels, k):
+        """
+        Args:
+            score: fn(times datetime64[h] (n,), rows (n,)) -> (probabilities (n, C), temperature (n,))
+            province_table: ProvinceTable
+            labels: Cluster per table row
+            k: Number of clusters
+        """
+        n = province_table.num_provinces
+        months = np.array([f'{PRIOR_YEAR}-{m:02d}-15T00' for m in range(1, 13)], dtype='datetime64[h]')
+        times = months[:, None] + np.arange(24).astype('timedelta64[h]')  # (12, 24)
+
+        rows = np.repeat(np.arange(n, dtype=np.intp), times.size)
+        probabilities, temperature = score(np.tile(times.ravel(), n), rows)
+        probabilities = probabilities.reshape(n, 12, 24, -1)
+        temperature = temperature.reshape(n, 12, 24)
+
+        labels = np.asarray(labels)[:n]
+        prior = np.zeros((k, 12, 24, probabilities.shape[-1]), dtype=np.float32)
+        baseline = np.zeros((k, 12, 24), dtype=np.float32)
+        for c in range(k):
+            members = labels == c
+            if np.any(members):
+                prior[c] = probabilities[members].mean(axis=0)
+                baseline[c] = temperature[members].mean(axis=0)
+            else:
+                prior[c] = probabilities.mean(axis=0)
+                baseline[c] = temperature.mean(axis=0)
+        return cls(prior, baseline)
+
+    def lookup(self, clusters, months, hours):
+        """
+        Args:
+            clusters, months (1..12), hours (0..23): per row
+
+        Returns:
+            tuple: probabilities (n, num_classes), next-hour temperature (n,)
+        """
+        clusters = np.asarray(clusters, dtype=np.intp)
+        months = np.asarray(months, dtype=np.intp) - 1
+        hours = np.asarray(hours, dtype=np.intp)
+        return (self.probabilities[clusters, months, hours].astype(np.float64),
+                self.temperature[clusters, months, hours].astype(np.float64))
+
+
+class LatencyBudget:
+    """
+    Decides whether the full model can answer a call within budget_ms
+
+    Keeps an EWMA of the model's latency per call (small batches) and per row
+    (large batches). While the estimate is over budget, calls go to the
+    priors, except one call per probe_interval that re-measures the model.
+    """
+
+    # Batches at least this large are estimated per row
+    PER_ROW_THRESHOLD = 256
+
+    def __init__(self, budget_ms, alpha=0.2, probe_interval=1.0):
+        self.budget = budget_ms / 1000
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.per_call = None
+        self.per_row = None
+        self.rejected = 0
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+
+    def estimate(self, n_rows=1):
+        """Expected model seconds for n_rows (None until measured)"""
+        if n_rows < self.PER_ROW_THRESHOLD:
+            return self.per_call
+        return self.per_row * n_rows if self.per_row is not None else None
+
+    def allow(self, n_rows=1):
+        estimate = self.estimate(n_rows)
+        if estimate is None or estimate <= self.budget:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_probe >= self.probe_interval:
+                self._last_probe = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, n_rows, seconds):
+        with self._lock:
+            if n_rows < self.PER_ROW_THRESHOLD:
+                self.per_call = seconds if self.per_call is None else (
+                    self.per_call + self.alpha * (seconds - self.per_call))
+            else:
+                per_row = seconds / n_rows
+                self.per_row = per_row if self.per_row is None else (
+                    self.per_row + self.alpha * (per_row - self.per_row))
@@ -0,0 +1,587 @@
+# ===== utils/drift.py =====
+# Streaming feature-drift monitor: live inputs vs the distributions the model was trained on
+#
+# Reference (stored next to the model, see reference_path):
+#   python -m utils.drift reference weather_models training.csv   quantile bins of a training CSV
+#   without a reference file                                      temperature / humidity per province
+#                                                                 as N(avg, std) of province_stats.csv
+#
+# Sketches (constant memory, merged by addition across threads / worker processes):
+#   numeric features   per province x feature histogram on the reference bin edges, plus
+#                      one open bin below and above the reference range
+#   unknown provinces  count-min sketch of the names that fall into the indexers' "keep" row,
+#                      with a few heavy-hitter candidates
+#
+# Per feature, live counts are compared with the reference mixed in the live province shares
+# (PSI and KS on the bins), so a change of which provinces are asked for is not drift;
+# per province against its own reference. Statistics are computed on read (report(),
+# metrics export), a request only bins its values.
+#
+# Usage:
+#   predictor.enable_drift_monitor()
+#   predictor.drift_monitor.report()          # psi / ks / out of range per feature and province, alerts
+#   python -m utils.drift report weather_models live.csv
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import threading
+import zlib
+
+import numpy as np
+
+REFERENCE_FILENAME = 'drift_reference.npz'
+
+# Monitored model inputs (the others are constants or functions of the province)
+DRIFT_FEATURES = (
+    'hour', 'month_num', 'temperature', 'humidity', 'pressure', 'wind_speed',
+    'temp_lag_1h', 'temp_ma_6h', 'temp_change_1h',
+)
+
+# Default reference from province_stats.csv:
+#   feature -> (mean column, std column, resolution of the values, physical range)
+# Bin edges sit halfway between resolution steps, so rounded values fall in the bins
+# their normal mass is in; mass outside the physical range is folded into its ends.
+PROVINCE_STATS_FEATURES = {
+    'temperature': ('avg_temp_province', 'std_temp_province', 0.1, None),
+    'humidity': ('avg_humidity_province', 'std_humidity_province', 1.0, (0.0, 100.0)),
+}
+
+# Bins of a proportion below this count as this (PSI of empty bins)
+PSI_EPSILON = 1e-4
+# Reference rows a province needs before its own bins outweigh the all-province ones
+PRIOR_ROWS = 20
+
+
+def reference_path(model_path):
+    """<model folder>/drift_reference.npz (model_path may be a bundle file)"""
+    folder = os.path.dirname(model_path) if os.path.isfile(model_path) else model_path
+    return os.path.join(folder, REFERENCE_FILENAME)
+
+
+def psi(actual, expected):
+    """Population stability index over the last axis (proportions)"""
+    actual = np.maximum(actual, PSI_EPSILON)
+    expected = np.maximum(expected, PSI_EPSILON)
+    return np.sum((actual - expected) * np.log(actual / expected), axis=-1)
+
+
+def ks(actual, expected):
+    """Kolmogorov-Smirnov distance between two binned distributions (at the bin edges)"""
+    return np.max(np.abs(np.cumsum(actual, axis=-1) - np.cumsum(expected, axis=-1)), axis=-1)
+
+
+def _normal_cdf(x):
+    return 0.5 * (1.0 + np.vectorize(math.erf)(x / math.sqrt(2.0)))
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of string keys with a few heavy-hitter candidates
+
+    Hashes are CRC32 with a fixed seed per row, so sketches built in different
+    processes merge by adding their tables.
+    """
+
+    def __init__(self, width=2048, depth=4, top_k=10):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        self.candidates = {}  # key -> estimate, at most top_k
+
+    def _columns(self, key):
+        data = key.encode('utf-8')
+        return [zlib.crc32(data, seed) % self.width for seed in range(self.depth)]
+
+    def add(self, key, count=1):
+        columns = self._columns(key)
+        rows = np.arange(self.depth)
+        self.table[rows, columns] += count
+        self.total += count
+        self._offer(key, int(self.table[rows, columns].min()))
+
+    def estimate(self, key):
+        """Upper bound of the count of key (exact when nothing collides)"""
+        return int(self.table[np.arange(self.depth), self._columns(key)].min())
+
+    def _offer(self, key, estimate):
+        if key in self.candidates or len(self.candidates) < self.top_k:
+            self.candidates[key] = estimate
+            return
+        smallest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[smallest]:
+            del self.candidates[smallest]
+            self.candidates[key] = estimate
+
+    def top(self):
+        """[(key, estimated count)], largest first"""
+        return sorted(self.candidates.items(), key=lambda item: -item[1])
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+        keys = set(self.candidates) | set(other.candidates)
+        self.candidates = {}
+        for key in keys:
+            self._offer(key, self.estimate(key))
+
+    def state(self):
+        return {'table': self.table.copy(), 'total': self.total, 'candidates': dict(self.candidates)}
+
+    @classmethod
+    def from_state(cls, state, top_k=10):
+        depth, width = state['table'].shape
+        sketch = cls(width, depth, top_k)
+        sketch.table = state['table'].copy()
+        sketch.total = state['total']
+        sketch.candidates = dict(state['candidates'])
+        return sketch
+
+
+class DriftReference:
+    """
+    Reference distribution of every monitored feature on fixed bins
+
+    Bin 0 is below edges[f, 0], bin k holds edges[f, k - 1] <= x < edges[f, k],
+    the last bin of a feature is at or above its last finite edge (edges are
+    padded with +inf, so the bins after it stay empty).
+    """
+
+    def __init__(self, features, edges, proportions, province_share=None, model_version=None, source=None):
+        """
+        Args:
+            features: Monitored feature names
+            edges: shape (num_features, num_bins - 1), increasing, +inf padded
+            proportions: Reference share of every bin per province table row
+                         (unseen row last), shape (num_rows, num_features, num_bins)
+            province_share: Reference share of every province table row (None: not known)
+            model_version: Model the reference was built for
+            source: Where it comes from ('province_stats' or the CSV name)
+        """
+        self.features = list(features)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.proportions = np.asarray(proportions, dtype=np.float64)
+        self.province_share = None if province_share is None else np.asarray(province_share, dtype=np.float64)
+        self.model_version = model_version
+        self.source = source
+
+    @property
+    def num_bins(self):
+        return self.edges.shape[1] + 1
+
+    def bins(self, values):
+        """Bin of every value, values shape (n, num_features)"""
+        if len(values) <= 64:  # one broadcast compare beats a call per feature
+            return np.count_nonzero(values[:, :, None] >= self.edges[None], axis=2)
+        return np.stack([np.searchsorted(edges, column, side='right')
+                         for edges, column in zip(self.edges, values.T)], axis=1)
+
+    @classmethod
+    def from_province_stats(cls, table, features=None, bins=32, sigmas=4.0, model_version=None):
+        """
+        Normal distributions N(avg, std) per province from province_stats.csv columns
+        (PROVINCE_STATS_FEATURES), on equal-width bins over every province's avg +- sigmas std
+        """
+        features = [f for f in (features or PROVINCE_STATS_FEATURES) if f in PROVINCE_STATS_FEATURES]
+        edges = np.full((len(features), bins - 1), np.inf)
+        proportions = np.zeros((table.num_provinces + 1, len(features), bins))
+        for f, name in enumerate(features):
+            mean_column, std_column, resolution, bounds = PROVINCE_STATS_FEATURES[name]
+            mean = table.column(mean_column)
+            std = np.maximum(table.column(std_column), 1e-6)
+            low, high = (mean - sigmas * std).min(), (mean + sigmas * std).max()
+            if bounds is not None:
+                low, high = max(low, bounds[0]), min(high, bounds[1])
+            inner = bins - 1 if bounds is None else bins - 3  # + one edge outside each bound
+            feature_edges = np.unique(np.round(np.linspace(low, high, inner) / resolution)) * resolution
+            feature_edges += resolution / 2
+            if bounds is not None:
+                inside = feature_edges[(feature_edges > bounds[0]) & (feature_edges < bounds[1])]
+                feature_edges = np.r_[bounds[0] - resolution / 2, inside, bounds[1] + resolution / 2]
+            edges[f, :len(feature_edges)] = feature_edges
+
+            cdf = _normal_cdf((feature_edges[None, :] - mean[:, None]) / std[:, None])
+            mass = np.diff(cdf, prepend=0.0, append=1.0, axis=1)
+            if bounds is not None:  # live values are clipped to the physical range
+                mass[:, 1] += mass[:, 0]
+                mass[:, -2] += mass[:, -1]
+                mass[:, [0, -1]] = 0.0
+            proportions[:, f, :mass.shape[1]] = mass
+        return cls(features, edges, proportions, None, model_version, 'province_stats')
+
+    @classmethod
+    def from_rows(cls, values, rows, num_rows, features, bins=32, model_version=None, source=None):
+        """
+        Quantile bins of reference rows (raw feature values, one column per feature)
+
+        Args:
+            values: shape (n, len(features))
+            rows: Province table row of every reference row
+            num_rows: Province table rows (num_provinces + 1)
+        """
+        edges = np.full((len(features), bins - 1), np.inf)
+        for f in range(len(features)):
+            column = values[:, f][np.isfinite(values[:, f])]
+            quantiles = np.quantile(column, np.linspace(0.0, 1.0, bins - 1))
+            # From the minimum to just above the maximum: every reference value is in range
+            unique = np.unique(np.r_[quantiles[:-1], np.nextafter(quantiles[-1], np.inf)])
+            edges[f, :len(unique)] = unique
+
+        reference = cls(features, edges, np.zeros((num_rows, len(features), bins)), None, model_version, source)
+        counts = np.zeros((num_rows, len(features), bins))
+        np.add.at(counts, (rows[:, None], np.arange(len(features)), reference.bins(values)), 1.0)
+
+        # Provinces with few rows lean on the all-province bins (PRIOR_ROWS pseudo rows)
+        overall = counts.sum(axis=0) / max(len(values), 1)
+        province_rows = counts[:, :1].sum(axis=2, keepdims=True)
+        reference.proportions = (counts + PRIOR_ROWS * overall) / (province_rows + PRIOR_ROWS)
+        reference.province_share = province_rows[:, 0, 0] / max(len(values), 1)
+        return reference
+
+    def save(self, path):
+        arrays = {
+            'features': np.array(self.features), 'edges': self.edges, 'proportions': self.proportions,
+            'model_version': np.array(self.model_version or ''), 'source': np.array(self.source or ''),
+        }
+        if self.province_share is not None:
+            arrays['province_share'] = self.province_share
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['features'].tolist(), data['edges'], data['proportions'],
+                data['province_share'] if 'province_share' in data else None,
+                str(data['model_version']) or None, str(data['source']) or None
+            )
+
+
+class DriftMonitor:
+    """
+    Thread-safe streaming histograms of live inputs, compared with a DriftReference
+
+    observe() costs one comparison per (row, feature, bin edge) plus a scatter-add
+    under a lock; batches above max_rows are subsampled (strided, rows weighted).
+    state() / merge() / drain() move the sketches between processes.
+    """
+
+    def __init__(self, reference, all_features, province_names, psi_alert=0.25, ks_alert=0.2,
+                 unknown_alert=0.05, min_rows=200, max_rows=1024):
+        """
+        Args:
+            reference: DriftReference
+            all_features: Model feature order (columns of the matrices passed to observe)
+            province_names: Province table names (row order)
+            psi_alert: PSI at or above which a feature alerts (0.25: significant shift)
+            ks_alert: KS distance at or above which a feature alerts
+            unknown_alert: Share of rows with an unknown province that alerts
+            min_rows: Live rows a province / the whole stream needs before it is judged
+            max_rows: Rows binned per observe() call at most (None: every row)
+        """
+        missing = [name for name in reference.features if name not in all_features]
+        if missing:
+            raise ValueError(f"Drift reference features not in the model: {missing}")
+        self.reference = reference
+        self.columns = np.array([all_features.index(name) for name in reference.features], dtype=np.intp)
+        self.province_names = list(province_names)
+        self.options = {
+            'psi_alert': psi_alert, 'ks_alert': ks_alert, 'unknown_alert': unknown_alert,
+            'min_rows': min_rows, 'max_rows': max_rows,
+        }
+        self.counts = np.zeros(reference.proportions.shape)
+        self.samples = np.zeros(len(reference.proportions), dtype=np.int64)  # rows binned (unweighted)
+        self.unknown = CountMinSketch()
+        self._lock = threading.Lock()
+        self._offset = 0  # strided subsampling start, rotated between calls
+        self._raw = None  # (transform, scale, shift): raw = X[:, columns] * scale + shift
+        self._feature_offsets = np.arange(len(self.columns)) * reference.num_bins
+
+    def observe(self, X, rows, transform):
+        """
+        Add scored rows
+
+        Args:
+            X: Scaled feature matrix, shape (n, num_features)
+            rows: Province table row of every row
+            transform: FeatureTransform that scaled X (values are binned raw)
+        """
+        weight = 1.0
+        max_rows = self.options['max_rows']
+        if max_rows is not None and len(rows) > max_rows:
+            step = len(rows) / max_rows
+            self._offset = (self._offset + 1) % int(step)
+            take = (self._offset + np.arange(max_rows) * step).astype(np.intp)
+            X, rows, weight = X[take], rows[take], step
+        raw = self._raw
+        if raw is None or raw[0] is not transform:
+            # FeatureTransform.inverse of the monitored columns only (NaN where std == 0)
+            inv_std = transform.inv_std[self.columns]
+            scale = np.divide(1.0, inv_std, out=np.full_like(inv_std, np.nan), where=inv_std != 0)
+            shift = transform.mean[self.columns] if transform.mean is not None else np.zeros_like(scale)
+            raw = self._raw = (transform, scale, shift)
+        values = X[:, self.columns] * raw[1] + raw[2]
+        flat = rows[:, None] * self.counts[0].size + self._feature_offsets + self.reference.bins(values)
+        flat = flat[~np.isnan(values)]
+        with self._lock:
+            counts = self.counts.reshape(-1)
+            if len(rows) == 1:  # one row: every index is distinct
+                counts[flat] += weight
+                self.samples[rows] += 1
+            else:
+                counts += np.bincount(flat, minlength=len(counts)) * weight
+                self.samples += np.bincount(rows, minlength=len(self.samples))
+
+    def observe_unknown(self, provinces):
+        """Count the names of rows whose province the model does not know"""
+        names, counts = np.unique(np.asarray(provinces, dtype=str), return_counts=True)
+        with self._lock:
+            for name, count in zip(names.tolist(), counts.tolist()):
+                self.unknown.add(name, count)
+
+    def state(self):
+        """Picklable copy of the sketches (merge() it into another monitor)"""
+        with self._lock:
+            return {'counts': self.counts.copy(), 'samples': self.samples.copy(), 'unknown': self.unknown.state()}
+
+    def drain(self):
+        """state() and reset: hand the rows seen since the last drain to another process"""
+        with self._lock:
+            state = {'counts': self.counts, 'samples': self.samples, 'unknown': self.unknown.state()}
+            self.counts = np.zeros_like(self.counts)
+            self.samples = np.zeros_like(self.samples)
+            self.unknown = CountMinSketch()
+        return state
+
+    def merge(self, state):
+        if state['counts'].shape != self.counts.shape:
+            raise ValueError("Drift sketches of different references cannot be merged")
+        with self._lock:
+            self.counts += state['counts']
+            self.samples += state['samples']
+            self.unknown.merge(CountMinSketch.from_state(state['unknown']))
+
+    def reset(self):
+        self.drain()
+
+    def report(self):
+        """
+        Drift statistics of everything observed so far
+
+        Statistics are judged once min_rows rows were actually binned (subsampled
+        batches count their rows weighted, but only the binned ones as samples).
+
+        Returns:
+            dict: 'rows', 'samples', 'features' {name: psi, ks, out_of_range, reference_out_of_range,
+            quantiles}, 'provinces' {name: {'rows', feature: {psi, ks, out_of_range}}} for
+            provinces with min_rows samples, 'province_mix_psi', 'unknown_provinces', 'alerts'
+        """
+        with self._lock:
+            counts = self.counts.copy()
+            samples = self.samples.copy()
+            unknown = self.unknown.state()
+        options = self.options
+        reference = self.reference
+        last_bin = np.count_nonzero(np.isfinite(reference.edges), axis=1)
+
+        province_rows = counts[:, :1].sum(axis=2)[:, 0]  # every row counts once per feature
+        total = province_rows.sum()
+        report = {'rows': float(total), 'samples': int(samples.sum()), 'reference': reference.source,
+                  'features': {}, 'provinces': {},
+                  'province_mix_psi': None, 'alerts': []}
+
+        def statistics(live, expected, last):
+            share = live / max(live.sum(), 1e-12)
+            return {
+                'psi': float(psi(share, expected)),
+                'ks': float(ks(share, expected)),
+                'out_of_range': float(share[0] + share[last]),
+            }
+
+        def judge(stats, feature, province, rows):
+            if stats['psi'] >= options['psi_alert'] or stats['ks'] >= options['ks_alert']:
+                report['alerts'].append({'feature': feature, 'province': province, 'rows': float(rows), **stats})
+
+        if total > 0:
+            live_share = province_rows / total
+            for f, name in enumerate(reference.features):
+                last = last_bin[f]
+                # Reference in the live province mix: a shift in who asks is not drift
+                expected = live_share @ reference.proportions[:, f]
+                stats = statistics(counts[:, f].sum(axis=0), expected, last)
+                stats['reference_out_of_range'] = float(expected[0] + expected[last])
+                stats['quantiles'] = self._quantiles(counts[:, f].sum(axis=0), reference.edges[f, :last])
+                report['features'][name] = stats
+                if samples.sum() >= options['min_rows']:
+                    judge(stats, name, None, total)
+
+            for row in np.flatnonzero(samples >= options['min_rows']):
+                province = self.province_names[row] if row < len(self.province_names) else '(unknown)'
+                entry = {'rows': float(province_rows[row])}
+                for f, name in enumerate(reference.features):
+                    entry[name] = statistics(counts[row, f], reference.proportions[row, f], last_bin[f])
+                    if row < len(self.province_names):  # unknown provinces alert on their share
+                        judge(entry[name], name, province, province_rows[row])
+                report['provinces'][province] = entry
+
+            if reference.province_share is not None:
+                report['province_mix_psi'] = float(psi(live_share, reference.province_share))
+
+        sketch = CountMinSketch.from_state(unknown)
+        share = sketch.total / total if total else 0.0
+        report['unknown_provinces'] = {'rows': sketch.total, 'share': float(share), 'top': sketch.top()}
+        if samples.sum() >= options['min_rows'] and share >= options['unknown_alert']:
+            report['alerts'].append({'feature': 'province', 'province': '(unknown)', 'rows': sketch.total,
+                                     'share': float(share), 'top': sketch.top()[:3]})
+        return report
+
+    @staticmethod
+    def _quantiles(counts, edges, levels=(0.05, 0.5, 0.95)):
+        """Quantiles of a binned distribution, linear inside a bin (open bins: their edge)"""
+        total = counts.sum()
+        if not total or not len(edges):
+            return None
+        cumulative = np.cumsum(counts) / total
+        result = {}
+        for level in levels:
+            k = int(np.searchsorted(cumulative, level))
+            if k == 0 or k > len(edges) - 1:
+                value = edges[0] if k == 0 else edges[-1]
+            else:
+                below = cumulative[k - 1]
+                fraction = (level - below) / max(cumulative[k] - below, 1e-12)
+                value = edges[k - 1] + fraction * (edges[k] - edges[k - 1])
+            result[f'p{round(level * 100):02d}'] = float(value)
+        return result
+
+    def publish(self, metrics):
+        """
+        Replace the drift_* gauges of a StageMetrics with the current report
+        (registered with StageMetrics.set_collector: runs on every export)
+        """
+        report = self.report()
+        metrics.clear_gauges('drift_')
+        metrics.set_gauge('drift_rows', report['rows'])
+        metrics.set_gauge('drift_alerts', len(report['alerts']))
+        metrics.set_gauge('drift_unknown_province_share', report['unknown_provinces']['share'])
+        if report['province_mix_psi'] is not None:
+            metrics.set_gauge('drift_province_mix_psi', report['province_mix_psi'])
+        for name, stats in report['features'].items():
+            for statistic in ('psi', 'ks', 'out_of_range'):
+                metrics.set_gauge(f'drift_{statistic}', stats[statistic], feature=name, province='all')
+        for province, entry in report['provinces'].items():
+            for name in self.reference.features:
+                metrics.set_gauge('drift_psi', entry[name]['psi'], feature=name, province=province)
+        return report
+
+
+def load_reference(model_path, model_version, table):
+    """Saved reference of this model version, else the province_stats.csv normals"""
+    path = reference_path(model_path)
+    if os.path.isfile(path):
+        reference = DriftReference.load(path)
+        if reference.model_version == (model_version or None):
+            return reference
+        print(f"⚠️ {path} was built for model version {reference.model_version}, using province_stats")
+    return DriftReference.from_province_stats(table, model_version=model_version)
+
+
+def _predictor(model_path):
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(model_path, cache_size=0)
+
+
+def _csv_rows(predictor, path, max_rows=None):
+    """(scaled X, province table rows) of a CSV"""
+    from utils.variants import read_labeled_csv
+
+    columns = read_labeled_csv(path)
+    if max_rows is not None:
+        columns = {name: values[:max_rows] for name, values in columns.items()}
+    X = predictor.feature_matrix(
+        columns['time'], columns['province'], columns.get('temperature'), columns.get('humidity')
+    )
+    return X, predictor.province_table.rows(columns['province'])
+
+
+def save_reference(args):
+    predictor = _predictor(args.model_path)
+    X, rows = _csv_rows(predictor, args.training, args.max_rows)
+    features = [name for name in args.features if name in predictor.features]
+    values = predictor.feature_transform.inverse(X)[:, [predictor.features.index(name) for name in features]]
+    reference = DriftReference.from_rows(
+        values, rows, predictor.province_table.num_provinces + 1, features, args.bins,
+        predictor.model_version, os.path.basename(args.training)
+    )
+    path = reference_path(args.model_path)
+    reference.save(path)
+    print(f"✅ Wrote {path} ({len(X)} rows, {len(features)} features x {reference.num_bins} bins)")
+
+
+def print_report(args):
+    predictor = _predictor(args.model_path)
+    from utils.variants import read_labeled_csv
+
+    # Every row is binned: the report is exact for the file
+    monitor = predictor.enable_drift_monitor(psi_alert=args.psi_alert, ks_alert=args.ks_alert, max_rows=None)
+    columns = read_labeled_csv(args.live)
+    if args.max_rows is not None:
+        columns = {name: values[:args.max_rows] for name, values in columns.items()}
+    for start in range(0, len(columns['province']), args.chunk_size):
+        chunk = {name: values[start:start + args.chunk_size] for name, values in columns.items()}
+        predictor.predict_batch(chunk['time'], chunk['province'], chunk.get('temperature'), chunk.get('humidity'))
+    report = monitor.report()
+
+    print(f"Reference: {report['reference']}, live rows: {report['rows']:.0f}")
+    print(f"{'feature':16s} {'psi':>7s} {'ks':>6s} {'out':>6s} {'p05':>8s} {'p50':>8s} {'p95':>8s}")
+    for name, stats in report['features'].items():
+        quantiles = stats['quantiles'] or {}
+        print(f"{name:16s} {stats['psi']:7.3f} {stats['ks']:6.3f} {stats['out_of_range']:6.1%} "
+              + ' '.join(f"{quantiles.get(key, float('nan')):8.2f}" for key in ('p05', 'p50', 'p95')))
+    unknown = report['unknown_provinces']
+    print(f"Unknown provinces: {unknown['rows']} rows ({unknown['share']:.1%}) {unknown['top'][:5]}")
+    for alert in report['alerts']:
+        print(f"🚨 {alert}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Saved {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feature drift of live inputs against the training data')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    reference_parser = commands.add_parser('reference', help='Build and save the reference distributions')
+    reference_parser.add_argument('model_path', nargs='?', default='weather_models')
+    reference_parser.add_argument('training', help='CSV of training rows (time, province, temperature, humidity)')
+    reference_parser.add_argument('--features', nargs='*', default=list(DRIFT_FEATURES))
+    reference_parser.add_argument('--bins', type=int, default=32)
+    reference_parser.add_argument('--max-rows', type=int, default=None)
+
+    report_parser = commands.add_parser('report', help='Drift of a CSV of live inputs')
+    report_parser.add_argument('model_path', nargs='?', default='weather_models')
+    report_parser.add_argument('live')
+    report_parser.add_argument('--chunk-size', type=int, default=100_000)
+    report_parser.add_argument('--max-rows', type=int, default=None)
+    report_parser.add_argument('--psi-alert', type=float, default=0.25)
+    report_parser.add_argument('--ks-alert', type=float, default=0.2)
+    report_parser.add_argument('--output', help='Write the report as JSON')
+
+    args = parser.parse_args()
+    if args.command == 'reference':
+        save_reference(args)
+    else:
+        print_report(args)
+
+
+if __name__ == '__main__':
+    main()
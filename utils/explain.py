@@ -0,0 +1,233 @@
+# ===== utils/explain.py =====
+# Path-dependent TreeSHAP (Lundberg et al. 2018, "Consistent individualized feature
+# attribution for tree ensembles") on the compiled tree arrays
+#
+# Every root-to-leaf path is flattened once into its unique features, each with
+#   zero fraction  z = product of cover[child] / cover[parent] over the path's splits on it
+#   interval       lower < x <= upper, where a row must be to follow those splits (o = 1)
+# The Shapley value of a path element is a sum over coalitions of the path's other
+# elements; with o in {0, 1} it has a closed form per row and path (see
+# numba_kernels.shap_rows), evaluated:
+#   Numba  row blocks x paths, exact polynomial form (utils.tree_kernels); batches
+#          too small to split by rows (a single row) are split by paths instead
+#   NumPy  rows x paths of one length at once; the coalition weights
+#          k! (n - k)! / (n + 1)! = integral_0^1 u^k (1 - u)^(n - k) du
+#          turn the sum into a polynomial integral, exact with Gauss-Legendre nodes
+#
+# Local accuracy: output(x) = expected_value + shap_values(x).sum(axis=1)
+#
+# Usage:
+#   explainer = TreeExplainer.for_forest(rf_model)   # RF class probabilities
+#   phi = explainer.shap_values(X)                    # (n_rows, n_features, num_classes)
+
+import math
+
+import numpy as np
+
+from utils import tree_kernels
+
+
+class TreeExplainer:
+    """
+    Path-dependent TreeSHAP values of a tree ensemble whose output is the sum
+    over trees of per-leaf value vectors
+    """
+
+    # Rows x path elements per NumPy work chunk
+    chunk_elements = 1 << 20
+
+    def __init__(self, ensemble, leaf_values):
+        """
+        Args:
+            ensemble: TreeEnsemble with node cover (TreeEnsemble.load keeps it)
+            leaf_values: Output contributed by every node when it is the leaf reached,
+                         shape (num_nodes, num_outputs), tree weights already applied
+        """
+        if ensemble.cover is None:
+            raise ValueError("The ensemble has no node cover (saved without impurity stats?)")
+
+        index = np.arange(ensemble.num_nodes, dtype=np.intp)
+        is_leaf = ensemble.left == index
+        internal = index[~is_leaf]
+        parent = np.full(ensemble.num_nodes, -1, dtype=np.intp)
+        parent[ensemble.left[internal]] = internal
+        parent[ensemble.right[internal]] = internal
+
+        cover = np.asarray(ensemble.cover, dtype=np.float64)
+        leaves = index[is_leaf]
+        feature = ensemble.feature.astype(np.intp)
+        threshold = ensemble.threshold.astype(np.float64)
+
+        # Climb from every leaf to its root, one level per step for all leaves
+        node = leaves.copy()
+        edges = []
+        for _ in range(ensemble.max_depth):
+            up = parent[node]
+            moving = np.flatnonzero(up >= 0)
+            if len(moving) == 0:
+                break
+            split, child = up[moving], node[moving]
+            went_left = ensemble.left[split] == child
+            ratio = np.divide(cover[child], cover[split], out=np.zeros(len(child)), where=cover[split] > 0)
+            edges.append((moving, feature[split], ratio,
+                          np.where(went_left, -np.inf, threshold[split]),
+                          np.where(went_left, threshold[split], np.inf)))
+            node[moving] = split
+        root_cover = cover[node]
+
+        # Splits of a path on the same feature merge into one element
+        path, split_feature, ratio, lower, upper = (np.concatenate(columns) for columns in zip(*edges))
+        width = int(feature.max()) + 1
+        key = path * width + split_feature
+        order = np.argsort(key, kind='stable')
+        key, ratio, lower, upper = key[order], ratio[order], lower[order], upper[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+
+        path = key[starts] // width
+        feature = key[starts] % width
+        zero = np.multiply.reduceat(ratio, starts)
+        lower = np.maximum.reduceat(lower, starts)
+        upper = np.minimum.reduceat(upper, starts)
+        lengths = np.bincount(path, minlength=len(leaves))
+
+        # Paths sorted by length: the paths of one length form one contiguous element range
+        path_order = np.argsort(lengths, kind='stable')
+        rank = np.empty_like(path_order)
+        rank[path_order] = np.arange(len(path_order))
+        element_order = np.argsort(rank[path], kind='stable')
+        leaves, root_cover = leaves[path_order], root_cover[path_order]
+
+        self.feature = np.ascontiguousarray(feature[element_order])
+        self.zero = zero[element_order]
+        self.lower = lower[element_order]
+        self.upper = upper[element_order]
+        self.lengths = lengths[path_order]
+        self.offsets = np.zeros(len(leaves) + 1, dtype=np.intp)
+        np.cumsum(self.lengths, out=self.offsets[1:])
+        self.max_length = int(self.lengths.max())
+
+        # shapley_weights[n, k] = k! (n - k)! / (n + 1)!: a coalition of k of the other n elements
+        self.shapley_weights = np.zeros((self.max_length, self.max_length))
+        for n in range(self.max_length):
+            self.shapley_weights[n, :n + 1] = [1.0 / ((n + 1) * math.comb(n, k)) for k in range(n + 1)]
+
+        self.values = np.ascontiguousarray(
+            np.asarray(leaf_values, dtype=np.float64)[leaves].reshape(len(leaves), -1)
+        )
+        leaf_weight = np.divide(cover[leaves], root_cover, out=np.zeros(len(leaves)), where=root_cover > 0)
+        self.expected_value = leaf_weight @ self.values
+        self._groups = None
+
+    @classmethod
+    def for_forest(cls, model):
+        """Explainer of RandomForestModel.predict_proba (every class)"""
+        ensemble = model.ensemble
+        scale = model.probability_scale / ensemble.num_trees
+        return cls(ensemble, np.asarray(model.leaf_probability, dtype=np.float64) * scale)
+
+    @classmethod
+    def for_gbt(cls, model):
+        """Explainer of GBTRegressionModel.predict (one output)"""
+        ensemble = model.ensemble
+        # Trees occupy consecutive node ranges starting at their root
+        tree_of_node = np.searchsorted(ensemble.roots, np.arange(ensemble.num_nodes), side='right') - 1
+        return cls(ensemble, (ensemble.value * ensemble.tree_weights[tree_of_node])[:, None])
+
+    @property
+    def num_outputs(self):
+        return self.values.shape[1]
+
+    def shap_values(self, X, outputs=None):
+        """
+        Args:
+            X: Scaled feature matrix, shape (n_rows, n_features) or (n_features,)
+            outputs: Output columns to explain (default: all), e.g. [class index]
+
+        Returns:
+            np.ndarray: shape (n_rows, n_features, len(outputs))
+        """
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        # NaN goes right like in the trees: +inf passes every "x > threshold"
+        X[np.isnan(X)] = np.inf
+        values = self.values if outputs is None else np.ascontiguousarray(self.values[:, outputs])
+        out = np.zeros((len(X), X.shape[1], values.shape[1]))
+
+        kernels = tree_kernels.compiled_kernels()
+        threads = tree_kernels.thread_count()
+        if kernels is not None and threads > 1 and len(X) <= tree_kernels.ROWS_PER_TASK:
+            # One task per range of paths (equal element counts), each into its own output
+            bounds = np.searchsorted(self.offsets, np.linspace(0, len(self.feature), threads + 1), side='left')
+            bounds[-1] = len(self.lengths)
+            calls = []
+            for first, last in zip(bounds[:-1], bounds[1:]):
+                if last > first:
+                    calls.append((X, self.offsets[first:last + 1], self.feature, self.lower, self.upper, self.zero,
+                                  values[first:last], self.shapley_weights, 0, len(X), np.zeros_like(out)))
+            tree_kernels.run_tasks(kernels[4], calls)
+            return np.sum([call[-1] for call in calls], axis=0)
+        if kernels is not None:
+            return tree_kernels.run_blocks(
+                kernels[4], len(X), X, self.offsets, self.feature, self.lower, self.upper, self.zero,
+                values, self.shapley_weights, out
+            )
+
+        groups = self._numpy_groups()
+        element_values = values[self._element_path]
+        rows = max(1, self.chunk_elements // len(self.feature))
+        for start in range(0, len(X), rows):
+            block = X[start:start + rows]
+            weights = self._element_weights(block, groups)
+            for f, elements in self._by_feature:
+                if f < X.shape[1]:
+                    out[start:start + len(block), f] = weights[:, elements] @ element_values[elements]
+        return out
+
+    def _numpy_groups(self):
+        """
+        Per path length d: (element range, log(z + u (1 - z)) - log(1 - u) at the
+        Gauss-Legendre nodes u (paths, d, nodes), 1 / (z + u (1 - z)) (paths, nodes, d))
+        """
+        if self._groups is None:
+            # ceil(d / 2) nodes integrate the degree d - 1 polynomials exactly
+            nodes, node_weights = np.polynomial.legendre.leggauss((self.max_length + 1) // 2)
+            self._nodes, self._node_weights = (nodes + 1) / 2, node_weights / 2
+            self._element_path = np.repeat(np.arange(len(self.lengths)), self.lengths)
+            order = np.argsort(self.feature, kind='stable')
+            bounds = np.searchsorted(self.feature[order], np.arange(self.feature.max() + 2))
+            self._by_feature = [(f, order[bounds[f]:bounds[f + 1]]) for f in range(len(bounds) - 1)]
+
+            groups = []
+            for length in np.unique(self.lengths):
+                paths = np.flatnonzero(self.lengths == length)
+                elements = slice(self.offsets[paths[0]], self.offsets[paths[-1] + 1])
+                zero = self.zero[elements].reshape(len(paths), length, 1)
+                factor = zero + self._nodes * (1.0 - zero)
+                log_ratio = np.log(factor) - np.log1p(-self._nodes)
+                groups.append((elements, log_ratio, np.ascontiguousarray((1.0 / factor).transpose(0, 2, 1))))
+            self._groups = groups
+        return self._groups
+
+    def _element_weights(self, X, groups):
+        """Shapley weight of every (row, path element), times (o - z)"""
+        weights = np.zeros((len(X), len(self.feature)))
+        for elements, log_ratio, inverse in groups:
+            paths, length = log_ratio.shape[:2]
+            shape = (paths, length, 1)
+            x = X.T[self.feature[elements]].reshape(paths, length, len(X))
+            present = (x > self.lower[elements].reshape(shape)) & (x <= self.upper[elements].reshape(shape))
+            zero = self.zero[elements].reshape(shape)
+
+            # Coalition integrand at every node u (paths, rows, nodes):
+            # Z * prod over present (z + u (1 - z)) * (1 - u)^absent
+            base = present.transpose(0, 2, 1).astype(np.float64) @ log_ratio
+            base += length * np.log1p(-self._nodes)
+            np.exp(base, out=base)
+            base *= self._node_weights
+            base *= np.where(present, 1.0, zero).prod(axis=1)[..., None]
+
+            # Present elements divide their own factor back out; absent ones share one value
+            on = (base @ inverse).transpose(0, 2, 1)
+            off = base @ (-1.0 / (1.0 - self._nodes))
+            group = np.where(present, (1.0 - zero) * on, off[:, None, :])  # (paths, d, rows)
+            weights[:, elements] = group.reshape(-1, len(X)).T
+        return weights
@@ -0,0 +1,178 @@
+# ===== utils/features.py =====
+
+import numpy as np
+
+# How each model feature is derived when only (time, province, temperature,
+# humidity) are known -- the defaults of predict_example.py:
+#   ('time', name)          time feature column
+#   ('province', column)    ProvinceTable column / code array
+#   ('temperature', offset) current temperature + offset
+#   ('humidity', offset)    current humidity + offset
+#   ('wind_gust', factor)   avg_wind_province * factor
+#   ('const', value)        fixed value
+FEATURE_SOURCES = {
+    'hour': ('time', 'hour'),
+    'day_of_week': ('time', 'day_of_week'),
+    'month_num': ('time', 'month_num'),
+    'day_of_month': ('time', 'day_of_month'),
+    'is_day': ('time', 'is_day'),
+    'province_encoded': ('province', 'province_codes'),
+    'city_encoded': ('province', 'city_codes'),
+    'temperature': ('temperature', 0.0),
+    'temp_min': ('temperature', -1.0),
+    'temp_max': ('temperature', 1.0),
+    'temp_range': ('const', 2.0),
+    'humidity': ('humidity', 0.0),
+    'pressure': ('province', 'avg_pressure_province'),
+    'wind_speed': ('province', 'avg_wind_province'),
+    'wind_gust': ('wind_gust', 1.5),
+    'cloudcover': ('const', 50.0),
+    'precipitation': ('const', 0.0),
+    'visibility': ('const', 10000.0),
+    'feels_like': ('temperature', 0.0),
+    'avg_temp_province': ('province', 'avg_temp_province'),
+    'std_temp_province': ('province', 'std_temp_province'),
+    'avg_humidity_province': ('province', 'avg_humidity_province'),
+    'avg_pressure_province': ('province', 'avg_pressure_province'),
+    'avg_wind_province': ('province', 'avg_wind_province'),
+    # Lag features (no history available -> current values)
+    'temp_lag_1h': ('temperature', 0.0),
+    'temp_lag_3h': ('temperature', 0.0),
+    'humidity_lag_1h': ('humidity', 0.0),
+    'pressure_lag_1h': ('province', 'avg_pressure_province'),
+    'temp_ma_3h': ('temperature', 0.0),
+    'temp_ma_6h': ('temperature', 0.0),
+    'humidity_ma_3h': ('humidity', 0.0),
+    'temp_change_1h': ('const', 0.0),
+}
+
+
+class FeatureTransform:
+    """
+    StringIndexer codes + feature assembly + StandardScaler fused into one pass
+
+    Everything that depends only on the province (indexer codes, province stats,
+    default pressure / wind) is scaled once at construction into a
+    (num_provinces + 1, k) block; constants are scaled once too. transform()
+    then fills a preallocated matrix with one gather plus one broadcast per
+    group of columns, already in all_features order and already scaled.
+
+    Per value the arithmetic is the same as assembling raw columns and then
+    applying the scaler ((raw [- mean]) * inv_std), so float64 results are
+    bit-identical to the two-step version.
+    """
+
+    block_size = 4096
+
+    def __init__(self, features, province_table, scaler_mean, scaler_inv_std, with_mean=False):
+        """
+        Args:
+            features: metadata['features']['all_features']
+            province_table: ProvinceTable (rows incl. the unseen "keep" row)
+            scaler_mean, scaler_inv_std: StandardScaler vectors (inv_std = 0 where std == 0)
+            with_mean: StandardScaler withMean
+        """
+        self.features = list(features)
+        self.column_index = {name: j for j, name in enumerate(self.features)}
+        self.mean = np.asarray(scaler_mean, dtype=np.float64) if with_mean else None
+        self.inv_std = np.asarray(scaler_inv_std, dtype=np.float64)
+
+        groups = {kind: [] for kind in ('time', 'province', 'temperature', 'humidity', 'const')}
+        for j, name in enumerate(self.features):
+            kind, arg = FEATURE_SOURCES[name]
+            groups['province' if kind == 'wind_gust' else kind].append((j, name, arg))
+
+        self.time_columns = [(j, arg) for j, _, arg in groups['time']]
+
+        province_raw = []
+        for j, name, arg in groups['province']:
+            if name == 'wind_gust':
+                province_raw.append(province_table.column('avg_wind_province') * arg)
+            elif arg in ('province_codes', 'city_codes'):
+                province_raw.append(getattr(province_table, arg))
+            else:
+                province_raw.append(province_table.column(arg))
+        self.province_index = np.array([j for j, _, _ in groups['province']], dtype=np.intp)
+        self.province_block = self._scale(
+            np.column_stack(province_raw) if province_raw else np.empty((province_table.num_provinces + 1, 0)),
+            self.province_index
+        )
+
+        self.temperature_index, self.temperature_offset = self._affine(groups['temperature'])
+        self.humidity_index, self.humidity_offset = self._affine(groups['humidity'])
+
+        self.const_index = np.array([j for j, _, _ in groups['const']], dtype=np.intp)
+        self.const_values = self._scale(np.array([arg for _, _, arg in groups['const']], dtype=np.float64),
+                                        self.const_index)
+
+    @staticmethod
+    def _affine(group):
+        index = np.array([j for j, _, _ in group], dtype=np.intp)
+        offset = np.array([arg for _, _, arg in group], dtype=np.float64)
+        return index, offset
+
+    def _scale(self, raw, index):
+        """(raw [- mean]) * inv_std for the given feature columns"""
+        if self.mean is not None:
+            raw = raw - self.mean[index]
+        return raw * self.inv_std[index]
+
+    def transform(self, time_features, rows, temperature, humidity, overrides=None, out=None, dtype=np.float64):
+        """
+        Scaled feature matrix
+
+        Args:
+            time_features: dict of time feature arrays (WeatherPredictor._time_features)
+            rows: ProvinceTable row per input row
+            temperature, humidity: Current values per row
+            overrides: Optional dict feature name -> raw values replacing the defaults
+            out: Optional preallocated (n, num_features) array (float32 or float64)
+            dtype: dtype of the new matrix when out is None. float32 halves the
+                   memory, but tree splits compare against float64 thresholds,
+                   so rows right at a threshold can branch differently.
+
+        Returns:
+            np.ndarray: out, shape (n, num_features)
+        """
+        n = len(rows)
+        if out is None:
+            out = np.empty((n, len(self.features)), dtype=dtype)
+
+        temperature = np.broadcast_to(np.asarray(temperature, dtype=np.float64), (n,))
+        humidity = np.broadcast_to(np.asarray(humidity, dtype=np.float64), (n,))
+        overrides = [
+            (self.column_index[name], np.broadcast_to(np.asarray(values, dtype=np.float64), (n,)))
+            for name, values in (overrides or {}).items() if name in self.column_index
+        ]
+
+        # Row blocks keep the (block, k) temporaries in cache
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            block = out[start:end]
+
+            for j, name in self.time_columns:
+                block[:, j] = self._scale(time_features[name][start:end], j)
+            block[:, self.province_index] = self.province_block[rows[start:end]]
+            block[:, self.temperature_index] = self._scale(
+                temperature[start:end, None] + self.temperature_offset, self.temperature_index
+            )
+            block[:, self.humidity_index] = self._scale(
+                humidity[start:end, None] + self.humidity_offset, self.humidity_index
+            )
+            block[:, self.const_index] = self.const_values
+
+            for j, values in overrides:
+                block[:, j] = self._scale(values[start:end], j)
+        return out
+
+    def inverse(self, X):
+        """
+        Raw feature values back from a scaled matrix (NaN for columns with std == 0,
+        whose scaled value is always 0)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        std = np.divide(1.0, self.inv_std, out=np.full_like(self.inv_std, np.nan), where=self.inv_std != 0)
+        raw = X * std
+        if self.mean is not None:
+            raw += self.mean
+        return raw
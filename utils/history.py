@@ -0,0 +1,652 @@
+# ===== utils/history.py =====
+# Append-only prediction history: every served prediction, queryable by province and time
+#
+# Layout (Arrow IPC segments, Hive-style partitions on the day of the forecast time):
+#   <directory>/day=2025-06-30/<first logged ms>-<seq>.arrow
+#   <directory>/index.json    segment -> rows, time range and, per province,
+#                             (record batch, rows, time range)
+#
+# Predictions are buffered in memory (the columns are only built when flushed) and
+# written by a background thread every flush_interval seconds or flush_rows rows.
+# A segment holds the rows of one day sorted by (province, time), one record batch
+# per province: a query for one province memory-maps only the segments of the days
+# in range whose index lists it, and reads that one batch of each.
+#
+# The same thread merges the small segments of a day (compaction) once it has
+# compact_segments of them or has not been written to for compact_interval
+# seconds. Replaced files are deleted one compact_interval later, so queries still
+# reading them are not cut off. One writing process per directory.
+#
+# Columns: time, province, temperature, humidity (inputs, NaN = province default),
+# weather_main, probability, predicted_temp, fallback, model_version, source,
+# logged_at and prob_<class> per weather class.
+#
+# Usage:
+#   history = PredictionHistory('prediction_history').start()
+#   predictor.attach_history(history)
+#   history.query('Da Nang', start='6/23/2025 00:00', end='6/30/2025 23:00').to_pandas()
+#   python -m utils.history prediction_history --province "Da Nang" --start "6/23/2025 00:00" --end "6/30/2025 23:00"
+#   python -m utils.history prediction_history --compact
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+INDEX_FILENAME = 'index.json'
+SEGMENT_SUFFIX = '.arrow'
+
+# Columns of every segment, before the prob_<class> columns
+BASE_COLUMNS = ('time', 'province', 'temperature', 'humidity', 'weather_main', 'probability',
+                'predicted_temp', 'fallback', 'model_version', 'source', 'logged_at')
+
+_MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(values):
+    """
+    Minutes since the epoch of "6/30/2025 14:00" / "6/30/2025" / ISO 8601 strings,
+    datetimes or datetime64 values (array)
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[m]').astype(np.int64)
+    if len(values) and isinstance(values.flat[0], str):
+        # Parse each distinct string once (batches repeat the same hours)
+        unique, inverse = np.unique(values.astype(str), return_inverse=True)
+        return np.array([_parse_minutes(value) for value in unique], dtype=np.int64)[inverse]
+    return np.array(values.tolist(), dtype='datetime64[m]').astype(np.int64)
+
+
+def _parse_minutes(value):
+    for layout in ("%m/%d/%Y %H:%M", "%m/%d/%Y"):
+        try:
+            parsed = datetime.strptime(value, layout)
+            break
+        except ValueError:
+            continue
+    else:
+        parsed = datetime.fromisoformat(value)
+    return int(np.datetime64(parsed, 'm').astype(np.int64))
+
+
+def _day_name(minutes):
+    return str(np.datetime64(int(minutes) // _MINUTES_PER_DAY, 'D'))
+
+
+def _overlaps(first, last, start, end):
+    return first <= end and last >= start
+
+
+def to_records(table):
+    """Rows of a query result as JSON-ready dicts ("6/30/2025 14:00" times, NaN -> None)"""
+    records = table.to_pylist()
+    for record in records:
+        for name, value in record.items():
+            if isinstance(value, datetime):
+                record[name] = value.strftime("%m/%d/%Y %H:%M" if name == 'time' else "%Y-%m-%dT%H:%M:%S.%f")
+            elif isinstance(value, float) and value != value:
+                record[name] = None
+    return records
+
+
+class PredictionHistory:
+    """
+    Append-only, day-partitioned columnar log of predictions with a per-segment
+    (province, time) index
+
+    Thread-safe: any number of logging / querying threads, one flush/compaction
+    at a time.
+    """
+
+    def __init__(self, directory, flush_rows=4096, flush_interval=5.0, compact_segments=8,
+                 compact_rows=1_000_000, compact_interval=60.0, compression='zstd', max_pending_rows=1_000_000):
+        """
+        Args:
+            directory: Store folder (created if missing)
+            flush_rows: Buffered rows that trigger a flush
+            flush_interval: Seconds between flushes of the background thread
+            compact_segments: Small segments of one day that trigger a merge
+            compact_rows: Segments with fewer rows are small (merged)
+            compact_interval: Seconds between compaction passes; also how long a day
+                              stays unwritten before its small segments are merged,
+                              and how long replaced files are kept for running queries
+            compression: IPC buffer compression ('zstd', 'lz4' or None); a record
+                         batch is decompressed on its own
+            max_pending_rows: Buffered rows kept while writes keep failing; the
+                              oldest are dropped beyond it
+        """
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_segments = compact_segments
+        self.compact_rows = compact_rows
+        self.compact_interval = compact_interval
+        self.compression = compression
+        self.max_pending_rows = max_pending_rows
+
+        self._lock = threading.Lock()  # buffer + segment index
+        self._write_lock = threading.Lock()  # one flush / compaction at a time
+        self._pending = []  # buffered log() chunks / log_result() tuples, converted when flushed
+        # (a Table when a write failed)
+        self._pending_rows = 0
+        self._sequence = 0
+        self._dropping = False
+        self._retired = []  # (monotonic time, paths) replaced by compaction
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logged = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.dropped = 0  # rows lost to the buffer cap or that could not be converted
+        self.segments_read = 0  # segments opened by queries
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments = self._load_index()
+
+    # ---- logging ----
+
+    def log(self, times, provinces, result, temperatures=None, humidities=None, classes=None, source=None):
+        """
+        Buffer a batch of predictions
+
+        Args:
+            times: Forecast times ("6/30/2025 14:00" strings, datetimes or datetime64)
+            provinces: Province names
+            result: predict_batch result (weather_main, probability, probabilities,
+                    predicted_temp, fallback, model_version)
+            temperatures, humidities: Inputs as given (None / NaN = province default)
+            classes: Weather class of every probabilities column
+            source: Free-form origin label ('app', 'server', ...)
+        """
+        chunk = {
+            'time': times, 'province': provinces, 'temperature': temperatures, 'humidity': humidities,
+            'weather_main': result['weather_main'], 'probability': result['probability'],
+            'predicted_temp': result['predicted_temp'], 'fallback': result.get('fallback'),
+            'probabilities': result.get('probabilities'), 'classes': classes,
+            'model_version': result.get('model_version'), 'source': source, 'logged_at': time.time(),
+        }
+        self._append(chunk, len(provinces))
+
+    def log_result(self, time_value, province, result, temperature=None, humidity=None, source=None):
+        """Buffer one predict() result (kept as is until the flush: a tuple append)"""
+        self._append((time_value, province, temperature, humidity, result, source, time.time()), 1)
+
+    @staticmethod
+    def _single_chunk(entries):
+        """log() chunk of consecutive log_result() entries with the same classes"""
+        results = [entry[4] for entry in entries]
+        classes = list(results[0].get('all_probabilities') or {})
+        return {
+            'time': [entry[0] for entry in entries], 'province': [entry[1] for entry in entries],
+            'temperature': [entry[2] for entry in entries], 'humidity': [entry[3] for entry in entries],
+            'weather_main': [result.get('weather_main') for result in results],
+            'probability': [result.get('probability', np.nan) for result in results],
+            'predicted_temp': [result.get('predicted_temp', np.nan) for result in results],
+            'fallback': [bool(result.get('fallback')) for result in results],
+            'probabilities': [list(result['all_probabilities'].values()) for result in results] if classes else None,
+            'classes': classes,
+            'model_version': [result.get('model_version') for result in results],
+            'source': [entry[5] for entry in entries],
+            'logged_at': [entry[6] for entry in entries],
+        }
+
+    @staticmethod
+    def _chunk_rows(chunk):
+        return 1 if isinstance(chunk, tuple) else len(chunk['province'])  # tuple, dict or re-queued Table
+
+    def _append(self, chunk, rows):
+        with self._lock:
+            self._pending.append(chunk)
+            self._pending_rows += rows
+            self.logged += rows
+            self._trim_pending()
+            full = self._pending_rows >= self.flush_rows
+        if full:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def _trim_pending(self):
+        """Drop the oldest buffered chunks beyond max_pending_rows (caller holds the lock)"""
+        if self.max_pending_rows is None or self._pending_rows <= self.max_pending_rows:
+            return
+        dropped = 0
+        while self._pending and self._pending_rows > self.max_pending_rows:
+            rows = self._chunk_rows(self._pending.pop(0))
+            self._pending_rows -= rows
+            dropped += rows
+        if not self._dropping:  # once until the next successful flush
+            print(f"⚠️ Prediction history buffer full ({self.max_pending_rows} rows): dropping the oldest rows")
+        self._dropping = True
+        self.dropped += dropped
+
+    @staticmethod
+    def _chunk_table(chunk):
+        """pyarrow Table of one buffered chunk"""
+        import pyarrow as pa
+
+        n = len(chunk['province'])
+
+        def floats(values):
+            if values is None:
+                return np.full(n, np.nan)
+            values = np.array(values, dtype=np.float64)  # None -> NaN
+            return np.broadcast_to(values, (n,))
+
+        def strings(values):
+            # One label for the whole chunk, or one per row (None stays null)
+            if values is None or np.ndim(values) == 0:
+                return pa.array([None if values is None else str(values)] * n, type=pa.string())
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+        columns = {
+            'time': pa.array(to_minutes(chunk['time']).astype('datetime64[m]').astype('datetime64[s]')),
+            'province': pa.array(np.asarray(chunk['province'], dtype=object).astype(str), type=pa.string()),
+            'temperature': pa.array(floats(chunk['temperature'])),
+            'humidity': pa.array(floats(chunk['humidity'])),
+            'weather_main': pa.array(np.asarray(chunk['weather_main'], dtype=object), type=pa.string()),
+            'probability': pa.array(floats(chunk['probability'])),
+            'predicted_temp': pa.array(floats(chunk['predicted_temp'])),
+            'fallback': pa.array(np.zeros(n, dtype=bool) if chunk['fallback'] is None
+                                 else np.asarray(chunk['fallback'], dtype=bool)),
+            'model_version': strings(chunk['model_version']),
+            'source': strings(chunk['source']),
+            'logged_at': pa.array(np.broadcast_to((np.asarray(chunk['logged_at']) * 1000).astype(np.int64), (n,))
+                                  .astype('datetime64[ms]')),
+        }
+        if chunk['probabilities'] is not None and chunk['classes']:
+            probabilities = np.asarray(chunk['probabilities'], dtype=np.float64).reshape(n, -1)
+            for j, name in enumerate(chunk['classes']):
+                columns[f'prob_{name}'] = pa.array(probabilities[:, j])
+        return pa.table(columns)
+
+    def _pending_table(self, chunks, errors=None):
+        """
+        pyarrow Table of buffered chunks; a chunk that cannot be converted is left out
+
+        Args:
+            chunks: log() chunks / log_result() tuples
+            errors: List collecting (rows, exception) of the chunks left out
+
+        Returns:
+            pyarrow.Table or None (nothing convertible)
+        """
+        import pyarrow as pa
+
+        # Runs of log_result() tuples with the same classes become one chunk each
+        merged, run, run_classes = [], [], None
+        for chunk in chunks:
+            classes = tuple(chunk[4].get('all_probabilities') or ()) if isinstance(chunk, tuple) else None
+            if run and (classes is None or classes != run_classes):
+                merged.append(self._single_chunk(run))
+                run = []
+            if classes is None:
+                merged.append(chunk)
+            else:
+                run.append(chunk)
+                run_classes = classes
+        if run:
+            merged.append(self._single_chunk(run))
+
+        tables = []
+        for chunk in merged:
+            try:
+                tables.append(chunk if isinstance(chunk, pa.Table) else self._chunk_table(chunk))
+            except Exception as e:
+                if errors is not None:
+                    errors.append((len(chunk['province']), e))
+        if not tables:
+            return None
+        # Model versions may differ in their classes: missing prob_<class> columns are null
+        return pa.concat_tables(tables, promote_options='permissive')
+
+    # ---- segments ----
+
+    def flush(self):
+        """
+        Write the buffered rows as one segment per forecast day
+
+        Returns:
+            int: Rows written
+        """
+        with self._write_lock:
+            with self._lock:
+                chunks = self._pending
+                self._pending, self._pending_rows = [], 0
+            if not chunks:
+                return 0
+
+            # Rows that cannot be converted would fail every retry: dropped, not re-queued
+            errors = []
+            table = self._pending_table(chunks, errors)
+            if errors:
+                with self._lock:
+                    self.dropped += sum(bad_rows for bad_rows, _ in errors)
+                for bad_rows, e in errors:
+                    print(f"⚠️ Prediction history dropped {bad_rows} invalid rows: {type(e).__name__}: {e}")
+            if table is None:
+                return 0
+
+            try:
+                minutes = table['time'].to_numpy().astype('datetime64[m]').astype(np.int64)
+                days = minutes // _MINUTES_PER_DAY
+                written = {}
+                for day in np.unique(days):
+                    take = np.flatnonzero(days == day)
+                    path, entry = self._write_segment(table.take(take) if len(take) < len(days) else table)
+                    written[path] = entry
+            except BaseException:
+                # The converted rows are kept for the next flush (segments written so far are
+                # unindexed: dropped on load), up to max_pending_rows
+                with self._lock:
+                    self._pending.insert(0, table)
+                    self._pending_rows += table.num_rows
+                    self._trim_pending()
+                raise
+            with self._lock:
+                self.segments.update(written)
+                self.flushes += 1
+                self._dropping = False
+            self._save_index()
+            return table.num_rows
+
+    def _write_segment(self, table):
+        """
+        Write the rows of one day, sorted by (province, time), one record batch per province
+
+        Returns:
+            tuple: (path relative to the directory, index entry)
+        """
+        import pyarrow as pa
+
+        table = table.sort_by([('province', 'ascending'), ('time', 'ascending'), ('logged_at', 'ascending')])
+        table = table.combine_chunks()
+        minutes = table['time'].to_numpy().astype('datetime64[m]').astype(np.int64)
+        names = table['province'].to_numpy(zero_copy_only=False)
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        stops = np.r_[starts[1:], len(names)]
+
+        provinces = {}
+        batches = []
+        for batch, (start, stop) in enumerate(zip(starts, stops)):
+            provinces[str(names[start])] = [batch, int(stop - start), int(minutes[start:stop].min()),
+                                            int(minutes[start:stop].max())]
+            batches.extend(table.slice(start, stop - start).to_batches())
+        entry = {
+            'day': _day_name(minutes[0]), 'rows': table.num_rows,
+            'start': int(minutes.min()), 'end': int(minutes.max()),
+            'created': time.time(), 'provinces': provinces,
+        }
+
+        with self._lock:
+            self._sequence += 1
+            name = f"{int(time.time() * 1000)}-{self._sequence:06d}{SEGMENT_SUFFIX}"
+        relative = os.path.join(f"day={entry['day']}", name)
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # The entry travels in the schema metadata too: the index can be rebuilt from the files
+        schema = table.schema.with_metadata({'history_index': json.dumps(entry)})
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        with pa.OSFile(path + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+        os.replace(path + '.tmp', path)
+        entry['bytes'] = os.path.getsize(path)
+        return relative, entry
+
+    def _load_index(self):
+        """Segments of the index file (rebuilt from the segments if missing); unindexed files are dropped"""
+        import pyarrow as pa
+
+        index_path = os.path.join(self.directory, INDEX_FILENAME)
+        files = []
+        for folder in sorted(os.listdir(self.directory)):
+            folder_path = os.path.join(self.directory, folder)
+            if folder.startswith('day=') and os.path.isdir(folder_path):
+                files.extend(os.path.join(folder, name) for name in sorted(os.listdir(folder_path)))
+
+        if os.path.isfile(index_path):
+            with open(index_path, encoding='utf-8') as f:
+                segments = json.load(f)['segments']
+        else:
+            segments = {}
+            for relative in files:
+                if relative.endswith(SEGMENT_SUFFIX):
+                    with pa.memory_map(os.path.join(self.directory, relative)) as source:
+                        metadata = pa.ipc.open_file(source).schema.metadata
+                    segments[relative] = json.loads(metadata[b'history_index'])
+                    segments[relative]['bytes'] = os.path.getsize(os.path.join(self.directory, relative))
+
+        # Left over by an interrupted flush / compaction: written but never indexed, or replaced
+        for relative in files:
+            if relative not in segments:
+                os.remove(os.path.join(self.directory, relative))
+        return segments
+
+    def _save_index(self):
+        with self._lock:
+            payload = json.dumps({'segments': self.segments})
+        path = os.path.join(self.directory, INDEX_FILENAME)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+
+    def compact(self, force=False):
+        """
+        Merge the small segments of every day that has compact_segments of them, or
+        that has not been written to for compact_interval seconds (force: any day
+        with two or more)
+
+        Returns:
+            int: Segments merged away
+        """
+        import pyarrow as pa
+
+        merged = 0
+        with self._write_lock:
+            with self._lock:
+                days = {}
+                for relative, entry in self.segments.items():
+                    if entry['rows'] < self.compact_rows:
+                        days.setdefault(entry['day'], []).append(relative)
+                segments = dict(self.segments)
+
+            now = time.time()
+            for day, small in sorted(days.items()):
+                if len(small) < 2:
+                    continue
+                quiet = now - max(segments[relative]['created'] for relative in small) >= self.compact_interval
+                if not (force or quiet or len(small) >= self.compact_segments):
+                    continue
+
+                tables = []
+                for relative in small:
+                    with pa.memory_map(os.path.join(self.directory, relative)) as source:
+                        tables.append(pa.ipc.open_file(source).read_all())
+                path, entry = self._write_segment(pa.concat_tables(tables, promote_options='permissive'))
+                with self._lock:
+                    for relative in small:
+                        del self.segments[relative]
+                    self.segments[path] = entry
+                    self._retired.append((time.monotonic(), small))
+                    self.compactions += 1
+                merged += len(small)
+
+            if merged:
+                self._save_index()
+            self._delete_retired(force)
+        return merged
+
+    def _delete_retired(self, force=False):
+        """Delete replaced files that no running query can still be reading"""
+        with self._lock:
+            cutoff = time.monotonic() - self.compact_interval
+            expired = [paths for retired_at, paths in self._retired if force or retired_at <= cutoff]
+            self._retired = [item for item in self._retired if not (force or item[0] <= cutoff)]
+        for paths in expired:
+            for relative in paths:
+                try:
+                    os.remove(os.path.join(self.directory, relative))
+                except FileNotFoundError:
+                    pass
+
+    # ---- queries ----
+
+    def query(self, province=None, start=None, end=None, columns=None, buffered=True):
+        """
+        Logged predictions with start <= time <= end, oldest first
+
+        Args:
+            province: Province name (None: every province)
+            start, end: Forecast time bounds, inclusive (strings / datetimes; None: open)
+            columns: Columns to return (default: all)
+            buffered: Include rows not flushed yet
+
+        Returns:
+            pyarrow.Table
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        first = to_minutes([start])[0] if start is not None else np.iinfo(np.int64).min
+        last = to_minutes([end])[0] if end is not None else np.iinfo(np.int64).max
+        with self._lock:
+            segments = [(relative, entry) for relative, entry in self.segments.items()
+                        if _overlaps(entry['start'], entry['end'], first, last)]
+            chunks = list(self._pending) if buffered else []
+
+        tables = []
+        for relative, entry in segments:
+            if province is not None:
+                wanted = [entry['provinces'][province]] if province in entry['provinces'] else []
+            else:
+                wanted = list(entry['provinces'].values())
+            wanted = [item for item in wanted if _overlaps(item[2], item[3], first, last)]
+            if not wanted:
+                continue
+            with pa.memory_map(os.path.join(self.directory, relative)) as source:
+                reader = pa.ipc.open_file(source)
+                tables.append(pa.Table.from_batches([reader.get_batch(item[0]) for item in wanted]))
+            with self._lock:
+                self.segments_read += 1
+
+        table = self._pending_table(chunks) if chunks else None
+        if table is not None:
+            if province is not None:
+                table = table.filter(pc.equal(table['province'], province))
+            tables.append(table)
+
+        if not tables:
+            return pa.table({name: pa.array([], type=pa.string()) for name in BASE_COLUMNS})
+        table = pa.concat_tables(tables, promote_options='permissive')
+        if start is not None or end is not None:
+            minutes = table['time'].to_numpy().astype('datetime64[m]').astype(np.int64)
+            table = table.filter(pa.array((minutes >= first) & (minutes <= last)))
+        table = table.sort_by([('time', 'ascending'), ('province', 'ascending'), ('logged_at', 'ascending')])
+        return table.select(columns) if columns is not None else table
+
+    def provinces(self):
+        """Provinces with logged predictions, sorted"""
+        with self._lock:
+            names = {name for entry in self.segments.values() for name in entry['provinces']}
+            for chunk in self._pending:
+                if isinstance(chunk, tuple):
+                    names.add(chunk[1])
+                elif isinstance(chunk, dict):
+                    names.update(str(name) for name in chunk['province'])
+                else:
+                    names.update(chunk['province'].to_pylist())
+        return sorted(names)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'segments': len(self.segments),
+                'rows': sum(entry['rows'] for entry in self.segments.values()),
+                'days': len({entry['day'] for entry in self.segments.values()}),
+                'bytes': sum(entry.get('bytes', 0) for entry in self.segments.values()),
+                'buffered_rows': self._pending_rows,
+                'logged': self.logged,
+                'flushes': self.flushes,
+                'compactions': self.compactions,
+                'dropped': self.dropped,
+                'segments_read': self.segments_read,
+            }
+
+    # ---- background writer ----
+
+    def start(self):
+        """Flush and compact on a background thread (flushed on exit too)"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='prediction-history', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def close(self):
+        """Stop the background thread and flush"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        last_compaction = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except Exception as e:
+                # The thread must outlive any failure: the rows stay buffered (capped) for the next pass
+                print(f"⚠️ Prediction history write failed: {type(e).__name__}: {e}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query / compact a prediction history store')
+    parser.add_argument('directory')
+    parser.add_argument('--province', default=None)
+    parser.add_argument('--start', default=None, help='First forecast time, "6/23/2025 00:00" (inclusive)')
+    parser.add_argument('--end', default=None, help='Last forecast time, "6/30/2025 23:00" (inclusive)')
+    parser.add_argument('--output', default=None, help='Write the rows to this CSV / parquet file')
+    parser.add_argument('--compact', action='store_true', help='Merge the small segments of every day')
+    args = parser.parse_args(argv)
+
+    history = PredictionHistory(args.directory)
+    if args.compact:
+        merged = history.compact(force=True)
+        print(f"✅ Merged {merged} segments: {json.dumps(history.stats())}")
+        return
+
+    table = history.query(args.province, args.start, args.end)
+    print(f"📊 {table.num_rows} rows from {history.segments_read} of {len(history.segments)} segments")
+    if args.output:
+        if args.output.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            pq.write_table(table, args.output)
+        else:
+            import pyarrow.csv as pv
+            pv.write_csv(table, args.output)
+        print(f"✅ Saved {args.output}")
+    else:
+        print(table.to_pandas().to_string(max_rows=50))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# ===== utils/loader.py =====
+# Concurrent, lazily awaited loading of model components
+#
+# Parquet decoding (pyarrow) and the NumPy work after it release the GIL, so the
+# Spark artifacts of a models folder load in parallel on a small thread pool.
+# A component is only waited for when it is first used (LazyComponent), e.g.
+# the province list is available while the forest is still decoding.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ComponentLoader:
+    """
+    Runs named loader functions on a thread pool and records how long each took
+
+    timings[name] is the seconds spent inside the loader function (on its worker
+    thread); waits[name] the seconds a caller was blocked waiting for it.
+    """
+
+    def __init__(self, max_workers=8):
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix='model-load')
+        self._futures = {}
+        self.timings = {}
+        self.waits = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def submit(self, name, fn, *args, after=()):
+        """
+        Load a component on the pool
+
+        Args:
+            name: Component name (LazyComponent attribute / timings key)
+            fn, args: Loader function and its arguments
+            after: Components waited for before fn starts (not part of its timing);
+                   they must have been submitted earlier, so the FIFO pool cannot deadlock
+        """
+        self._futures[name] = self._pool.submit(self._timed, name, fn, *args, after=after)
+
+    def _timed(self, name, fn, *args, after=()):
+        for dependency in after:
+            self._futures[dependency].result()
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run(self, name, fn, *args):
+        """Load a component on the calling thread (timed like the pooled ones)"""
+        return self._timed(name, fn, *args)
+
+    def __contains__(self, name):
+        return name in self._futures
+
+    def pending(self):
+        """Components still loading"""
+        return [name for name, future in self._futures.items() if not future.done()]
+
+    def result(self, name):
+        """Wait for a component (re-raises its loading error)"""
+        future = self._futures[name]
+        if not future.done():
+            start = time.perf_counter()
+            try:
+                return future.result()
+            finally:
+                with self._lock:
+                    self.waits[name] = self.waits.get(name, 0.0) + time.perf_counter() - start
+        return future.result()
+
+    def wait_all(self):
+        """Wait for every component; the first loading error is raised"""
+        for name in list(self._futures):
+            self.result(name)
+
+    def shutdown(self):
+        """No more submissions: workers exit once the queued components are loaded"""
+        self._pool.shutdown(wait=False)
+
+    def elapsed(self):
+        """Seconds since the loader was created"""
+        return time.perf_counter() - self._start
+
+    def report(self):
+        """'name 0.41s, ...' slowest first"""
+        return ', '.join(
+            f'{name} {seconds:.2f}s'
+            for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1])
+        )
+
+
+class LazyComponent:
+    """
+    Attribute resolved from the instance's ComponentLoader on first access
+
+    Assigning the attribute sets it directly; an attribute that was never
+    submitted to the loader reads as None.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        values = instance.__dict__
+        try:
+            return values[self.name]
+        except KeyError:
+            pass
+        loader = values.get('_loader')
+        value = loader.result(self.name) if loader is not None and self.name in loader else None
+        values[self.name] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
@@ -0,0 +1,264 @@
+# ===== utils/metrics.py =====
+# Opt-in stage timing (counters + histograms) and sampled cProfile capture for WeatherPredictor
+#
+# Export:
+#   metrics.to_prometheus()  -> Prometheus text exposition format
+#   metrics.to_dict()        -> JSON-serializable summary (count, mean, p50/p90/p99 per stage)
+#
+# Gauges computed from other state (e.g. utils.drift) are refreshed by collectors,
+# which run at export time rather than on every request.
+
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+# Histogram upper bounds in seconds (10 µs .. 10 s, roughly x2.5 steps)
+DEFAULT_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+NO_TIMER = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (non-cumulative counts, +Inf bucket last)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms plus monotonic counters
+
+    Usage:
+        with metrics.time('rf'):
+            ...
+        metrics.increment('rows', n)
+        metrics.set_gauge('drift_psi', 0.02, feature='temperature')
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, namespace='weather'):
+        self.buckets = tuple(buckets)
+        self.namespace = namespace
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}  # (name, ((label, value), ...)) -> value
+        self.collectors = {}  # name -> fn(metrics), run before every export
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def time(self, stage):
+        return _StageTimer(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def clear_gauges(self, prefix=''):
+        with self._lock:
+            self.gauges = {key: value for key, value in self.gauges.items() if not key[0].startswith(prefix)}
+
+    def set_collector(self, name, collect):
+        """Register (or replace, or remove with None) fn(metrics) that refreshes gauges on export"""
+        with self._lock:
+            if collect is None:
+                self.collectors.pop(name, None)
+            else:
+                self.collectors[name] = collect
+
+    def collect(self):
+        for collect in list(self.collectors.values()):
+            collect(self)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def to_dict(self):
+        self.collect()
+        stages = {}
+        for stage, histogram in list(self.histograms.items()):
+            count = histogram.count
+            stages[stage] = {
+                'count': count,
+                'total_ms': histogram.sum * 1000,
+                'mean_ms': histogram.sum / count * 1000 if count else None,
+                'p50_ms': _ms(histogram.quantile(0.5)),
+                'p90_ms': _ms(histogram.quantile(0.9)),
+                'p99_ms': _ms(histogram.quantile(0.99)),
+            }
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = {_series(name, labels): value for (name, labels), value in sorted(self.gauges.items())}
+        return {'stages': stages, 'counters': counters, 'gauges': gauges}
+
+    def to_prometheus(self):
+        self.collect()
+        name = f'{self.namespace}_stage_seconds'
+        lines = [
+            f'# HELP {name} Time spent in each prediction stage',
+            f'# TYPE {name} histogram',
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.9g}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for counter, value in counters:
+            lines.append(f'# TYPE {self.namespace}_{counter}_total counter')
+            lines.append(f'{self.namespace}_{counter}_total {value}')
+
+        with self._lock:
+            gauges = sorted(self.gauges.items())
+        typed = set()
+        for (gauge, labels), value in gauges:
+            if gauge not in typed:
+                typed.add(gauge)
+                lines.append(f'# TYPE {self.namespace}_{gauge} gauge')
+            lines.append(f'{_series(f"{self.namespace}_{gauge}", labels)} {value:.9g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+def _series(name, labels):
+    """name{label="value",...} (label values escaped as in the Prometheus text format)"""
+    if not labels:
+        return name
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return name + '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + '}'
+
+
+class ProfileSampler:
+    """
+    Run a random subset of calls under cProfile and dump pstats files
+
+    Files are named <prefix>-<unix ms>-<pid>.prof (open with snakeviz / pstats;
+    for whole-process flame graphs attach py-spy: `py-spy record --pid <pid>`).
+    Only the outermost sampled call of a thread is profiled.
+    """
+
+    def __init__(self, rate=0.01, output_dir='profiles', keep=50):
+        """
+        Args:
+            rate: Fraction of calls to profile (0..1)
+            output_dir: Where .prof files are written
+            keep: Keep only the newest `keep` files
+        """
+        self.rate = rate
+        self.output_dir = output_dir
+        self.keep = keep
+        self.captured = 0
+        self._local = threading.local()
+
+    def sample(self, prefix):
+        """Context manager: profiles the block for a sampled call, no-op otherwise"""
+        if getattr(self._local, 'active', False) or random.random() >= self.rate:
+            return NO_TIMER
+        return _ProfiledCall(self, prefix)
+
+    def _dump(self, profile, prefix):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'{prefix}-{int(time.time() * 1000)}-{os.getpid()}.prof')
+        profile.dump_stats(path)
+        self.captured += 1
+
+        files = sorted(
+            (os.path.join(self.output_dir, name) for name in os.listdir(self.output_dir)
+             if name.endswith('.prof')),
+            key=os.path.getmtime
+        )
+        for old in files[:-self.keep]:
+            os.remove(old)
+        return path
+
+
+class _ProfiledCall:
+    def __init__(self, sampler, prefix):
+        self.sampler = sampler
+        self.prefix = prefix
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.sampler._local.active = True
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.sampler._local.active = False
+        self.sampler._dump(self.profile, self.prefix)
+        return False
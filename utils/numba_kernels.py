@@ -0,0 +1,184 @@
+# ===== utils/numba_kernels.py =====
+# Numba kernels behind utils/tree_kernels.py (imported lazily: importing this module needs numba).
+# Defined at module level so cache=True can reuse the compiled code across processes.
+
+import numba
+import numpy as np
+
+# Rows walking one tree together
+BLOCK_ROWS = 256
+
+
+@numba.njit(nogil=True, cache=True)
+def walk(X, block, block_end, feature, threshold, children, root, max_depth, node):
+    # Level-synchronous and branch-free like the NumPy path: the rows of
+    # the block are independent, so their node loads overlap in the CPU
+    for k in range(block_end - block):
+        node[k] = root
+    for _ in range(max_depth):
+        for k in range(block_end - block):
+            n = node[k]
+            node[k] = children[2 * n + (X[block + k, feature[n]] <= threshold[n])]
+
+
+# Tree-major inside a block: one tree's nodes stay in cache while the rows
+# of the block walk it (the whole forest does not fit in L2)
+
+@numba.njit(nogil=True, cache=True)
+def apply_rows(X, feature, threshold, children, roots, max_depth, start, end, out):
+    node = np.empty(BLOCK_ROWS, dtype=np.intp)
+    for block in range(start, end, BLOCK_ROWS):
+        block_end = min(block + BLOCK_ROWS, end)
+        for t in range(roots.shape[0]):
+            walk(X, block, block_end, feature, threshold, children, roots[t], max_depth, node)
+            for k in range(block_end - block):
+                out[block + k, t] = node[k]
+
+
+@numba.njit(nogil=True, cache=True)
+def rf_rows(X, feature, threshold, children, roots, max_depth, leaf_probability, start, end, out):
+    # Every row still adds its votes tree by tree, the same order as the NumPy path / Spark
+    num_classes = leaf_probability.shape[1]
+    node = np.empty(BLOCK_ROWS, dtype=np.intp)
+    for block in range(start, end, BLOCK_ROWS):
+        block_end = min(block + BLOCK_ROWS, end)
+        for t in range(roots.shape[0]):
+            walk(X, block, block_end, feature, threshold, children, roots[t], max_depth, node)
+            for k in range(block_end - block):
+                for c in range(num_classes):
+                    out[block + k, c] += leaf_probability[node[k], c]
+
+
+@numba.njit(nogil=True, cache=True)
+def gbt_rows(X, feature, threshold, children, roots, max_depth, value, weights, start, end, out):
+    node = np.empty(BLOCK_ROWS, dtype=np.intp)
+    for i in range(start, end):
+        out[i] = 0.0
+    for block in range(start, end, BLOCK_ROWS):
+        block_end = min(block + BLOCK_ROWS, end)
+        for t in range(roots.shape[0]):
+            walk(X, block, block_end, feature, threshold, children, roots[t], max_depth, node)
+            for k in range(block_end - block):
+                out[block + k] += value[node[k]] * weights[t]
+
+
+@numba.njit(nogil=True, cache=True)
+def anytime_rows(X, feature, threshold, children, roots, max_depth, leaf_probability, chunk_starts,
+                 first_chunk, last_chunk, remaining_min, remaining_max, early_exit, start, end,
+                 raw, trees_used, done):
+    # roots are in evaluation order; rows marked done (settled) skip the remaining chunks.
+    # Resumable: chunks [first_chunk, last_chunk) run on top of the state in raw / trees_used / done
+    num_classes = leaf_probability.shape[1]
+    num_chunks = chunk_starts.shape[0] - 1
+    rows = np.empty(BLOCK_ROWS, dtype=np.intp)
+    node = np.empty(BLOCK_ROWS, dtype=np.intp)
+    for block in range(start, end, BLOCK_ROWS):
+        block_end = min(block + BLOCK_ROWS, end)
+        for c in range(first_chunk, last_chunk):
+            count = 0
+            for i in range(block, block_end):
+                if not done[i]:
+                    rows[count] = i
+                    count += 1
+            if count == 0:
+                break
+
+            for t in range(chunk_starts[c], chunk_starts[c + 1]):
+                for k in range(count):
+                    node[k] = roots[t]
+                for _ in range(max_depth):
+                    for k in range(count):
+                        n = node[k]
+                        node[k] = children[2 * n + (X[rows[k], feature[n]] <= threshold[n])]
+                for k in range(count):
+                    for j in range(num_classes):
+                        raw[rows[k], j] += leaf_probability[node[k], j]
+
+            for k in range(count):
+                trees_used[rows[k]] += chunk_starts[c + 1] - chunk_starts[c]
+            if not early_exit or c + 1 == num_chunks:
+                continue
+            # Settled: the leading class stays ahead even if the remaining trees
+            # give it their smallest and every other class their largest leaf probability
+            for k in range(count):
+                i = rows[k]
+                top = 0
+                for j in range(1, num_classes):
+                    if raw[i, j] > raw[i, top]:
+                        top = j
+                floor = raw[i, top] + remaining_min[c + 1, top]
+                settled = True
+                for j in range(num_classes):
+                    if j != top and raw[i, j] + remaining_max[c + 1, j] >= floor:
+                        settled = False
+                        break
+                done[i] = settled
+
+
+@numba.njit(nogil=True, cache=True)
+def shap_rows(X, offsets, feature, lower, upper, zero, values, weights, start, end, out):
+    # Path-dependent TreeSHAP over the flattened paths of utils.explain.TreeExplainer.
+    # With one fractions in {0, 1} the Shapley sum of path element i is
+    #   sum_k weights[d - 1, k] * [t^k] prod_{j != i} (z_j + o_j t)
+    # so with P(t) = prod_{o_j = 1} (z_j + t) and Z = prod_{o_j = 0} z_j:
+    #   o_i = 0: contribution -Z * sum_k weights[d - 1, k] P[k]       (the same for all of them)
+    #   o_i = 1: contribution (1 - z_i) * Z * sum_k weights[d - 1, k] (P / (t + z_i))[k]
+    # Path-major inside a block of rows: a path's elements are read once per block
+    num_outputs = values.shape[1]
+    max_length = weights.shape[0]
+    poly = np.empty(max_length + 1)
+    present = np.empty(max_length, dtype=np.intp)
+    absent = np.empty(max_length, dtype=np.intp)
+    for block in range(start, end, BLOCK_ROWS):
+        block_end = min(block + BLOCK_ROWS, end)
+        for p in range(offsets.shape[0] - 1):
+            first = offsets[p]
+            length = offsets[p + 1] - first
+            if length == 0:
+                continue
+            coefficient = weights[length - 1]
+            for i in range(block, block_end):
+                count = 0
+                n_absent = 0
+                off_product = 1.0
+                poly[0] = 1.0
+                for j in range(first, first + length):
+                    z = zero[j]
+                    if lower[j] < X[i, feature[j]] <= upper[j]:
+                        # poly *= (z + t)
+                        poly[count + 1] = poly[count]
+                        for k in range(count, 0, -1):
+                            poly[k] = poly[k - 1] + z * poly[k]
+                        poly[0] *= z
+                        present[count] = j
+                        count += 1
+                    else:
+                        off_product *= z
+                        absent[n_absent] = j
+                        n_absent += 1
+                if off_product == 0.0:
+                    continue  # no training cover follows the absent splits
+
+                if n_absent:
+                    total = 0.0
+                    for k in range(count + 1):
+                        total += coefficient[k] * poly[k]
+                    contribution = -off_product * total
+                    for m in range(n_absent):
+                        f = feature[absent[m]]
+                        for c in range(num_outputs):
+                            out[i, f, c] += contribution * values[p, c]
+
+                for m in range(count):
+                    j = present[m]
+                    z = zero[j]
+                    # Synthetic division by (t + z), from the top coefficient down
+                    quotient = poly[count]
+                    total = coefficient[count - 1] * quotient
+                    for k in range(count - 1, 0, -1):
+                        quotient = poly[k] - z * quotient
+                        total += coefficient[k - 1] * quotient
+                    contribution = (1.0 - z) * off_product * total
+                    f = feature[j]
+                    for c in range(num_outputs):
+                        out[i, f, c] += contribution * values[p, c]
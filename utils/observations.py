@@ -0,0 +1,583 @@
+# ===== utils/observations.py =====
+# Live observations: per-province hourly ring buffers + running province statistics
+#
+# Records (JSON lines or CSV with a header row):
+#   {"time": "6/30/2025 14:00", "province": "Ha Noi", "temperature": 29.1,
+#    "humidity": 74, "pressure": 1006.2, "wind_speed": 2.4}
+# Any of the measurements may be missing. "time" also accepts ISO 8601 (local wall-clock
+# time: a UTC offset is ignored).
+#
+# Usage:
+#   python -m utils.observations observations/ --checkpoint observations/state.npz
+
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.rollout import LagState
+
+VARIABLES = ('temperature', 'humidity', 'pressure', 'wind_speed')
+
+# province_stats.csv column -> (variable, statistic)
+PROVINCE_COLUMNS = {
+    'avg_temp_province': ('temperature', 'mean'),
+    'std_temp_province': ('temperature', 'std'),
+    'avg_humidity_province': ('humidity', 'mean'),
+    'std_humidity_province': ('humidity', 'std'),
+    'avg_pressure_province': ('pressure', 'mean'),
+    'avg_wind_province': ('wind_speed', 'mean'),
+}
+
+_EPOCH_HOUR = np.datetime64(0, 'h')
+
+# Provinces outside the model's table whose running statistics are kept (cluster assignment)
+MAX_NEW_PROVINCES = 1000
+
+
+def parse_time(value):
+    """
+    Hours since the epoch of a "6/30/2025 14:00" / ISO 8601 string or datetime
+
+    Times are local wall-clock hours like everywhere in the predictor: a UTC
+    offset ("2025-06-30T14:00+07:00") is dropped, not converted.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, "%m/%d/%Y %H:%M")
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    if getattr(value, 'tzinfo', None) is not None:
+        value = value.replace(tzinfo=None)
+    return int((np.datetime64(value, 'h') - _EPOCH_HOUR).astype(np.int64))
+
+
+def _to_float(value):
+    if value is None or value == '':
+        return np.nan
+    return float(value)
+
+
+class ObservationStore:
+    """
+    Incremental per-province state built from live observations
+
+    For every province row of a ProvinceTable it keeps:
+    - the last `window` hourly values of each variable, in a ring buffer
+      indexed by absolute hour (slot = hour % window); hours without an
+      observation are forward-filled, a gap of a whole window resets it
+    - Welford running mean / M2 of each variable, seeded with the
+      province_stats.csv snapshot weighted as `prior_count` observations
+
+    Provinces the model does not know only get running statistics
+    (new_province_columns), used to place them in a province cluster.
+
+    Thread-safe: one ingestion thread and any number of predicting threads.
+    """
+
+    def __init__(self, province_table, window=6, prior_count=2000, max_age_hours=3):
+        """
+        Args:
+            province_table: ProvinceTable of the loaded model
+            window: Hours of history kept (temp_ma_6h needs 6)
+            prior_count: Weight of the snapshot statistics, in observations
+                         (the training data has ~2750 rows per province)
+            max_age_hours: Observations older than this (relative to the
+                           requested hour) are not used for lag features
+        """
+        self.table = province_table
+        self.window = window
+        self.max_age_hours = max_age_hours
+        self.offsets = {}  # tailed file -> bytes consumed (checkpointed with the state)
+        self.ingested = 0
+        self.skipped = 0
+        self.new_provinces = {}  # name -> (3, len(VARIABLES)) count / mean / M2
+        self._lock = threading.Lock()
+
+        n_rows = province_table.num_provinces + 1  # + unseen row (never updated)
+        self.first_hour = np.full(n_rows, -1, dtype=np.int64)
+        self.last_hour = np.full(n_rows, -1, dtype=np.int64)
+        self.values = {name: np.full((n_rows, window), np.nan) for name in VARIABLES}
+
+        columns = province_table.columns
+        snapshot = {
+            'temperature': (columns['avg_temp_province'], columns['std_temp_province']),
+            'humidity': (columns['avg_humidity_province'], columns['std_humidity_province']),
+            'pressure': (columns['avg_pressure_province'], None),
+            'wind_speed': (columns['avg_wind_province'], None),
+        }
+        self.count = {}
+        self.mean = {}
+        self.m2 = {}
+        for name, (mean, std) in snapshot.items():
+            self.count[name] = np.full(n_rows, float(prior_count))
+            self.mean[name] = np.array(mean, dtype=np.float64)
+            self.m2[name] = (
+                np.square(std) * (prior_count - 1) if std is not None else np.zeros(n_rows)
+            )
+
+    # ---- ingestion -------------------------------------------------------
+
+    def ingest(self, record):
+        """
+        Add one observation record (dict)
+
+        Returns:
+            bool: False if the record was skipped (bad province / time)
+        """
+        try:
+            row = self.table.row(record['province'])
+            hour = parse_time(record['time'])
+            values = {name: _to_float(record.get(name)) for name in VARIABLES}
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self._skip()
+            return False
+        if row == self.table.unseen_row:
+            return self._ingest_new_province(record['province'], values)
+
+        with self._lock:
+            self._advance(row, hour)
+            for name, value in values.items():
+                if np.isnan(value):
+                    continue
+                if self.last_hour[row] - self.window < hour:
+                    self.values[name][row, hour % self.window] = value
+
+                # Welford update
+                self.count[name][row] += 1
+                delta = value - self.mean[name][row]
+                self.mean[name][row] += delta / self.count[name][row]
+                self.m2[name][row] += delta * (value - self.mean[name][row])
+            self.ingested += 1
+        return True
+
+    def _skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def _ingest_new_province(self, name, values):
+        """Running statistics of a province outside the table (no lag history)"""
+        with self._lock:
+            state = self.new_provinces.get(name)
+            if state is None:
+                if not isinstance(name, str) or len(self.new_provinces) >= MAX_NEW_PROVINCES:
+                    self.skipped += 1
+                    return False
+                state = self.new_provinces[name] = np.zeros((3, len(VARIABLES)))
+            for j, variable in enumerate(VARIABLES):
+                value = values[variable]
+                if np.isnan(value):
+                    continue
+                state[0, j] += 1
+                delta = value - state[1, j]
+                state[1, j] += delta / state[0, j]
+                state[2, j] += delta * (value - state[1, j])
+            self.ingested += 1
+        return True
+
+    def _advance(self, row, hour):
+        """
+        Move the ring buffer of one row forward to `hour` (forward-filling gaps);
+        after a gap of a whole window or more the history starts over
+        """
+        last = self.last_hour[row]
+        if last < 0:
+            self.first_hour[row] = self.last_hour[row] = hour
+            return
+        if hour <= last:
+            if last - self.window < hour < self.first_hour[row]:
+                self.first_hour[row] = hour  # late record still inside the window
+            return
+        if hour - last >= self.window:
+            for name in VARIABLES:
+                self.values[name][row] = np.nan
+            self.first_hour[row] = self.last_hour[row] = hour
+            return
+
+        for name in VARIABLES:
+            buffer = self.values[name][row]
+            previous = buffer[last % self.window]
+            for h in range(last + 1, min(hour, last + self.window) + 1):
+                buffer[h % self.window] = previous
+        self.last_hour[row] = hour
+
+    def ingest_lines(self, lines, header=None):
+        """
+        Ingest JSON lines, or CSV lines when a header (list of column names) is given
+
+        Returns:
+            int: Number of accepted records
+        """
+        if header is not None:
+            records = csv.DictReader(io.StringIO(''.join(lines)), fieldnames=header)
+            return sum(self.ingest(record) for record in records)
+
+        accepted = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self._skip()
+                continue
+            accepted += self.ingest(record)
+        return accepted
+
+    # ---- features --------------------------------------------------------
+
+    def _live(self, rows, hours):
+        age = hours - self.last_hour[rows]
+        return (self.last_hour[rows] >= 0) & (age >= 0) & (age <= self.max_age_hours)
+
+    def _history(self, name, rows, hours, length, live):
+        """(n, length) values at hours-length+1 .. hours, oldest -> newest (NaN if unknown)"""
+        offsets = np.arange(1 - length, 1)
+        wanted = hours[:, None] + offsets
+        lo = np.maximum(self.first_hour[rows], self.last_hour[rows] - self.window + 1)
+        clipped = np.clip(wanted, lo[:, None], self.last_hour[rows][:, None])
+        history = self.values[name][rows[:, None], clipped % self.window]
+        history[~live] = np.nan
+        return history
+
+    def history(self, name, rows, hours, length):
+        """
+        Observed hourly values of one variable up to the requested hours
+
+        Returns:
+            np.ndarray: (n, length) oldest -> newest, forward-filled,
+            NaN where no recent observation exists
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.int64), rows.shape)
+        with self._lock:
+            return self._history(name, rows, hours, length, self._live(rows, hours))
+
+    def latest(self, rows, hours):
+        """
+        Most recent observed value of every variable at the requested hours
+
+        Args:
+            rows: ProvinceTable rows
+            hours: Requested hour per row (hours since the epoch)
+
+        Returns:
+            dict: variable -> array, NaN where no recent observation exists
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.int64), rows.shape)
+        with self._lock:
+            live = self._live(rows, hours)
+            return {name: self._history(name, rows, hours, 1, live)[:, 0] for name in VARIABLES}
+
+    def province_columns(self, rows):
+        """Running *_province statistics for the given rows"""
+        rows = np.asarray(rows, dtype=np.intp)
+        with self._lock:
+            columns = {}
+            for column, (name, statistic) in PROVINCE_COLUMNS.items():
+                if statistic == 'mean':
+                    columns[column] = self.mean[name][rows]
+                else:
+                    count = self.count[name][rows]
+                    columns[column] = np.sqrt(self.m2[name][rows] / np.maximum(count - 1, 1))
+            return columns
+
+    def new_province_columns(self, names):
+        """
+        Running *_province statistics of provinces outside the table
+
+        Returns:
+            dict column -> (n,) array, NaN for names never observed (std needs 2 values)
+        """
+        index = {name: j for j, name in enumerate(VARIABLES)}
+        with self._lock:
+            state = np.full((len(names), 3, len(VARIABLES)), np.nan)
+            for i, name in enumerate(names):
+                if name in self.new_provinces:
+                    state[i] = self.new_provinces[name]
+
+        count, mean, m2 = state[:, 0], state[:, 1], state[:, 2]
+        columns = {}
+        for column, (name, statistic) in PROVINCE_COLUMNS.items():
+            j = index[name]
+            if statistic == 'mean':
+                columns[column] = np.where(count[:, j] > 0, mean[:, j], np.nan)
+            else:
+                std = np.sqrt(m2[:, j] / np.maximum(count[:, j] - 1, 1))
+                columns[column] = np.where(count[:, j] > 1, std, np.nan)
+        return columns
+
+    def features(self, rows, hours, temperature, humidity):
+        """
+        Feature overrides for WeatherPredictor._feature_matrix
+
+        Lag / moving-average columns come from the ring buffers (the requested
+        hour itself uses the given current temperature / humidity); rows without
+        recent observations keep the no-history defaults (lags = current values).
+        The *_province columns are the running statistics.
+
+        Args:
+            rows: ProvinceTable rows
+            hours: Requested hour per row (hours since the epoch)
+            temperature, humidity: Current values used for the requested hour
+
+        Returns:
+            dict: feature name -> array
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.int64), rows.shape)
+        columns = self.province_columns(rows)
+
+        with self._lock:
+            live = self._live(rows, hours)
+            temp_history = self._history('temperature', rows, hours, 6, live)
+            humidity_history = self._history('humidity', rows, hours, 3, live)
+            pressure_history = self._history('pressure', rows, hours, 2, live)
+            wind = self._history('wind_speed', rows, hours, 1, live)[:, 0]
+
+        def complete(history, current):
+            history = np.where(np.isnan(history), current[:, None], history)
+            history[:, -1] = current
+            return history
+
+        pressure = np.where(np.isnan(pressure_history[:, -1]), columns['avg_pressure_province'],
+                            pressure_history[:, -1])
+        wind = np.where(np.isnan(wind), columns['avg_wind_province'], wind)
+
+        features = {
+            **columns,
+            **LagState(complete(temp_history, temperature)).features('temp'),
+            **LagState(complete(humidity_history, humidity), size=3).features('humidity'),
+            **LagState(complete(pressure_history, pressure), size=2).features('pressure'),
+            'pressure': pressure,
+            'wind_speed': wind,
+            'wind_gust': wind * 1.5,
+        }
+        return features
+
+    # ---- checkpoints -----------------------------------------------------
+
+    def save(self, path):
+        """Write the state atomically (tmp file + rename)"""
+        with self._lock:
+            arrays = {'first_hour': self.first_hour, 'last_hour': self.last_hour}
+            for name in VARIABLES:
+                arrays[f'values/{name}'] = self.values[name]
+                arrays[f'count/{name}'] = self.count[name]
+                arrays[f'mean/{name}'] = self.mean[name]
+                arrays[f'm2/{name}'] = self.m2[name]
+            meta = {
+                'provinces': self.table.names,
+                'window': self.window,
+                'offsets': self.offsets,
+                'ingested': self.ingested,
+                'skipped': self.skipped,
+                'new_provinces': {name: state.tolist() for name, state in self.new_provinces.items()},
+            }
+            arrays['meta'] = np.array(json.dumps(meta, ensure_ascii=False))
+
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+
+    def restore(self, path):
+        """
+        Load a checkpoint written by save()
+
+        Raises:
+            ValueError: If the checkpoint was made for other provinces / window
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['provinces'] != self.table.names or meta['window'] != self.window:
+                raise ValueError(f"Checkpoint {path} does not match the loaded province table")
+
+            with self._lock:
+                self.first_hour = data['first_hour']
+                self.last_hour = data['last_hour']
+                for name in VARIABLES:
+                    self.values[name] = data[f'values/{name}']
+                    self.count[name] = data[f'count/{name}']
+                    self.mean[name] = data[f'mean/{name}']
+                    self.m2[name] = data[f'm2/{name}']
+                self.offsets = meta['offsets']
+                self.ingested = meta['ingested']
+                self.skipped = meta['skipped']
+                self.new_provinces = {
+                    name: np.array(state) for name, state in meta.get('new_provinces', {}).items()
+                }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ingested': self.ingested,
+                'skipped': self.skipped,
+                'provinces_observed': int((self.last_hour[:-1] >= 0).sum()),
+                'new_provinces': len(self.new_provinces),
+                'files': len(self.offsets),
+            }
+
+
+class DirectoryTailer:
+    """
+    Background thread that tails *.jsonl / *.json / *.csv files in a directory
+
+    Only complete lines are consumed; per-file byte offsets are stored in the
+    store, so a restored checkpoint resumes where it stopped instead of replaying.
+    """
+
+    SUFFIXES = ('.jsonl', '.json', '.csv')
+
+    def __init__(self, store, directory, checkpoint_path=None, poll_interval=1.0,
+                 checkpoint_interval=30.0):
+        """
+        Args:
+            store: ObservationStore to feed
+            directory: Directory to watch (new files and appends are picked up)
+            checkpoint_path: Where to save the state (restored on start if it exists)
+            poll_interval: Seconds between directory scans
+            checkpoint_interval: Seconds between checkpoints
+        """
+        self.store = store
+        self.directory = directory
+        self.checkpoint_path = checkpoint_path
+        self.poll_interval = poll_interval
+        self.checkpoint_interval = checkpoint_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.checkpoint_path and os.path.isfile(self.checkpoint_path):
+            self.store.restore(self.checkpoint_path)
+            print(f"✅ Restored observation state ({self.store.ingested} records)")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='observation-tailer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint()
+
+    def checkpoint(self):
+        if self.checkpoint_path:
+            self.store.save(self.checkpoint_path)
+
+    def _run(self):
+        last_checkpoint = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"⚠️ Observation tailing failed: {type(e).__name__}: {e}")
+            if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+                last_checkpoint = time.monotonic()
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self):
+        """
+        Read new complete lines of every file once
+
+        Returns:
+            int: Number of accepted records
+        """
+        accepted = 0
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(self.SUFFIXES):
+                accepted += self._read_file(os.path.join(self.directory, name))
+        return accepted
+
+    def _read_file(self, path):
+        offset = self.store.offsets.get(path, 0)
+        size = os.path.getsize(path)
+        if size < offset:
+            print(f"ℹ️ {path} was truncated or replaced: reading it from the start")
+            offset = 0
+        if size <= offset:
+            return 0
+
+        with open(path, 'rb') as f:
+            header = None
+            if path.endswith('.csv'):
+                header_line = f.readline()
+                if not header_line.endswith(b'\n'):
+                    return 0
+                header = next(csv.reader([header_line.decode('utf-8-sig', errors='replace')]))
+                offset = max(offset, len(header_line))
+
+            f.seek(offset)
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1  # leave a partially written last line for later
+        if end == 0:
+            return 0
+
+        # Undecodable bytes become U+FFFD: such a line fails to parse and is skipped
+        lines = data[:end].decode('utf-8', errors='replace').splitlines(keepends=True)
+        accepted = self.store.ingest_lines(lines, header)
+        self.store.offsets[path] = offset + end
+        return accepted
+
+
+async def serve_socket(store, host='127.0.0.1', port=8001):
+    """Accept JSON-lines observation streams over TCP"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                store.ingest_lines([line.decode('utf-8', errors='replace')])
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"✅ Accepting observations on tcp://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    import argparse
+
+    from utils.province_table import ProvinceTable
+    from utils.spark_io import read_string_indexer_labels
+
+    parser = argparse.ArgumentParser(description='Tail observation files into a checkpointed state')
+    parser.add_argument('directory')
+    parser.add_argument('--model-path', default='weather_models')
+    parser.add_argument('--checkpoint', default=None)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    table = ProvinceTable.read_csv(
+        f'{args.model_path}/province_stats.csv',
+        read_string_indexer_labels(f'{args.model_path}/province_indexer'),
+        read_string_indexer_labels(f'{args.model_path}/city_indexer')
+    )
+    store = ObservationStore(table)
+    tailer = DirectoryTailer(store, args.directory, args.checkpoint or f'{args.directory}/state.npz',
+                             poll_interval=args.poll_interval)
+    tailer.start()
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📊 {json.dumps(store.stats())}")
+    except KeyboardInterrupt:
+        tailer.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
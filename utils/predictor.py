@@ -1,44 +1,322 @@
 # ===== utils/predictor.py =====
 
-import pandas as pd
 import numpy as np
 import json
 from datetime import datetime
 import os
+import threading
+import time
+
+from utils.bundle import BUNDLE_FILENAME, ModelBundle, bundle_is_stale, variant_path
+from utils.cache import PredictionCache
+from utils.clusters import ClusterPriors, LatencyBudget, ProvinceClusters
+from utils.features import FeatureTransform
+from utils.loader import ComponentLoader, LazyComponent
+from utils.metrics import NO_TIMER, ProfileSampler, StageMetrics
+from utils.province_table import ProvinceTable
+from utils.rollout import LagState
+from utils.spark_io import (
+    import_parquet, read_kmeans_centers, read_model_metadata, read_scaler, read_string_indexer_labels
+)
+from utils.trees import GBTRegressionModel, RandomForestModel
+
 
 class WeatherPredictor:
-    def __init__(self, model_path='weather_models'):
+    # Cache key resolution: temperature in 0.1°C, humidity in 1%
+    TEMP_RESOLUTION = 0.1
+    HUMIDITY_RESOLUTION = 1.0
+    
+    # Loaded concurrently from a Spark models folder, waited for on first use (None when absent)
+    rf_model = LazyComponent()
+    gbt_model = LazyComponent()
+    kmeans_centers = LazyComponent()
+    feature_transform = LazyComponent()
+    
+    def __init__(self, model_path='weather_models', cache_size=4096, cache_ttl=3600.0,
+                 prewarm_cache=False, instrument=False, profile_rate=0.0, variant=None,
+                 latency_budget_ms=None, lazy=False):
         """
         Initialize Weather Predictor
         
         Args:
-            model_path: Path to models folder
+            model_path: Path to models folder, or to a model bundle file
+                        (a folder containing model.bundle loads the bundle, unless
+                        the Spark models next to it changed since it was exported)
+            cache_size: Max cached predict() results (0 = no cache)
+            cache_ttl: Seconds before a cached result expires (None = never)
+            prewarm_cache: Fill the cache for all provinces x 24 hours of today
+            instrument: Time every prediction stage (see enable_instrumentation)
+            profile_rate: Fraction of predict/predict_batch calls captured with cProfile
+            variant: Name of a reduced forest variant saved with
+                     `python -m utils.variants build` (loads <model_path>/variants/<name>.bundle)
+            latency_budget_ms: Serve cluster priors instead of the trees while the
+                               model's recent latency says a call would exceed this
+                               (once the priors exist: bundled, or after the first
+                               unknown-province fallback)
+            lazy: Return as soon as metadata and provinces are loaded; the models
+                  keep loading in the background and are waited for on first use
+                  (Spark models folder only, a bundle is memory-mapped anyway)
         """
         self.model_path = model_path
+        self.model_version = None
+        self.variant = variant
+        self.lazy = lazy
+        self.bundle = None
+        self._loader = None  # ComponentLoader of a Spark models folder
+        self.observations = None  # ObservationStore with live lag features (attach_observations)
+        self.drift_monitor = None  # DriftMonitor of live inputs (enable_drift_monitor)
+        self.history = None  # PredictionHistory logging every prediction (attach_history)
+        self.metrics = None  # StageMetrics when instrumented
+        self.profiler = None  # ProfileSampler when profiling
+        self._province_stats = None  # DataFrame, built on first access
+        self._anytime_forest = None  # built on the first early_exit / budget_ms call
+        self._rf_explainer = None  # TreeSHAP explainers, built on the first explain call
+        self._gbt_explainer = None
         
-        # Load metadata
-        with open(f'{model_path}/metadata.json', 'r', encoding='utf-8') as f:
-            self.metadata = json.load(f)
+        # Fallback for unknown provinces / over-budget calls (see _ensure_clusters)
+        self.province_clusters = None
+        self.cluster_labels = None  # cluster per province table row
+        self.cluster_priors = None
+        self._clusters_lock = threading.Lock()
+        self.latency_budget = LatencyBudget(latency_budget_ms) if latency_budget_ms else None
+        
+        bundle_path = model_path if os.path.isfile(model_path) else f'{model_path}/{BUNDLE_FILENAME}'
+        if variant is not None:
+            bundle_path = variant_path(model_path, variant)
+            if not os.path.isfile(bundle_path):
+                raise FileNotFoundError(f"Model variant '{variant}' not found ({bundle_path})")
+            if bundle_is_stale(bundle_path, model_path):
+                raise ValueError(f"Model variant '{variant}' was built from other models than {model_path}: "
+                                 f"rebuild it with python -m utils.variants build")
+        elif os.path.isdir(model_path) and os.path.isfile(bundle_path) and bundle_is_stale(bundle_path, model_path):
+            print(f"⚠️ {bundle_path} was exported from other models than {model_path}: ignored "
+                  f"(re-export it with python -m utils.bundle {model_path})")
+            bundle_path = None
+        if bundle_path is not None and os.path.isfile(bundle_path):
+            start = time.perf_counter()
+            self._load_bundle(bundle_path)
+            self._bundle_seconds = time.perf_counter() - start
+        else:
+            self._load_spark_models(model_path)
+        
+        print("✅ Loaded metadata & province stats")
+        print(f"📊 Weather classes: {self.weather_classes}")
+        print(f"📊 Provinces: {self.province_table.num_provinces}")
+        
+        if instrument or profile_rate:
+            self.enable_instrumentation(profile_rate)
+        
+        # Result cache for predict(), keyed on quantized inputs + model version
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size else None
+        
+        if self._loader is not None and lazy:
+            if self.cache is not None and prewarm_cache:
+                self._loader.submit('cache_prewarm', self.prewarm_cache, after=tuple(self._loader.pending()))
+            self._loader.shutdown()
+            print(f"⏳ Loading in background: {', '.join(self._loader.pending())}")
+            return
+        
+        if self._loader is not None:
+            self._loader.shutdown()
+            self._loader.wait_all()
+            print(f"⏱️ Load times: {self._loader.report()}")
+        if self.rf_model is not None:
+            variant_info = f", variant '{self.variant}'" if self.variant else ''
+            print(f"✅ Loaded Random Forest ({self.rf_model.ensemble.num_trees} trees{variant_info})")
+        if self.gbt_model is not None:
+            print(f"✅ Loaded GBT regressor ({self.gbt_model.ensemble.num_trees} trees)")
+        
+        if self.cache is not None and prewarm_cache:
+            self.prewarm_cache()
+    
+    def _load_spark_models(self, model_path):
+        """
+        Load metadata, province stats and models from the Spark-saved folder
+        
+        Every parquet artifact is decoded concurrently on a ComponentLoader;
+        this returns once metadata and the province table are ready, the
+        models resolve on first access (LazyComponent).
+        """
+        loader = self._loader = ComponentLoader()
+        has_indexers = os.path.isdir(f'{model_path}/province_indexer')
+        has_models = os.path.isdir(f'{model_path}/rf_classifier')
         
+        # Every parquet reader needs pyarrow: imported once, first, so its import
+        # time is not spread over (and hidden in) the component timings
+        if has_indexers or has_models:
+            loader.submit('import_pyarrow', import_parquet)
+        parquet = ('import_pyarrow',)
+        
+        # StringIndexers (handleInvalid=keep: unseen label -> len(labels))
+        if has_indexers:
+            loader.submit('province_indexer', read_string_indexer_labels, f'{model_path}/province_indexer',
+                          after=parquet)
+            loader.submit('city_indexer', read_string_indexer_labels, f'{model_path}/city_indexer', after=parquet)
+        
+        # Models (pure NumPy, no SparkSession needed)
+        if has_models:
+            loader.submit('rf_model', RandomForestModel.load, f'{model_path}/rf_classifier', after=parquet)
+            # Next-hour temperature regressor
+            if os.path.isdir(f'{model_path}/gbt_regressor'):
+                loader.submit('gbt_model', GBTRegressionModel.load, f'{model_path}/gbt_regressor', after=parquet)
+            loader.submit('scaler', read_scaler, f'{model_path}/scaler', after=parquet)
+            if os.path.isdir(f'{model_path}/kmeans_clustering'):
+                loader.submit('kmeans_centers', read_kmeans_centers, f'{model_path}/kmeans_clustering',
+                              after=parquet)
+        
+        # Load metadata
+        self.metadata = loader.run('metadata', self._read_json, f'{model_path}/metadata.json')
+        self.model_version = self.metadata['project_info']['created_date']
+        if has_models:
+            self.model_version = str(read_model_metadata(f'{model_path}/rf_classifier')['timestamp'])
         self.weather_classes = self.metadata['classes']['weather_classes']
         self.features = self.metadata['features']['all_features']
         
-        # Load province stats
-        self.province_stats = pd.read_csv(f'{model_path}/province_stats.csv')
+        # Array-backed province lookup (O(1) per province, gather by row id);
+        # the indexer codes are filled in once the indexers are decoded
+        self.province_table = loader.run(
+            'province_stats', ProvinceTable.read_csv, f'{model_path}/province_stats.csv'
+        )
+        if has_indexers:
+            loader.submit('indexer_codes', self._set_indexer_codes, after=('province_indexer', 'city_indexer'))
         
-        print("✅ Loaded metadata & province stats")
-        print(f"📊 Weather classes: {self.weather_classes}")
-        print(f"📊 Provinces: {len(self.province_stats)}")
+        if has_models:
+            loader.submit('feature_transform', self._build_feature_transform,
+                          after=('scaler', 'indexer_codes') if has_indexers else ('scaler',))
+    
+    @staticmethod
+    def _read_json(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _set_indexer_codes(self):
+        loader = self._loader
+        self.province_table.set_codes(loader.result('province_indexer'), loader.result('city_indexer'))
+    
+    def _build_feature_transform(self):
+        """FeatureTransform once the scaler and indexer codes are loaded (runs on the loader)"""
+        self._set_scaler(*self._loader.result('scaler'))
+        return FeatureTransform(
+            self.features, self.province_table, self.scaler_mean, self.scaler_inv_std, self.scaler_with_mean
+        )
+    
+    @property
+    def anytime_forest(self):
+        """AnytimeForest over rf_model, in the saved tree order if there is one (utils.anytime)"""
+        if self._anytime_forest is None:
+            from utils.anytime import AnytimeForest, read_order
+            
+            self._anytime_forest = AnytimeForest(self.rf_model, read_order(self.model_path, self.model_version))
+        return self._anytime_forest
+    
+    @property
+    def rf_explainer(self):
+        """TreeExplainer of the RF class probabilities (utils.explain)"""
+        if self._rf_explainer is None:
+            from utils.explain import TreeExplainer
+            
+            self._rf_explainer = TreeExplainer.for_forest(self.rf_model)
+        return self._rf_explainer
+    
+    @property
+    def gbt_explainer(self):
+        """TreeExplainer of the GBT temperature (None without a GBT model)"""
+        if self._gbt_explainer is None and self.gbt_model is not None:
+            from utils.explain import TreeExplainer
+            
+            self._gbt_explainer = TreeExplainer.for_gbt(self.gbt_model)
+        return self._gbt_explainer
+    
+    @property
+    def load_timings(self):
+        """
+        Seconds spent loading each component (on its loader thread), plus
+        'wait:<component>' for the time callers were blocked on one
+        """
+        if self._loader is None:
+            return {'bundle': self._bundle_seconds}
+        timings = dict(self._loader.timings)
+        timings.update({f'wait:{name}': seconds for name, seconds in self._loader.waits.items()})
+        return timings
+    
+    def wait_until_loaded(self):
+        """Block until every background component is loaded (lazy=True)"""
+        if self._loader is not None:
+            self._loader.wait_all()
+        return self
+    
+    def _load_bundle(self, bundle_path):
+        """Open a model bundle (memory-mapped, arrays are shared between processes)"""
+        bundle = ModelBundle(bundle_path)
+        header = bundle.header
+        self.bundle = bundle
+        self.metadata = header['metadata']
+        self.model_version = header.get('model_version', self.metadata['project_info']['created_date'])
+        
+        self.province_table = ProvinceTable(
+            names=header['provinces'],
+            columns={name: bundle[f'province/{name}'] for name in header['province_columns']},
+            province_codes=bundle['province/province_codes'],
+            city_codes=bundle['province/city_codes']
+        )
+        
+        # Reduced variants keep their (possibly 8-bit) leaf probabilities as the node values
+        rf = header['rf']
+        leaf_probability = bundle['rf/leaf_probability'] if 'rf/leaf_probability' in bundle else bundle['rf/value']
+        self.rf_model = RandomForestModel(bundle.ensemble('rf'), leaf_probability,
+                                          rf.get('probability_scale', 1.0))
+        self.gbt_model = GBTRegressionModel(bundle.ensemble('gbt'))
+        
+        scaler = header['scaler']
+        self._set_scaler(bundle['scaler/mean'], bundle['scaler/std'], scaler['with_mean'], scaler['with_std'])
+        
+        self.kmeans_centers = bundle['kmeans/centers']
+        
+        self.weather_classes = self.metadata['classes']['weather_classes']
+        self.features = self.metadata['features']['all_features']
+        self.feature_transform = FeatureTransform(
+            self.features, self.province_table, self.scaler_mean, self.scaler_inv_std, self.scaler_with_mean
+        )
+        if 'clusters' in header:
+            clusters = header['clusters']
+            self.province_clusters = ProvinceClusters(
+                bundle['clusters/centers'], bundle['clusters/mean'], bundle['clusters/std'],
+                clusters['columns'], clusters['source']
+            )
+            self.cluster_labels = self.province_clusters.table_labels(self.province_table)
+            self.cluster_priors = ClusterPriors(bundle['clusters/priors'], bundle['clusters/temperature'])
+    
+    def _set_scaler(self, mean, std, with_mean, with_std):
+        """StandardScaler: scaled = (raw [- mean]) / std, 0 where std == 0"""
+        self.scaler_with_mean = with_mean
+        self.scaler_mean = mean
+        if with_std:
+            self.scaler_inv_std = np.divide(1.0, std, out=np.zeros_like(std), where=std != 0)
+        else:
+            self.scaler_inv_std = np.ones_like(std)
+    
+    @property
+    def province_stats(self):
+        """Province statistics as a DataFrame (pandas is only imported here)"""
+        if self._province_stats is None:
+            import pandas as pd
+            
+            table = self.province_table
+            data = {'province': table.names}
+            data.update({name: column[:table.num_provinces] for name, column in table.columns.items()})
+            self._province_stats = pd.DataFrame(data)
+        return self._province_stats
     
     def get_provinces(self):
         """Get list of available provinces"""
-        return sorted(self.province_stats['province'].tolist())
+        return self.province_table.sorted_names()
     
     def get_weather_classes(self):
         """Get list of weather classes"""
         return self.weather_classes
     
-    def predict(self, time_str, province, temperature=None, humidity=None):
+    def predict(self, time_str, province, temperature=None, humidity=None, early_exit=False, budget_ms=None,
+                explain=False):
         """
         Predict weather
         
@@ -47,57 +325,849 @@ class WeatherPredictor:
             province: Province name
             temperature: Current temperature (optional)
             humidity: Current humidity (optional)
+            early_exit: Stop voting once the predicted class is settled (utils.anytime)
+            budget_ms: Stop voting when this time is up (the class of the trees so far)
+            explain: Add 'explanation', the TreeSHAP contribution of every feature to the
+                     predicted class probability and to the temperature (whole forest,
+                     see explain_batch; not for cluster prior / rule-based results)
         
         Returns:
-            dict: Prediction result
+            dict: Prediction result ('trees_used' with early_exit / budget_ms)
         """
-        
-        # Parse time
-        if isinstance(time_str, str):
-            dt = datetime.strptime(time_str, "%m/%d/%Y %H:%M")
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+        if self.metrics is None and self.profiler is None:
+            result = self._predict(time_str, province, temperature, humidity, early_exit, deadline, explain)
         else:
-            dt = time_str
-        
-        hour = dt.hour
-        day_of_week = dt.weekday() + 2  # PySpark: 1=Sunday, adjust
-        if day_of_week > 7:
-            day_of_week = 1
-        month_num = dt.month
-        day_of_month = dt.day
-        is_day = 1 if 6 <= hour <= 18 else 0
+            with self._profile('predict'), self._stage('predict'):
+                result = self._predict(time_str, province, temperature, humidity, early_exit, deadline, explain)
         
-        # Get province statistics
-        prov_stats = self.province_stats[self.province_stats['province'] == province]
+        if self.history is not None:
+            self.history.log_result(time_str, province, result, temperature, humidity)
+        return result
+    
+    def explain(self, time_str, province, temperature=None, humidity=None):
+        """
+        The 'explanation' of predict(..., explain=True), computed on its own (e.g. when
+        a user asks for it); the prediction itself is not logged to the history
         
-        if prov_stats.empty:
-            # Use default if province not found
-            prov_stats = self.province_stats.iloc[0:1].copy()
-            print(f"⚠️ Province '{province}' not found, using default")
+        Args:
+            Same as predict
         
-        # Use province average if not provided
-        if temperature is None:
-            temperature = float(prov_stats['avg_temp_province'].values[0])
+        Returns:
+            dict or None: TreeSHAP explanation (None for cluster prior / rule-based results)
+        """
+        return self._predict(time_str, province, temperature, humidity, explain=True).get('explanation')
+    
+    def _predict(self, time_str, province, temperature, humidity, early_exit=False, deadline=None, explain=False):
+        # Parse time
+        with self._stage('parse'):
+            if isinstance(time_str, str):
+                dt = datetime.strptime(time_str, "%m/%d/%Y %H:%M")
+            else:
+                dt = time_str
+            
+            hour = dt.hour
+            day_of_week = dt.weekday() + 2  # PySpark: 1=Sunday, adjust
+            if day_of_week > 7:
+                day_of_week = 1
+            month_num = dt.month
+            day_of_month = dt.day
+            is_day = 1 if 6 <= hour <= 18 else 0
         
-        if humidity is None:
-            humidity = float(prov_stats['avg_humidity_province'].values[0])
+        # Get province statistics
+        with self._stage('lookup'):
+            table = self.province_table
+            row = table.row(province)
+            
+            if row == table.unseen_row:
+                # Unseen province: cluster priors (models), "keep" row averages (rules)
+                print(f"⚠️ Province '{province}' not found, using "
+                      f"{'cluster priors' if self.rf_model is not None else 'default'}")
+            
+            # Latest live observation, if any (see attach_observations)
+            if self.observations is not None and (temperature is None or humidity is None):
+                latest = self.observations.latest([row], self._hours_since_epoch([dt]))
+                if temperature is None and not np.isnan(latest['temperature'][0]):
+                    temperature = float(latest['temperature'][0])
+                if humidity is None and not np.isnan(latest['humidity'][0]):
+                    humidity = float(latest['humidity'][0])
+            
+            # Use province average if not provided
+            if temperature is None:
+                temperature = float(table.column('avg_temp_province')[row])
+            
+            if humidity is None:
+                humidity = float(table.column('avg_humidity_province')[row])
         
-        # Simple rule-based prediction (since we can't use PySpark in Streamlit easily)
-        # This is a simplified version - replace with actual model inference if needed
+        if self.rf_model is not None:
+            key = None
+            anytime = early_exit or deadline is not None
+            if self.cache is not None and self.observations is None and not anytime:
+                # Score the quantized inputs so a cached result is exact for its key
+                temperature, humidity = self._quantize(temperature, humidity)
+                key = self._cache_key(row, hour, day_of_week, month_num, day_of_month,
+                                      temperature, humidity)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self._count('cache_hits')
+                    if self.drift_monitor is not None:
+                        # Live traffic even though the trees are skipped
+                        self._observe_drift(self._time_features([dt]), np.array([row]), [province],
+                                            np.array([temperature]), np.array([humidity]))
+                    result = self._copy_result(cached)
+                    if explain:
+                        result['explanation'] = self._explanation(dt, province, temperature, humidity)
+                    return result
+            
+            batch = self._predict_batch([dt], [province], [temperature], [humidity], early_exit, deadline)
+            with self._stage('postprocess'):
+                result = self._model_prediction(
+                    batch['probabilities'][0], temperature, humidity, batch['predicted_temp'][0]
+                )
+            if anytime:
+                result['trees_used'] = int(batch['trees_used'][0])
+            if batch['fallback'][0]:
+                # Unknown province / over the latency budget: never cached
+                result['fallback'] = 'cluster_prior'
+                return result
+            if key is not None:
+                self.cache.put(key, result)
+                result = self._copy_result(result)
+            if explain:
+                result['explanation'] = self._explanation(dt, province, temperature, humidity)
+            return result
         
+        # Simple rule-based prediction (models folder without rf_classifier)
         prediction = self._rule_based_prediction(
             hour=hour,
             month=month_num,
             temperature=temperature,
             humidity=humidity,
-            province_avg_temp=float(prov_stats['avg_temp_province'].values[0])
+            province_avg_temp=float(table.column('avg_temp_province')[row])
         )
         
         return prediction
     
+    def predict_batch(self, times, provinces=None, temperatures=None, humidities=None, early_exit=False,
+                      budget_ms=None):
+        """
+        Predict weather for many (time, province) rows in one vectorized pass
+        
+        Args:
+            times: DataFrame with 'time', 'province' and optional 'temperature',
+                   'humidity' columns, or array of "6/30/2025 14:00" strings / datetimes
+            provinces: Array of province names (when times is not a DataFrame)
+            temperatures: Current temperatures (optional, NaN = province average)
+            humidities: Current humidities (optional, NaN = province average)
+            early_exit: Stop voting for rows whose class is settled (utils.anytime)
+            budget_ms: Stop voting for every row when this time is up
+        
+        Returns:
+            dict of arrays: 'class_index' (n,), 'weather_main' (n,), 'probability' (n,),
+            'probabilities' (n, num_weather_classes), 'predicted_temp' (n,), 'fallback' (n,),
+            'trees_used' (n,) and the scalar 'model_version'
+        """
+        self._require_models('predict_batch')
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+        times, provinces, temperatures, humidities = self._unpack_frame(times, provinces, temperatures, humidities)
+        if self.metrics is None and self.profiler is None:
+            result = self._predict_batch(times, provinces, temperatures, humidities, early_exit, deadline)
+        else:
+            with self._profile('predict_batch'), self._stage('predict_batch'):
+                result = self._predict_batch(times, provinces, temperatures, humidities, early_exit, deadline)
+        
+        if self.history is not None:
+            self.history.log(times, provinces, result, temperatures, humidities, self.weather_classes)
+        return result
+    
+    def _predict_batch(self, times, provinces, temperatures, humidities, early_exit=False, deadline=None,
+                       monitor=True):
+        times, provinces, temperatures, humidities = self._unpack_frame(times, provinces, temperatures, humidities)
+        time_features, rows, temperature, humidity, overrides = self._resolve_batch(
+            times, provinces, temperatures, humidities
+        )
+        
+        # Over the latency budget: the whole batch from the cluster priors, if they are
+        # ready (scoring them here would be the slowest path: the trees answer instead)
+        budget = self.latency_budget
+        if budget is not None and self.cluster_priors is not None and not budget.allow(len(rows)):
+            self._count('fallback_rows', len(rows))
+            if monitor and self.drift_monitor is not None:
+                self._observe_drift(time_features, rows, provinces, temperature, humidity, overrides)
+            probabilities, predicted_temp = self._prior_scores(
+                time_features, rows, provinces, temperature, humidity
+            )
+            return self._batch_result(probabilities, predicted_temp, np.ones(len(rows), dtype=bool),
+                                      np.zeros(len(rows), dtype=np.intp))
+        
+        start = time.perf_counter()
+        result = self._score(time_features, rows, temperature, humidity, overrides, early_exit, deadline,
+                             observe=monitor)
+        if budget is not None:
+            budget.record(len(rows), time.perf_counter() - start)
+        
+        # Unknown provinces: cluster priors instead of the "keep" row
+        unknown = rows == self.province_table.unseen_row
+        if np.any(unknown):
+            self._count('fallback_rows', int(unknown.sum()))
+            if monitor and self.drift_monitor is not None:
+                self.drift_monitor.observe_unknown(np.asarray(provinces, dtype=object)[unknown])
+            probabilities, predicted_temp = self._prior_scores(
+                {name: values[unknown] for name, values in time_features.items()}, rows[unknown],
+                np.asarray(provinces, dtype=object)[unknown], temperature[unknown], humidity[unknown]
+            )
+            probabilities_all = result['probabilities'].copy()
+            predicted_all = np.array(result['predicted_temp'], dtype=np.float64)
+            probabilities_all[unknown] = probabilities
+            predicted_all[unknown] = predicted_temp
+            trees_used = np.where(unknown, 0, result['trees_used'])
+            return self._batch_result(probabilities_all, predicted_all, unknown, trees_used)
+        return result
+    
+    def explain_batch(self, times, provinces=None, temperatures=None, humidities=None):
+        """
+        TreeSHAP values (path-dependent, utils.explain) of the RF class probabilities
+        and the GBT temperature for raw rows; for every row and output
+        base value + contributions.sum() equals the model output
+        
+        Args:
+            Same as predict_batch
+        
+        Returns:
+            dict: 'features' (names), 'feature_values' (n, num_features, raw values),
+            'class_index' (n,), 'weather_shap' (n, num_features, num_weather_classes),
+            'weather_base' (num_weather_classes,), 'temperature_shap' (n, num_features)
+            and 'temperature_base' (None without a GBT model)
+        """
+        self._require_models('explain_batch')
+        X = self.feature_matrix(times, provinces, temperatures, humidities)
+        num_classes = len(self.weather_classes)
+        with self._stage('explain'):
+            rf_explainer = self.rf_explainer
+            weather_shap = rf_explainer.shap_values(X, outputs=np.arange(num_classes))
+            weather_base = rf_explainer.expected_value[:num_classes]
+            
+            temperature_shap = temperature_base = None
+            if self.gbt_explainer is not None:
+                temperature_shap = self.gbt_explainer.shap_values(X)[:, :, 0]
+                temperature_base = float(self.gbt_explainer.expected_value[0])
+        
+        return {
+            'features': list(self.features),
+            'feature_values': self.feature_transform.inverse(X),
+            'class_index': np.argmax(weather_base + weather_shap.sum(axis=1), axis=1),
+            'weather_shap': weather_shap,
+            'weather_base': weather_base,
+            'temperature_shap': temperature_shap,
+            'temperature_base': temperature_base
+        }
+    
+    def _explanation(self, dt, province, temperature, humidity):
+        """
+        JSON-friendly explain_batch of one predict() row, for its predicted class
+        only (the class comes from the forest, one SHAP output instead of all)
+        """
+        X = self.feature_matrix([dt], [province], [temperature], [humidity])
+        features = list(self.features)
+        with self._stage('explain'):
+            class_index = int(np.argmax(self.rf_model.predict_proba(X)[0, :len(self.weather_classes)]))
+            weather_shap = self.rf_explainer.shap_values(X, outputs=[class_index])[0, :, 0]
+            explanation = {
+                'weather': {
+                    'class': self.weather_classes[class_index],
+                    'base_value': float(self.rf_explainer.expected_value[class_index]),
+                    'contributions': dict(zip(features, weather_shap.tolist()))
+                },
+                'feature_values': {
+                    name: (None if np.isnan(value) else value)
+                    for name, value in zip(features, self.feature_transform.inverse(X)[0].tolist())
+                }
+            }
+            if self.gbt_explainer is not None:
+                explanation['temperature'] = {
+                    'base_value': float(self.gbt_explainer.expected_value[0]),
+                    'contributions': dict(zip(features, self.gbt_explainer.shap_values(X)[0, :, 0].tolist()))
+                }
+        return explanation
+    
+    @staticmethod
+    def _unpack_frame(times, provinces, temperatures, humidities):
+        """Columns of a DataFrame input (other inputs pass through)"""
+        if hasattr(times, 'columns'):  # DataFrame
+            frame = times
+            times = frame['time'].values
+            provinces = frame['province'].values
+            if 'temperature' in frame:
+                temperatures = frame['temperature'].values
+            if 'humidity' in frame:
+                humidities = frame['humidity'].values
+        return times, provinces, temperatures, humidities
+    
+    def feature_matrix(self, times, provinces=None, temperatures=None, humidities=None):
+        """
+        Scaled model input for raw rows, exactly what predict_batch feeds the trees
+        
+        Args:
+            Same as predict_batch
+        
+        Returns:
+            np.ndarray: shape (n, num_features)
+        """
+        return self._feature_matrix(*self._resolve_batch(
+            *self._unpack_frame(times, provinces, temperatures, humidities)
+        ))
+    
+    def _resolve_batch(self, times, provinces, temperatures, humidities):
+        """(time_features, rows, temperature, humidity, overrides) for raw batch inputs"""
+        with self._stage('parse'):
+            times = self._to_datetime64(times)
+            time_features = self._time_features(times)
+        
+        with self._stage('lookup'):
+            # Province table rows (unknown province -> unseen "keep" row)
+            table = self.province_table
+            rows = table.rows(provinces)
+            
+            default_temp = table.column('avg_temp_province')[rows]
+            default_humidity = table.column('avg_humidity_province')[rows]
+            
+            observations = self.observations
+            if observations is None:
+                temperature = self._fill_missing(temperatures, default_temp)
+                humidity = self._fill_missing(humidities, default_humidity)
+                overrides = None
+            else:
+                # Live observations: latest values as defaults, real lag features
+                hours = self._hours_since_epoch(times)
+                latest = observations.latest(rows, hours)
+                temperature = self._fill_missing(temperatures, self._fill_missing(latest['temperature'], default_temp))
+                humidity = self._fill_missing(humidities, self._fill_missing(latest['humidity'], default_humidity))
+                overrides = observations.features(rows, hours, temperature, humidity)
+        
+        return time_features, rows, temperature, humidity, overrides
+    
+    def _score(self, time_features, rows, temperature, humidity, overrides=None, early_exit=False, deadline=None,
+               observe=False):
+        """
+        Featurize + RF + GBT for rows that are already resolved to table rows
+        (observe: live inputs, binned by the drift monitor if there is one)
+        """
+        self._count('rows', len(rows))
+        X = self._feature_matrix(time_features, rows, temperature, humidity, overrides)
+        if observe and self.drift_monitor is not None:
+            with self._stage('drift'):
+                self.drift_monitor.observe(X, rows, self.feature_transform)
+        with self._stage('rf'):
+            trees_used = None
+            if early_exit or deadline is not None:
+                probabilities, trees_used = self.anytime_forest.predict_proba(X, early_exit, deadline)
+                self._count('trees_skipped', int(len(rows) * self.rf_model.ensemble.num_trees - trees_used.sum()))
+            else:
+                probabilities = self.rf_model.predict_proba(X)
+            probabilities = probabilities[:, :len(self.weather_classes)]
+        
+        # Next-hour temperature from the GBT (persistence if it is not available)
+        with self._stage('gbt'):
+            if self.gbt_model is not None:
+                predicted_temp = self.gbt_model.predict(X)
+            else:
+                predicted_temp = temperature.copy()
+        
+        with self._stage('postprocess'):
+            return self._batch_result(probabilities, predicted_temp, trees_used=trees_used)
+    
+    def _observe_drift(self, time_features, rows, provinces, temperature, humidity, overrides=None):
+        """
+        Bin live inputs that are answered without _score (cache hits, over-budget
+        cluster priors) like _score / _predict_batch do
+        """
+        with self._stage('drift'):
+            X = self.feature_transform.transform(time_features, rows, temperature, humidity, overrides)
+            self.drift_monitor.observe(X, rows, self.feature_transform)
+            unknown = rows == self.province_table.unseen_row
+            if np.any(unknown):
+                self.drift_monitor.observe_unknown(np.asarray(provinces, dtype=object)[unknown])
+    
+    def _require_models(self, what):
+        """
+        Raises:
+            RuntimeError: If the folder has no rf_classifier (only predict() has a
+                          rule-based fallback)
+        """
+        if self.rf_model is None:
+            raise RuntimeError(f"{what} needs the Spark models (rf_classifier not found)")
+    
+    def _batch_result(self, probabilities, predicted_temp, fallback=None, trees_used=None):
+        """
+        Batch result dict; fallback marks rows answered from the cluster priors,
+        trees_used the trees that voted per row (default: the whole forest)
+        """
+        class_index = np.argmax(probabilities, axis=1)
+        if trees_used is None:
+            trees_used = np.full(len(class_index), self.rf_model.ensemble.num_trees)
+        return {
+            'class_index': class_index,
+            'weather_main': np.asarray(self.weather_classes, dtype=object)[class_index],
+            'probability': probabilities[np.arange(len(class_index)), class_index],
+            'probabilities': probabilities,
+            'predicted_temp': predicted_temp,
+            'fallback': fallback if fallback is not None else np.zeros(len(class_index), dtype=bool),
+            'trees_used': trees_used,
+            'model_version': self.model_version
+        }
+    
+    def _ensure_clusters(self):
+        """
+        Province clusters and their cluster x month x hour priors
+        
+        Bundles carry them precomputed (export_bundle); for a Spark models
+        folder they are scored once, on the first unknown-province fallback
+        (~22k rows: every province x month x hour). The rows are not serving
+        traffic: no stage timings / counters.
+        """
+        if self.cluster_priors is not None:
+            return
+        with self._clusters_lock:
+            if self.cluster_priors is not None:
+                return
+            table = self.province_table
+            clusters = ProvinceClusters.fit(table, self.kmeans_centers)
+            labels = clusters.table_labels(table)
+            
+            def score(times, rows):
+                temperature = table.column('avg_temp_province')[rows]
+                humidity = table.column('avg_humidity_province')[rows]
+                X = self.feature_transform.transform(self._time_features(times), rows, temperature, humidity)
+                probabilities = self.rf_model.predict_proba(X)[:, :len(self.weather_classes)]
+                predicted_temp = self.gbt_model.predict(X) if self.gbt_model is not None else temperature.copy()
+                return probabilities, predicted_temp
+            
+            priors = ClusterPriors.compute(score, table, labels, clusters.k)
+            self.province_clusters, self.cluster_labels = clusters, labels
+            self.cluster_priors = priors
+    
+    def assign_clusters(self, stats):
+        """
+        Cluster of new provinces from their statistics (vectorized nearest centroid)
+        
+        Args:
+            stats: dict of *_province columns (e.g. ObservationStore.new_province_columns);
+                   NaN / missing columns are ignored
+        
+        Returns:
+            np.ndarray: cluster per row
+        """
+        self._require_models('assign_clusters')
+        self._ensure_clusters()
+        return self.province_clusters.assign(stats)
+    
+    def _prior_scores(self, time_features, rows, provinces, temperature, humidity):
+        """Cluster-prior class probabilities and next-hour temperature (no trees)"""
+        self._ensure_clusters()
+        clusters = self.cluster_labels[rows]
+        unknown = rows == self.province_table.unseen_row
+        if np.any(unknown):
+            # Running stats of ingested observations, else the current values as the averages
+            stats = {
+                'avg_temp_province': np.array(temperature[unknown], dtype=np.float64),
+                'avg_humidity_province': np.array(humidity[unknown], dtype=np.float64),
+            }
+            if self.observations is not None:
+                names = list(np.asarray(provinces, dtype=object)[unknown])
+                observed = self.observations.new_province_columns(names)
+                for column, values in observed.items():
+                    stats[column] = np.where(np.isnan(values), stats.get(column, np.nan), values)
+            clusters[unknown] = self.province_clusters.assign(stats)
+        return self.cluster_priors.lookup(clusters, time_features['month_num'], time_features['hour'])
+    
+    def forecast_grid(self, start, hours=24, provinces=None):
+        """
+        Forecast every province x every hour from start in one batch
+        
+        Args:
+            start: "6/30/2025 14:00" or datetime (rounded down to the hour)
+            hours: Number of hourly steps
+            provinces: Province names (default: all, alphabetical)
+        
+        Returns:
+            dict: 'provinces' (P,), 'times' (H,) datetime64, and (P, H) arrays
+            'class_index' (int8), 'probability' / 'predicted_temp' (float32),
+            plus 'probabilities' (P, H, num_weather_classes) float32
+        """
+        self._require_models('forecast_grid')
+        if isinstance(start, str):
+            start = datetime.strptime(start, "%m/%d/%Y %H:%M")
+        
+        table = self.province_table
+        provinces = table.sorted_names() if provinces is None else list(provinces)
+        n_provinces = len(provinces)
+        
+        times = np.datetime64(start, 'h') + np.arange(hours).astype('timedelta64[h]')
+        
+        # Time features once per hour, then tiled over provinces (province-major order)
+        time_features = {
+            name: np.tile(values, n_provinces)
+            for name, values in self._time_features(times).items()
+        }
+        rows = np.repeat(table.rows(provinces), hours)
+        temperature = table.column('avg_temp_province')[rows]
+        humidity = table.column('avg_humidity_province')[rows]
+        
+        batch = self._score(time_features, rows, temperature, humidity)
+        shape = (n_provinces, hours)
+        
+        return {
+            'provinces': provinces,
+            'times': times,
+            'class_index': batch['class_index'].reshape(shape).astype(np.int8),
+            'probability': batch['probability'].reshape(shape).astype(np.float32),
+            'probabilities': batch['probabilities'].reshape(shape + (-1,)).astype(np.float32),
+            'predicted_temp': batch['predicted_temp'].reshape(shape).astype(np.float32)
+        }
+    
+    def rollout(self, start, hours=24, provinces=None, temperatures=None, humidities=None,
+                temp_history=None, humidity_history=None):
+        """
+        Autoregressive hour-by-hour forecast: the GBT's next-hour temperature
+        becomes the current temperature of the next step and updates the
+        lag / moving-average features. All provinces advance together.
+        
+        Args:
+            start: "6/30/2025 14:00" or datetime (rounded down to the hour)
+            hours: Number of hourly steps
+            provinces: Province names (default: all, alphabetical)
+            temperatures: Current temperature per province (default: province average)
+            humidities: Current humidity per province (default: province average,
+                        kept constant over the rollout)
+            temp_history: Optional (P, k) observed temperatures, oldest -> newest,
+                          ending with the current hour (overrides temperatures)
+            humidity_history: Optional (P, k) observed humidities, same layout
+        
+        Returns:
+            dict like forecast_grid, plus 'temperature' (P, H) float32: the
+            temperature fed into each step (observed at step 0, predicted after)
+        """
+        self._require_models('Rollout')
+        if isinstance(start, str):
+            start = datetime.strptime(start, "%m/%d/%Y %H:%M")
+        
+        table = self.province_table
+        provinces = table.sorted_names() if provinces is None else list(provinces)
+        n_provinces = len(provinces)
+        rows = table.rows(provinces)
+        
+        default_temp = table.column('avg_temp_province')[rows]
+        default_humidity = table.column('avg_humidity_province')[rows]
+        
+        # Start from the observed history when live observations are attached
+        if self.observations is not None:
+            hour = self._hours_since_epoch([start])
+            if temp_history is None and temperatures is None:
+                history = self.observations.history('temperature', rows, hour, 6)
+                temp_history = self._fill_missing(history, default_temp[:, None])
+            if humidity_history is None and humidities is None:
+                history = self.observations.history('humidity', rows, hour, 3)
+                humidity_history = self._fill_missing(history, default_humidity[:, None])
+        
+        if temp_history is None:
+            temp_history = self._fill_missing(temperatures, default_temp)
+        if humidity_history is None:
+            humidity_history = self._fill_missing(humidities, default_humidity)
+        temp_state = LagState(temp_history, size=6)
+        humidity_state = LagState(humidity_history, size=3)
+        
+        times = np.datetime64(start, 'h') + np.arange(hours).astype('timedelta64[h]')
+        hourly_features = self._time_features(times)
+        
+        shape = (n_provinces, hours)
+        class_index = np.empty(shape, dtype=np.int8)
+        probability = np.empty(shape, dtype=np.float32)
+        probabilities = np.empty(shape + (len(self.weather_classes),), dtype=np.float32)
+        temperature = np.empty(shape, dtype=np.float32)
+        predicted_temp = np.empty(shape, dtype=np.float32)
+        
+        for step in range(hours):
+            time_features = {
+                name: np.full(n_provinces, values[step])
+                for name, values in hourly_features.items()
+            }
+            current_temp = temp_state.lag(0).copy()
+            current_humidity = humidity_state.lag(0).copy()
+            overrides = {**temp_state.features('temp'), **humidity_state.features('humidity')}
+        
+            batch = self._score(time_features, rows, current_temp, current_humidity, overrides)
+        
+            class_index[:, step] = batch['class_index']
+            probability[:, step] = batch['probability']
+            probabilities[:, step] = batch['probabilities']
+            temperature[:, step] = current_temp
+            predicted_temp[:, step] = batch['predicted_temp']
+        
+            # Feed the prediction back (humidity has no model -> persistence)
+            temp_state.push(batch['predicted_temp'])
+            humidity_state.push(current_humidity)
+        
+        return {
+            'provinces': provinces,
+            'times': times,
+            'class_index': class_index,
+            'probability': probability,
+            'probabilities': probabilities,
+            'temperature': temperature,
+            'predicted_temp': predicted_temp
+        }
+    
+    def _quantize(self, temperature, humidity):
+        """Round inputs to the cache resolution"""
+        temperature = round(round(temperature / self.TEMP_RESOLUTION) * self.TEMP_RESOLUTION, 6)
+        humidity = round(round(humidity / self.HUMIDITY_RESOLUTION) * self.HUMIDITY_RESOLUTION, 6)
+        return temperature, humidity
+    
+    def _cache_key(self, row, hour, day_of_week, month, day_of_month, temperature, humidity):
+        # day_of_month is a model feature too, so it is part of the key
+        return (
+            int(row), int(hour), int(day_of_week), int(month), int(day_of_month),
+            round(temperature / self.TEMP_RESOLUTION),
+            round(humidity / self.HUMIDITY_RESOLUTION),
+            self.model_version
+        )
+    
+    def prewarm_cache(self, day=None):
+        """
+        Fill the cache for every province x 24 hours of one day (default province averages)
+        
+        Args:
+            day: date/datetime to warm (default: today)
+        
+        Returns:
+            int: Number of cached results
+        """
+        if self.cache is None or self.rf_model is None:
+            return 0
+        
+        day = datetime.combine(day or datetime.now(), datetime.min.time())
+        table = self.province_table
+        n_provinces = table.num_provinces
+        
+        rows = np.repeat(np.arange(n_provinces), 24)
+        hours = np.tile(np.arange(24), n_provinces)
+        times = np.datetime64(day, 'm') + hours.astype('timedelta64[h]')
+        provinces = [table.names[r] for r in rows]
+        
+        quantized = [
+            self._quantize(t, h) for t, h in zip(
+                table.column('avg_temp_province')[rows], table.column('avg_humidity_province')[rows]
+            )
+        ]
+        temperatures = [t for t, _ in quantized]
+        humidities = [h for _, h in quantized]
+        
+        # Synthetic rows: not live traffic for the drift monitor
+        batch = self._predict_batch(times, provinces, temperatures, humidities, monitor=False)
+        time_features = self._time_features(times)
+        
+        for i in range(len(rows)):
+            key = self._cache_key(
+                rows[i], time_features['hour'][i], time_features['day_of_week'][i],
+                time_features['month_num'][i], time_features['day_of_month'][i],
+                temperatures[i], humidities[i]
+            )
+            self.cache.put(key, self._model_prediction(
+                batch['probabilities'][i], temperatures[i], humidities[i], batch['predicted_temp'][i]
+            ))
+        
+        return len(rows)
+    
+    def cache_stats(self):
+        """Hit/miss counters of the predict() cache (None when disabled)"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def enable_instrumentation(self, profile_rate=0.0, profile_dir='profiles'):
+        """
+        Start timing prediction stages (parse, lookup, features, rf, gbt,
+        postprocess) into self.metrics, and optionally profile a sample of calls
+        
+        Args:
+            profile_rate: Fraction of predict/predict_batch calls run under cProfile
+            profile_dir: Where the .prof files of sampled calls go
+        """
+        if self.metrics is None:
+            self.metrics = StageMetrics()
+            if self.drift_monitor is not None:
+                self.metrics.set_collector('drift', self.drift_monitor.publish)
+        self.profiler = ProfileSampler(profile_rate, profile_dir) if profile_rate else None
+    
+    def disable_instrumentation(self):
+        self.metrics = None
+        self.profiler = None
+    
+    def _stage(self, name):
+        metrics = self.metrics
+        return metrics.time(name) if metrics is not None else NO_TIMER
+    
+    def _profile(self, name):
+        profiler = self.profiler
+        return profiler.sample(name) if profiler is not None else NO_TIMER
+    
+    def _count(self, name, value=1):
+        if self.metrics is not None:
+            self.metrics.increment(name, value)
+    
+    def enable_drift_monitor(self, reference=None, **options):
+        """
+        Bin every live input row (predict / predict_batch, cache hits and cluster
+        priors included; not forecasts or the cache prewarm) against the
+        training distributions, see utils.drift;
+        with instrumentation the drift_* gauges are part of the metrics export
+        
+        Args:
+            reference: DriftReference (default: drift_reference.npz next to the model for
+                       this model version, else province_stats.csv temperature / humidity)
+            **options: DriftMonitor options (psi_alert, ks_alert, unknown_alert, min_rows, max_rows)
+        
+        Returns:
+            DriftMonitor
+        """
+        from utils.drift import DriftMonitor, load_reference
+        
+        if reference is None:
+            reference = load_reference(self.model_path, self.model_version, self.province_table)
+        self.drift_monitor = DriftMonitor(reference, self.features, self.province_table.names, **options)
+        if self.metrics is not None:
+            self.metrics.set_collector('drift', self.drift_monitor.publish)
+        return self.drift_monitor
+    
+    def disable_drift_monitor(self):
+        self.drift_monitor = None
+        if self.metrics is not None:
+            self.metrics.set_collector('drift', None)
+            self.metrics.clear_gauges('drift_')
+    
+    def attach_history(self, history):
+        """
+        Log every predict / predict_batch result (cache hits included, not forecasts
+        or the cache prewarm) to a utils.history.PredictionHistory
+        """
+        self.history = history
+    
+    def attach_observations(self, store):
+        """
+        Use live observations (utils.observations.ObservationStore) for defaults,
+        lag / moving-average features and running province statistics.
+        The predict() cache is bypassed while a store is attached.
+        """
+        self.observations = store
+    
+    @staticmethod
+    def _hours_since_epoch(times):
+        return WeatherPredictor._to_datetime64(times).astype('datetime64[h]').astype(np.int64)
+    
+    @staticmethod
+    def _to_datetime64(times):
+        """Array of "6/30/2025 14:00" strings / datetimes -> datetime64[m]"""
+        times = np.asarray(times)
+        if not np.issubdtype(times.dtype, np.datetime64):
+            if len(times) and isinstance(times[0], str):
+                # Parse each distinct string once (batches repeat the same hours)
+                unique, inverse = np.unique(times.astype(str), return_inverse=True)
+                parsed = [datetime.strptime(t, "%m/%d/%Y %H:%M") for t in unique]
+                times = np.array(parsed, dtype='datetime64[m]')[inverse]
+            else:
+                times = np.array(times.tolist(), dtype='datetime64[m]')
+        return times.astype('datetime64[m]')
+    
+    @staticmethod
+    def _time_features(times):
+        """
+        Vectorized time features (Spark conventions: day_of_week 1=Sunday)
+        
+        Returns:
+            dict: hour, day_of_week, month_num, day_of_month, is_day arrays
+        """
+        minutes = WeatherPredictor._to_datetime64(times)
+        days = minutes.astype('datetime64[D]')
+        months = days.astype('datetime64[M]')
+        
+        hour = (minutes - days).astype(np.int64) // 60
+        
+        return {
+            'hour': hour,
+            'day_of_week': (days.astype(np.int64) + 4) % 7 + 1,  # 1970-01-01 was a Thursday (5)
+            'month_num': months.astype(np.int64) % 12 + 1,
+            'day_of_month': (days - months).astype(np.int64) + 1,
+            'is_day': ((hour >= 6) & (hour <= 18)).astype(np.int64)
+        }
+    
+    @staticmethod
+    def _fill_missing(values, default):
+        """Use the province default where no value (None/NaN) is given"""
+        if values is None:
+            return default.copy()
+        values = np.array(values, dtype=np.float64)  # None -> NaN
+        return np.where(np.isnan(values), default, values)
+    
+    def _feature_matrix(self, time_features, rows, temperature, humidity, overrides=None):
+        """
+        Build the scaled feature matrix in metadata['features']['all_features'] order
+        (indexer codes, assembly and scaling fused, see utils.features.FeatureTransform)
+        
+        Args:
+            time_features: Output of _time_features
+            rows: Province table row for every input row
+            temperature, humidity: Current values per row
+            overrides: Optional dict of feature columns replacing the defaults
+                       (lag / moving averages from real history, live province
+                       statistics; see utils.rollout / utils.observations)
+        
+        Returns:
+            np.ndarray: shape (n_rows, num_features)
+        """
+        with self._stage('features'):
+            return self.feature_transform.transform(time_features, rows, temperature, humidity, overrides)
+    
+    @staticmethod
+    def _copy_result(result):
+        """Copy of a cached predict() result that callers may modify (nested containers too)"""
+        result = dict(result)
+        result['all_probabilities'] = dict(result['all_probabilities'])
+        result['top_3_predictions'] = list(result['top_3_predictions'])  # (class, probability) tuples
+        return result
+    
+    def _model_prediction(self, class_probs, temperature, humidity, predicted_temp):
+        """
+        Turn one row of RF class probabilities into the prediction dict
+        """
+        probs = {cls: float(p) for cls, p in zip(self.weather_classes, class_probs)}
+        
+        predicted_index = int(np.argmax(class_probs))
+        predicted_class = self.weather_classes[predicted_index]
+        confidence = probs[predicted_class]
+        
+        # Top 3
+        top_3_indices = np.argsort(class_probs)[::-1][:3]
+        top_3 = [(self.weather_classes[i], float(class_probs[i])) for i in top_3_indices]
+        
+        predicted_temp = float(predicted_temp)
+        temp_change = predicted_temp - temperature
+        
+        # Predicted humidity (no humidity model: persistence, keeps results reproducible)
+        predicted_humidity = min(100, max(0, humidity))
+        
+        return {
+            'weather_main': predicted_class,
+            'probability': confidence,
+            'top_3_predictions': top_3,
+            'predicted_temp': predicted_temp,
+            'predicted_humidity': predicted_humidity,
+            'temp_change': temp_change,
+            'all_probabilities': probs,
+            'model_version': self.model_version
+        }
+    
     def _rule_based_prediction(self, hour, month, temperature, humidity, province_avg_temp):
         """
         Simple rule-based prediction
-        (Replace this with actual model inference if you want 100% accuracy)
+        (Fallback when the Spark models are not available)
         """
         
         # Initialize probabilities
@@ -170,5 +1240,6 @@ class WeatherPredictor:
             'predicted_temp': predicted_temp,
             'predicted_humidity': predicted_humidity,
             'temp_change': temp_change,
-            'all_probabilities': probs
+            'all_probabilities': probs,
+            'model_version': self.model_version
         }
\ No newline at end of file
@@ -0,0 +1,146 @@
+# ===== utils/province_table.py =====
+
+import csv
+
+import numpy as np
+
+# Provinces whose city label (city_indexer) is not the last part of the province name
+PROVINCE_CITY = {
+    'TP Ho Chi Minh': 'Ho Chi Minh',
+    'Dien Bien': 'Dien Bien Phu',
+    'Phu Tho': 'Viet Tri',
+    'Quang Tri': 'Dong Ha',
+    'Dak Nong': 'Gia Nghia',
+    'Gia Lai': 'Pleiku',
+    'Quang Binh': 'Dong Hoi',
+    'Dak Lak': 'Buon Ma Thuot',
+    'Ninh Thuan': 'Phan Rang - Thap Cham',
+    'Binh Phuoc': 'Dong Xoai',
+    'Binh Dinh': 'Quy Nhon',
+    'Binh Thuan': 'Phan Thiet',
+    'Phu Yen': 'Tuy Hoa',
+    'Long An': 'Tan An',
+    'Tien Giang': 'My Tho',
+}
+
+
+def city_of(province, city_labels=()):
+    """City label used by city_indexer for a province"""
+    if province in PROVINCE_CITY:
+        return PROVINCE_CITY[province]
+    city = province.split('-')[-1]
+    return city if city in city_labels else province
+
+
+def indexer_codes(names, province_labels=(), city_labels=()):
+    """
+    province_indexer / city_indexer codes of every province plus the unseen row
+
+    Returns:
+        tuple: (province_codes, city_codes), float64 arrays of len(names) + 1
+    """
+    province_index = {label: i for i, label in enumerate(province_labels)}
+    city_index = {label: i for i, label in enumerate(city_labels)}
+    unseen_province = len(province_index)
+    unseen_city = len(city_index)
+
+    province_codes = [province_index.get(p, unseen_province) for p in names]
+    city_codes = [city_index.get(city_of(p, city_index), unseen_city) for p in names]
+    return (np.array(province_codes + [unseen_province], dtype=np.float64),
+            np.array(city_codes + [unseen_city], dtype=np.float64))
+
+
+class ProvinceTable:
+    """
+    Array-backed province statistics with O(1) lookup
+
+    Row i (0 <= i < num_provinces) holds one province of province_stats.csv.
+    One extra row (unseen_row) mirrors Spark's StringIndexer handleInvalid=keep:
+    unknown provinces map to it and get the "unseen" province/city codes
+    (len(labels)) and the mean of every stat column.
+    """
+
+    def __init__(self, names, columns, province_codes, city_codes):
+        """
+        Args:
+            names: Province names, one per row
+            columns: dict stat name -> float array (num_provinces + 1,)
+            province_codes: province_indexer codes (num_provinces + 1,)
+            city_codes: city_indexer codes (num_provinces + 1,)
+        """
+        self.names = list(names)
+        self.columns = columns
+        self.province_codes = province_codes
+        self.city_codes = city_codes
+        self.unseen_row = len(self.names)
+
+        self._row_of = {name: i for i, name in enumerate(self.names)}
+        self._sorted_names = tuple(sorted(self.names))
+
+    @classmethod
+    def read_csv(cls, path, province_labels=(), city_labels=()):
+        """
+        Build the table from province_stats.csv (stdlib csv, no pandas)
+
+        Args:
+            path: Path to province_stats.csv
+            province_labels: Labels of province_indexer (index order)
+            city_labels: Labels of city_indexer (index order)
+        """
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            records = list(csv.DictReader(f))
+
+        names = [record['province'] for record in records]
+        stat_names = [name for name in records[0] if name != 'province'] if records else []
+        columns = {
+            name: np.array([float(record[name]) for record in records], dtype=np.float64)
+            for name in stat_names
+        }
+        return cls.from_columns(names, columns, province_labels, city_labels)
+
+    @classmethod
+    def from_columns(cls, names, columns, province_labels=(), city_labels=()):
+        """
+        Build the table from per-province stat columns
+
+        Args:
+            names: Province names
+            columns: dict stat name -> values (one per province)
+            province_labels: Labels of province_indexer (index order)
+            city_labels: Labels of city_indexer (index order)
+        """
+        names = list(names)
+
+        # Extra last row for unseen provinces: mean of every stat column
+        columns = {
+            name: np.ascontiguousarray(np.append(values, np.mean(values)), dtype=np.float64)
+            for name, values in columns.items()
+        }
+
+        province_codes, city_codes = indexer_codes(names, province_labels, city_labels)
+        return cls(names=names, columns=columns, province_codes=province_codes, city_codes=city_codes)
+
+    def set_codes(self, province_labels, city_labels):
+        """Replace the indexer codes (the table can be built before the indexers are loaded)"""
+        self.province_codes, self.city_codes = indexer_codes(self.names, province_labels, city_labels)
+
+    @property
+    def num_provinces(self):
+        return len(self.names)
+
+    def sorted_names(self):
+        """Province names in alphabetical order"""
+        return list(self._sorted_names)
+
+    def row(self, province):
+        """Row id of a province (unseen_row if unknown)"""
+        return self._row_of.get(province, self.unseen_row)
+
+    def rows(self, provinces):
+        """Row ids for an array of province names"""
+        get = self._row_of.get
+        unseen = self.unseen_row
+        return np.fromiter((get(p, unseen) for p in provinces), dtype=np.intp, count=len(provinces))
+
+    def column(self, name):
+        return self.columns[name]
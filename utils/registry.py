@@ -0,0 +1,290 @@
+# ===== utils/registry.py =====
+# Versioned model registry: watches a models root, loads new versions in the background and
+# swaps them in atomically (in-flight requests finish on the version they started with)
+#
+# Layouts:
+#   models/                    versioned root: the newest subdirectory (natural sort) is served,
+#     2025-06-30/  2025-07-14/ each one a weather_models folder (or containing model.bundle)
+#   weather_models/            flat: the folder itself, reloaded when its files change
+#
+# Publish a new version by copying it under a name starting with '.' or '_' and renaming it
+# when complete (hidden names are ignored), e.g. cp -r new models/_tmp && mv models/_tmp models/2025-07-14
+#
+# Usage:
+#   registry = ModelRegistry('models', poll_interval=5.0).start()
+#   with registry.acquire() as predictor:
+#       predictor.predict(...)
+
+import contextlib
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.bundle import BUNDLE_FILENAME
+
+# Files whose change means a model folder was rewritten
+_SIGNATURE_FILES = (
+    'metadata.json', BUNDLE_FILENAME, 'province_stats.csv',
+    'rf_classifier/metadata/part-00000', 'gbt_regressor/metadata/part-00000',
+)
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def _is_model_dir(path):
+    return os.path.isfile(os.path.join(path, 'metadata.json')) or os.path.isfile(os.path.join(path, BUNDLE_FILENAME))
+
+
+def _signature(path):
+    """(file, mtime_ns, size) of the files that change when a model folder is replaced"""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return ((os.path.basename(path), stat.st_mtime_ns, stat.st_size),)
+    signature = []
+    for name in _SIGNATURE_FILES:
+        try:
+            stat = os.stat(os.path.join(path, name))
+        except OSError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class _Entry:
+    __slots__ = ('predictor', 'name', 'path', 'signature', 'loaded_at', 'refs', 'retired')
+
+    def __init__(self, predictor, name, path, signature):
+        self.predictor = predictor
+        self.name = name
+        self.path = path
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.refs = 0
+        self.retired = False
+
+
+class ModelRegistry:
+    """
+    Serves the newest valid model version, hot-swapped without downtime
+
+    A candidate version is loaded, validated and warmed up on the watcher
+    thread; only then does it replace the current one. acquire() hands out
+    reference-counted leases: a retired version is released (dropped by the
+    registry) once its last lease ends.
+
+    Live state is carried over to the new predictor: the attached
+    ObservationStore (when the province list is unchanged), the
+    instrumentation objects, the prediction history and drift monitoring
+    (restarted against the new version's reference).
+    """
+
+    def __init__(self, root='weather_models', poll_interval=5.0, warmup=True, configure=None,
+                 **predictor_kwargs):
+        """
+        Args:
+            root: Versioned models root, flat models folder or bundle file
+            poll_interval: Seconds between scans once start() is called
+            warmup: Run warm-up predictions before a version goes live
+            configure: Optional fn(new_predictor, previous_predictor or None) run before the swap
+            **predictor_kwargs: Passed to every WeatherPredictor
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.warmup = warmup
+        self.configure = configure
+        self.predictor_kwargs = predictor_kwargs
+        self.swaps = 0
+        self.failures = {}  # version -> (signature, error) of the last failed attempt
+        self._current = None
+        self._retired = []  # entries still leased after their swap
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if not self.check():
+            errors = '; '.join(f'{name}: {error}' for name, (_, error) in self.failures.items())
+            raise FileNotFoundError(f"No loadable model version under '{root}' ({errors or 'none found'})")
+
+    # ---- serving ---------------------------------------------------------
+
+    @property
+    def current(self):
+        """Predictor of the live version (no lease: fine for short reads)"""
+        return self._current.predictor
+
+    @property
+    def version(self):
+        return self._current.name
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Lease the live predictor for the duration of a request"""
+        with self._lock:
+            entry = self._current
+            entry.refs += 1
+        try:
+            yield entry.predictor
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                if entry.retired and entry.refs == 0:
+                    self._release(entry)
+
+    def predict(self, *args, **kwargs):
+        with self.acquire() as predictor:
+            return predictor.predict(*args, **kwargs)
+
+    def predict_batch(self, *args, **kwargs):
+        with self.acquire() as predictor:
+            return predictor.predict_batch(*args, **kwargs)
+
+    # ---- discovery / loading ---------------------------------------------
+
+    def candidates(self):
+        """[(version name, path)] servable under root, oldest -> newest"""
+        root = self.root
+        if os.path.isfile(root) or _is_model_dir(root):
+            return [(os.path.basename(os.path.normpath(root)), root)]
+        if not os.path.isdir(root):
+            return []
+        names = [
+            name for name in os.listdir(root)
+            if not name.startswith(('.', '_')) and _is_model_dir(os.path.join(root, name))
+        ]
+        return [(name, os.path.join(root, name)) for name in sorted(names, key=_natural_key)]
+
+    def check(self):
+        """
+        Load and swap in the newest version if it is new or was rewritten
+
+        Falls back to older versions when the newest one fails validation.
+
+        Returns:
+            bool: True if a version is live after the check
+        """
+        current = self._current
+        for name, path in reversed(self.candidates()):
+            signature = _signature(path)
+            if current is not None and current.path == path and current.signature == signature:
+                return True
+            failed = self.failures.get(name)
+            if failed is not None and failed[0] == signature:
+                continue  # unchanged since it failed
+
+            try:
+                predictor = self._load(path)
+            except Exception as e:
+                self.failures[name] = (signature, f'{type(e).__name__}: {e}')
+                print(f"⚠️ Model version '{name}' rejected: {e}")
+                continue
+            self.failures.pop(name, None)
+            self._swap(_Entry(predictor, name, path, signature))
+            return True
+        return current is not None
+
+    def _load(self, path):
+        """Load, validate and warm up one version (raises on any problem)"""
+        from utils.predictor import WeatherPredictor
+
+        predictor = WeatherPredictor(path, **self.predictor_kwargs)
+
+        previous = self._current.predictor if self._current is not None else None
+        if previous is not None:
+            for component in ('rf_model', 'gbt_model'):
+                if getattr(previous, component) is not None and getattr(predictor, component) is None:
+                    raise ValueError(f"{component} is missing (incomplete copy?)")
+
+        # A lazy first version is not held back by warm-up (it would wait for every component)
+        if self.warmup and (previous is not None or not predictor.lazy) and predictor.rf_model is not None:
+            provinces = predictor.get_provinces()[:8]
+            times = [f'6/30/2025 {hour:02d}:00' for hour in range(24)]
+            batch = predictor.predict_batch(
+                np.repeat(times, len(provinces)), np.tile(provinces, len(times))
+            )
+            if not (np.all(np.isfinite(batch['probabilities'])) and np.all(np.isfinite(batch['predicted_temp']))):
+                raise ValueError("Warm-up predictions are not finite")
+            if not np.allclose(batch['probabilities'].sum(axis=1), 1.0, atol=1e-3):
+                raise ValueError("Warm-up class probabilities do not sum to 1")
+            predictor.predict(times[12], provinces[0])
+
+        if previous is not None:
+            self._carry_over(predictor, previous)
+        if self.configure is not None:
+            self.configure(predictor, previous)
+        return predictor
+
+    @staticmethod
+    def _carry_over(predictor, previous):
+        store = previous.observations
+        if store is not None:
+            if previous.province_table.names == predictor.province_table.names:
+                predictor.attach_observations(store)
+            else:
+                print("⚠️ Province list changed: live observations are not attached to the new version")
+        predictor.metrics = previous.metrics
+        predictor.profiler = previous.profiler
+        if previous.drift_monitor is not None:
+            predictor.enable_drift_monitor(**previous.drift_monitor.options)
+        predictor.history = previous.history
+
+    def _swap(self, entry):
+        with self._lock:
+            old = self._current
+            self._current = entry
+            self.swaps += 1
+            if old is not None:
+                old.retired = True
+                if old.refs == 0:
+                    self._release(old)
+                else:
+                    self._retired.append(old)
+        if old is not None:
+            print(f"✅ Model version '{entry.name}' is live (was '{old.name}')")
+
+    def _release(self, entry):
+        """Drop a retired version (called with the lock held, no leases left)"""
+        entry.predictor = None  # the bundle memmap / arrays go with the last reference
+        if entry in self._retired:
+            self._retired.remove(entry)
+
+    # ---- watcher ---------------------------------------------------------
+
+    def start(self):
+        """Scan root every poll_interval seconds on a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='model-registry', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:  # keep watching: a bad scan must not stop hot reload
+                print(f"⚠️ Model registry scan failed: {e}")
+
+    def status(self):
+        with self._lock:
+            current = self._current
+            return {
+                'version': current.name,
+                'model_version': current.predictor.model_version,
+                'path': current.path,
+                'loaded_at': current.loaded_at,
+                'swaps': self.swaps,
+                'leases': current.refs,
+                'retired_in_use': [(entry.name, entry.refs) for entry in self._retired],
+                'failures': {name: error for name, (_, error) in self.failures.items()},
+            }
@@ -0,0 +1,75 @@
+# ===== utils/rollout.py =====
+
+import numpy as np
+
+
+class LagState:
+    """
+    Ring buffers holding the last `size` hourly values of one variable
+    for many series (e.g. provinces) at once
+
+    All series advance together, so one head index serves every row.
+    """
+
+    def __init__(self, initial, size=6):
+        """
+        Args:
+            initial: shape (n,) current values (history filled with them), or
+                     shape (n, k) history ordered oldest -> newest (k <= size,
+                     missing older hours are filled with the oldest value)
+            size: Number of hours kept
+        """
+        initial = np.asarray(initial, dtype=np.float64)
+        if initial.ndim == 1:
+            initial = initial[:, None]
+        if initial.shape[1] > size:
+            initial = initial[:, -size:]
+
+        self.size = size
+        self.values = np.empty((initial.shape[0], size), dtype=np.float64)
+        pad = size - initial.shape[1]
+        self.values[:, :pad] = initial[:, :1]
+        self.values[:, pad:] = initial
+        self.head = size - 1  # column of the newest value
+
+    def lag(self, hours):
+        """Value `hours` before the newest one (0 = newest)"""
+        return self.values[:, (self.head - hours) % self.size]
+
+    def mean(self, hours):
+        """Mean of the newest `hours` values"""
+        columns = (self.head - np.arange(hours)) % self.size
+        return self.values[:, columns].mean(axis=1)
+
+    def push(self, values):
+        """Append one new hourly value per series"""
+        self.head = (self.head + 1) % self.size
+        self.values[:, self.head] = values
+
+    def features(self, name):
+        """
+        Lag / moving-average feature columns derived from this variable
+
+        Args:
+            name: 'temp', 'humidity' or 'pressure' (feature name prefix)
+
+        Returns:
+            dict: feature name -> array
+        """
+        if name == 'temp':
+            current = self.lag(0)
+            return {
+                'temp_lag_1h': self.lag(1),
+                'temp_lag_3h': self.lag(3),
+                'temp_ma_3h': self.mean(3),
+                'temp_ma_6h': self.mean(6),
+                'temp_change_1h': current - self.lag(1),
+            }
+        if name == 'humidity':
+            return {
+                'humidity_lag_1h': self.lag(1),
+                'humidity_ma_3h': self.mean(3),
+            }
+        if name == 'pressure':
+            return {'pressure_lag_1h': self.lag(1)}
+        raise ValueError(f"Unknown lag variable '{name}'")
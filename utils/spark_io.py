@@ -0,0 +1,99 @@
+# ===== utils/spark_io.py =====
+
+import glob
+import json
+import os
+
+import numpy as np
+
+
+def read_parquet_dir(path):
+    """
+    Read all parquet part files of a Spark-saved folder into one table
+
+    Args:
+        path: Folder containing part-*.parquet files (e.g. rf_classifier/data)
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow.parquet as pq
+
+    parts = sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+    if not parts:
+        raise FileNotFoundError(f"No parquet parts found in '{path}'")
+    return pq.ParquetDataset(parts).read()
+
+
+def import_parquet():
+    """
+    Import the pyarrow modules read_parquet_dir needs (ParquetDataset pulls in
+    pyarrow.dataset on first use, most of pyarrow's import time)
+    """
+    import pyarrow.dataset  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+
+def read_model_metadata(model_dir):
+    """Read the JSON metadata Spark writes next to every saved model"""
+    with open(os.path.join(model_dir, 'metadata', 'part-00000'), 'r', encoding='utf-8') as f:
+        return json.loads(f.readline())
+
+
+def read_string_indexer_labels(model_dir):
+    """
+    Read the labels of a saved StringIndexerModel
+
+    Returns:
+        list: Labels ordered by their index (position i is encoded as i)
+    """
+    table = read_parquet_dir(os.path.join(model_dir, 'data'))
+    return table.column('labelsArray')[0].as_py()[0]
+
+
+def vector_to_numpy(vector):
+    """
+    Convert a Spark ML vector struct (type, size, indices, values) to a dense array
+
+    Args:
+        vector: dict as produced by pyarrow for a VectorUDT column
+
+    Returns:
+        np.ndarray of float64
+    """
+    values = np.asarray(vector['values'], dtype=np.float64)
+    if vector['type'] == 1:
+        return values
+    # Sparse vector
+    dense = np.zeros(vector['size'], dtype=np.float64)
+    dense[np.asarray(vector['indices'], dtype=np.int64)] = values
+    return dense
+
+
+def read_kmeans_centers(model_dir):
+    """
+    Read the cluster centers of a saved KMeansModel
+
+    Returns:
+        np.ndarray: shape (k, n_features), row i = center of cluster i
+    """
+    rows = read_parquet_dir(os.path.join(model_dir, 'data')).to_pylist()
+    rows.sort(key=lambda row: row['clusterIdx'])
+    return np.vstack([vector_to_numpy(row['clusterCenter']) for row in rows])
+
+
+def read_scaler(model_dir):
+    """
+    Read a saved StandardScalerModel
+
+    Returns:
+        tuple: (mean, std, with_mean, with_std)
+    """
+    params = read_model_metadata(model_dir)['paramMap']
+    row = read_parquet_dir(os.path.join(model_dir, 'data')).to_pylist()[0]
+    return (
+        vector_to_numpy(row['mean']),
+        vector_to_numpy(row['std']),
+        params.get('withMean', False),
+        params.get('withStd', True)
+    )
@@ -0,0 +1,139 @@
+# ===== utils/tree_kernels.py =====
+# Optional compiled tree evaluation (Numba, nogil) split over a thread pool by row blocks.
+# Numba is not a requirement: without it every caller keeps the pure-NumPy path.
+#
+# Backend selection (set_backend / TreeEnsemble callers):
+#   'auto'  -> numba when it is installed, else numpy (default)
+#   'numba' -> numba (ImportError if missing)
+#   'numpy' -> always the NumPy traversal
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Batches smaller than this stay on NumPy (no dispatch / JIT overhead for predict())
+MIN_ROWS = 256
+# Rows per thread-pool task
+ROWS_PER_TASK = 4096
+
+_backend = 'auto'
+_kernels = None  # (apply_rows, rf_rows, gbt_rows, anytime_rows, shap_rows) once compiled
+_kernels_error = None
+_pool = None
+_num_threads = None
+_lock = threading.Lock()
+
+
+def set_backend(name='auto', num_threads=None):
+    """
+    Choose the tree evaluation backend
+
+    Args:
+        name: 'auto', 'numba' or 'numpy'
+        num_threads: Thread-pool size for the compiled kernels (default: os.cpu_count())
+    """
+    global _backend, _num_threads, _pool
+    if name not in ('auto', 'numba', 'numpy'):
+        raise ValueError(f"Unknown tree backend '{name}'")
+    if name == 'numba':
+        _load_kernels(required=True)
+    with _lock:
+        _backend = name
+        if num_threads != _num_threads:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = None
+            _num_threads = num_threads
+
+
+def active_backend():
+    """'numba' or 'numpy' -- what large batches currently use"""
+    if _backend == 'numpy':
+        return 'numpy'
+    return 'numba' if _load_kernels(required=_backend == 'numba') is not None else 'numpy'
+
+
+def kernels_for(n_rows):
+    """Compiled kernels to use for a batch of n_rows, or None for the NumPy path"""
+    if n_rows < MIN_ROWS:
+        return None
+    return compiled_kernels()
+
+
+def compiled_kernels():
+    """Compiled kernels whatever the batch size (None for the NumPy path)"""
+    if _backend == 'numpy':
+        return None
+    return _load_kernels(required=_backend == 'numba')
+
+
+def _load_kernels(required=False):
+    global _kernels, _kernels_error
+    if _kernels is None and _kernels_error is None:
+        with _lock:
+            if _kernels is None and _kernels_error is None:
+                try:
+                    _kernels = _compile()
+                except ImportError as e:
+                    _kernels_error = e
+    if _kernels is None and required:
+        raise ImportError(f"Numba tree backend unavailable: {_kernels_error}")
+    return _kernels
+
+
+def _compile():
+    from utils import numba_kernels
+
+    return (numba_kernels.apply_rows, numba_kernels.rf_rows, numba_kernels.gbt_rows, numba_kernels.anytime_rows,
+            numba_kernels.shap_rows)
+
+
+def _thread_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(_num_threads or os.cpu_count() or 1,
+                                       thread_name_prefix='tree-kernel')
+        return _pool
+
+
+def thread_count():
+    """Threads of the kernel pool"""
+    return _num_threads or os.cpu_count() or 1
+
+
+def run_tasks(kernel, calls):
+    """Run kernel(*args) for every args tuple of calls on the thread pool (inline on one thread)"""
+    if thread_count() == 1 or len(calls) == 1:
+        for args in calls:
+            kernel(*args)
+        return
+    for future in [_thread_pool().submit(kernel, *args) for args in calls]:
+        future.result()
+
+
+def run_blocks(kernel, n_rows, *args, outputs=1):
+    """
+    Run kernel(*args, start, end, *out) over row blocks on the thread pool
+
+    The kernels release the GIL, so blocks run in parallel; each block writes
+    its own rows of `out` (the last `outputs` elements of args).
+
+    Returns:
+        out (a tuple when outputs > 1)
+    """
+    args, out = args[:-outputs], args[-outputs:]
+    threads = thread_count()
+    if threads == 1 or n_rows <= ROWS_PER_TASK:
+        kernel(*args, 0, n_rows, *out)
+    else:
+        step = max(ROWS_PER_TASK, -(-n_rows // (threads * 4)))
+        futures = [
+            _thread_pool().submit(kernel, *args, start, min(start + step, n_rows), *out)
+            for start in range(0, n_rows, step)
+        ]
+        for future in futures:
+            future.result()
+    return out if outputs > 1 else out[0]
@@ -0,0 +1,289 @@
+# ===== utils/trees.py =====
+# Spark tree ensembles compiled to flat NumPy arrays (no JVM needed)
+
+import os
+
+import numpy as np
+
+from utils import tree_kernels
+from utils.spark_io import read_model_metadata, read_parquet_dir
+
+
+def _as_matrix(X):
+    """C-contiguous float64 2-D feature matrix"""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    return X[None, :] if X.ndim == 1 else X
+
+
+class TreeEnsemble:
+    """
+    All trees of a Spark ensemble packed into flat node arrays
+
+    Node i of the ensemble is described by feature[i], threshold[i],
+    left[i], right[i] and value[i]. Children are global node indices.
+    Leaves point to themselves with threshold=+inf, so a fixed number of
+    traversal steps (max_depth) always ends on a leaf without branching.
+    cover[i] (optional) is the weighted count of training rows that reached
+    node i; only TreeSHAP explanations need it (utils.explain).
+    """
+
+    # Rows traversed together; keeps the (rows x trees) work arrays in cache
+    block_size = 512
+
+    def __init__(self, feature, threshold, left, right, value, roots, tree_weights, max_depth,
+                 children=None, cover=None):
+        self.feature = feature
+        # float16 thresholds (reduced variants) are widened exactly: the compiled kernels have no float16
+        self.threshold = threshold.astype(np.float32) if threshold.dtype == np.float16 else threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.tree_weights = tree_weights
+        self.max_depth = max_depth
+        self.cover = cover
+
+        # children[2*i + 1] = left[i], children[2*i] = right[i]
+        # -> next node = children[2*node + (x <= threshold)], NaN goes right like Spark
+        if children is None:
+            children = np.empty(2 * len(feature), dtype=np.intp)
+            children[0::2] = right
+            children[1::2] = left
+        self.children = children
+        # No copy when the arrays are already intp (e.g. memory-mapped bundle)
+        self._feature = feature.astype(np.intp, copy=False)
+        self._roots = roots.astype(np.intp, copy=False)
+
+    @property
+    def num_trees(self):
+        return len(self.roots)
+
+    @property
+    def num_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def load(cls, model_dir, value='impurityStats'):
+        """
+        Load a saved Spark tree ensemble (RandomForest / GBT)
+
+        Args:
+            model_dir: Folder written by model.save() (contains data/ and treesMetadata/)
+            value: 'impurityStats' to keep per-leaf class counts (classifier),
+                   'prediction' to keep the leaf prediction (regressor)
+
+        Returns:
+            TreeEnsemble
+        """
+        import pyarrow.compute as pc
+
+        metadata = read_model_metadata(model_dir)
+        table = read_parquet_dir(os.path.join(model_dir, 'data')).flatten().flatten()
+        table = table.sort_by([('treeID', 'ascending'), ('nodeData.id', 'ascending')])
+
+        if pc.any(pc.not_equal(table['nodeData.split.numCategories'], -1)).as_py():
+            raise ValueError(f"Categorical splits are not supported ('{model_dir}')")
+
+        tree_id = table['treeID'].to_numpy()
+        node_id = table['nodeData.id'].to_numpy().astype(np.int32)
+        n_nodes = len(tree_id)
+
+        # Node ids are 0..n-1 inside each tree -> global index = tree offset + id
+        counts = np.bincount(tree_id)
+        offsets = np.zeros(len(counts), dtype=np.int32)
+        offsets[1:] = np.cumsum(counts)[:-1]
+        if not np.array_equal(node_id, np.arange(n_nodes, dtype=np.int32) - offsets[tree_id]):
+            raise ValueError(f"Unexpected node numbering in '{model_dir}'")
+
+        offsets = offsets.astype(np.intp)
+        tree_id = tree_id.astype(np.intp)
+        index = np.arange(n_nodes, dtype=np.intp)
+        left = table['nodeData.leftChild'].to_numpy().astype(np.intp)
+        right = table['nodeData.rightChild'].to_numpy().astype(np.intp)
+        is_leaf = left < 0
+        left = np.where(is_leaf, index, left + offsets[tree_id])
+        right = np.where(is_leaf, index, right + offsets[tree_id])
+
+        feature = np.maximum(table['nodeData.split.featureIndex'].to_numpy(), 0).astype(np.intp)
+        thresholds = table['nodeData.split.leftCategoriesOrThreshold']
+        threshold = np.full(n_nodes, np.inf)
+        threshold[~is_leaf] = pc.list_flatten(thresholds).to_numpy()
+
+        # Classifier: class counts; regressor: (count, sum, sum of squares)
+        stats = table['nodeData.impurityStats']
+        width = pc.list_value_length(stats).to_numpy()[0]
+        stats = pc.list_flatten(stats).to_numpy().reshape(n_nodes, width)
+        if value == 'impurityStats':
+            node_value = stats
+            cover = stats.sum(axis=1)
+        else:
+            node_value = table['nodeData.prediction'].to_numpy().astype(np.float64)
+            cover = stats[:, 0].astype(np.float64)
+
+        trees_metadata = read_parquet_dir(os.path.join(model_dir, 'treesMetadata'))
+        trees_metadata = trees_metadata.sort_by('treeID')
+        tree_weights = trees_metadata['weights'].to_numpy().astype(np.float64)
+
+        max_depth = metadata['paramMap'].get('maxDepth', metadata['defaultParamMap']['maxDepth'])
+
+        return cls(
+            feature=np.ascontiguousarray(feature),
+            threshold=np.ascontiguousarray(threshold),
+            left=np.ascontiguousarray(left),
+            right=np.ascontiguousarray(right),
+            value=np.ascontiguousarray(node_value),
+            roots=offsets,
+            tree_weights=tree_weights,
+            max_depth=int(max_depth),
+            cover=np.ascontiguousarray(cover)
+        )
+
+    def apply(self, X):
+        """
+        Find the leaf reached by every row in every tree
+
+        Args:
+            X: Feature matrix, shape (n_rows, n_features)
+
+        Returns:
+            np.ndarray: Leaf node indices, shape (n_rows, n_trees)
+        """
+        X = _as_matrix(X)
+        leaves = np.empty((len(X), self.num_trees), dtype=np.intp)
+
+        kernels = tree_kernels.kernels_for(len(X))
+        if kernels is not None:
+            return tree_kernels.run_blocks(kernels[0], len(X), X, *self.kernel_args(), leaves)
+
+        for start in range(0, len(X), self.block_size):
+            block = X[start:start + self.block_size]
+            leaves[start:start + len(block)] = self._apply_block(block)
+        return leaves
+
+    def kernel_args(self):
+        """Node arrays in the order the compiled kernels take them"""
+        return self._feature, self.threshold, self.children, self._roots, self.max_depth
+
+    def _apply_block(self, X):
+        # Index into the flattened matrix: row offset + feature index
+        flat = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self._roots, (len(X), self.num_trees))
+
+        # All trees advance one level per step; leaves loop onto themselves
+        for _ in range(self.max_depth):
+            go_left = flat[row_offset + self._feature[node]] <= self.threshold[node]
+            node = self.children[2 * node + go_left]
+
+        return node
+
+
+class RandomForestModel:
+    """NumPy port of pyspark.ml RandomForestClassificationModel"""
+
+    # Below this many rows, gather all leaves at once instead of looping over trees
+    small_batch = 64
+
+    def __init__(self, ensemble, leaf_probability=None, probability_scale=1.0):
+        """
+        Args:
+            ensemble: TreeEnsemble with per-node class counts (impurityStats)
+            leaf_probability: Per-node class probabilities (default: normalized counts);
+                              may be 8-bit codes in reduced variants
+            probability_scale: Value of one unit of leaf_probability (1/255 for 8-bit codes)
+        """
+        self.ensemble = ensemble
+        self.num_classes = ensemble.value.shape[1]
+        self.probability_scale = probability_scale
+
+        # Spark normalizes each tree's leaf counts before summing the votes
+        if leaf_probability is None:
+            totals = ensemble.value.sum(axis=1, keepdims=True)
+            leaf_probability = np.divide(
+                ensemble.value, totals,
+                out=np.zeros_like(ensemble.value),
+                where=totals != 0
+            )
+        self.leaf_probability = leaf_probability
+
+    @classmethod
+    def load(cls, model_dir):
+        return cls(TreeEnsemble.load(model_dir, value='impurityStats'))
+
+    def predict_raw(self, X):
+        """Sum of per-tree class probabilities (Spark's rawPrediction)"""
+        raw = self._vote(_as_matrix(X))
+        if self.probability_scale != 1.0:
+            raw *= self.probability_scale
+        return raw
+
+    def _vote(self, X):
+        """Sum of the per-tree leaf_probability rows (in leaf_probability units)"""
+        kernels = tree_kernels.kernels_for(len(X))
+        if kernels is not None:
+            raw = np.zeros((len(X), self.num_classes))
+            return tree_kernels.run_blocks(
+                kernels[1], len(X), X, *self.ensemble.kernel_args(), self.leaf_probability, raw
+            )
+
+        leaves = self.ensemble.apply(X)
+        if len(leaves) < self.small_batch:
+            # Summing over the trees axis also adds tree by tree
+            return self.leaf_probability[leaves].sum(axis=1, dtype=np.float64)
+
+        raw = np.zeros((len(leaves), self.num_classes))
+        # Accumulate tree by tree, in the same order as Spark sums the votes
+        for tree_leaves in np.ascontiguousarray(leaves.T):
+            raw += self.leaf_probability.take(tree_leaves, axis=0)
+        return raw
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, identical to Spark's 'probability' column
+
+        Args:
+            X: Scaled feature matrix, shape (n_rows, n_features)
+
+        Returns:
+            np.ndarray: shape (n_rows, num_classes)
+        """
+        raw = self.predict_raw(X)
+        totals = raw.sum(axis=1, keepdims=True)
+        return np.divide(raw, totals, out=np.zeros_like(raw), where=totals != 0)
+
+    def predict(self, X):
+        """Predicted class index for every row"""
+        return np.argmax(self.predict_raw(X), axis=1)
+
+
+class GBTRegressionModel:
+    """NumPy port of pyspark.ml GBTRegressionModel"""
+
+    def __init__(self, ensemble):
+        self.ensemble = ensemble
+
+    @classmethod
+    def load(cls, model_dir):
+        return cls(TreeEnsemble.load(model_dir, value='prediction'))
+
+    def predict(self, X):
+        """
+        Weighted sum of the tree predictions, identical to Spark's 'prediction' column
+
+        Args:
+            X: Scaled feature matrix, shape (n_rows, n_features)
+
+        Returns:
+            np.ndarray: shape (n_rows,)
+        """
+        X = _as_matrix(X)
+        kernels = tree_kernels.kernels_for(len(X))
+        if kernels is not None:
+            ensemble = self.ensemble
+            return tree_kernels.run_blocks(
+                kernels[2], len(X), X, *ensemble.kernel_args(), ensemble.value, ensemble.tree_weights,
+                np.empty(len(X))
+            )
+
+        leaves = self.ensemble.apply(X)
+        return self.ensemble.value[leaves] @ self.ensemble.tree_weights
@@ -0,0 +1,409 @@
+# ===== utils/variants.py =====
+# Reduced Random Forest variants for edge deployments, saved as bundles next to the full model
+#
+# Reductions (combinable):
+#   --trees K    greedy forward selection of K trees on a selection CSV
+#   --depth D    trees cut at depth D; a cut node's own class counts (= the sum of
+#                the leaves below it) become the merged leaf distribution
+#   --float16    thresholds stored as float16 (rounded to the nearest float16)
+#   --int8       leaf probabilities stored as 8-bit codes (p * 255)
+#
+# Usage:
+#   python -m utils.variants build weather_models --name edge --trees 30 --depth 8 --float16 --int8 \
+#       --selection selection.csv
+#   WeatherPredictor('weather_models', variant='edge')
+#   python -m utils.variants report weather_models holdout.csv --output variants_report.json
+#
+# CSV columns: time, province, optional temperature / humidity, and the label
+# column (weather_main). Without labels, selection maximizes agreement with the full forest.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from utils.bundle import (BUNDLE_FILENAME, VARIANTS_DIR, ModelBundle, _ensemble_arrays, bundle_is_stale,
+                          export_bundle, variant_path, write_bundle)
+from utils.trees import RandomForestModel, TreeEnsemble
+
+# Figures stated for the full Spark model (app sidebar)
+BASELINE_ACCURACY = 0.9212
+BASELINE_F1 = 0.9195
+
+PROBABILITY_LEVELS = 255
+
+
+def prune_ensemble(ensemble, trees=None, depth=None):
+    """
+    Keep only some trees and / or cut every tree at a maximum depth
+
+    Spark stores class counts on internal nodes too, and they equal the sum
+    of the counts of the leaves below, so a node cut at `depth` simply turns
+    into a leaf carrying its own counts.
+
+    Args:
+        ensemble: TreeEnsemble
+        trees: Tree indices to keep (default: all), kept in their original order
+        depth: Maximum depth (default: unchanged)
+
+    Returns:
+        TreeEnsemble: compacted to the reachable nodes
+    """
+    trees = np.arange(ensemble.num_trees) if trees is None else np.sort(np.asarray(trees, dtype=np.intp))
+    depth = ensemble.max_depth if depth is None else min(depth, ensemble.max_depth)
+
+    index = np.arange(ensemble.num_nodes, dtype=np.intp)
+    is_leaf = ensemble.left == index
+    node_depth = np.full(ensemble.num_nodes, -1)
+    frontier = ensemble.roots[trees].astype(np.intp)
+    for level in range(depth + 1):
+        node_depth[frontier] = level
+        frontier = frontier[~is_leaf[frontier]]
+        frontier = np.concatenate([ensemble.left[frontier], ensemble.right[frontier]])
+
+    keep = node_depth >= 0
+    new_index = np.cumsum(keep) - 1
+    old = index[keep]
+    leaf = (is_leaf | (node_depth == depth))[keep]
+    self_index = np.arange(len(old), dtype=np.intp)
+
+    return TreeEnsemble(
+        feature=np.where(leaf, 0, ensemble.feature[old]).astype(np.intp),
+        threshold=np.where(leaf, np.inf, ensemble.threshold[old]),
+        left=np.where(leaf, self_index, new_index[ensemble.left[old]]).astype(np.intp),
+        right=np.where(leaf, self_index, new_index[ensemble.right[old]]).astype(np.intp),
+        value=np.ascontiguousarray(ensemble.value[old]),
+        roots=new_index[ensemble.roots[trees]].astype(np.intp),
+        tree_weights=ensemble.tree_weights[trees],
+        max_depth=int(depth),
+        cover=None if ensemble.cover is None else ensemble.cover[old]
+    )
+
+
+def select_trees(model, X, target, k):
+    """
+    Greedy forward selection: repeatedly add the tree that maximizes accuracy
+
+    Args:
+        model: RandomForestModel
+        X: Scaled selection features
+        target: Class index per row (labels, or the full forest's predictions)
+        k: Number of trees to keep
+
+    Returns:
+        list of tree indices, in selection order
+    """
+    leaves = model.ensemble.apply(X)
+    # (trees, rows, classes) votes, contiguous per tree
+    votes = model.leaf_probability.astype(np.float32)[np.ascontiguousarray(leaves.T)]
+    total = np.zeros(votes.shape[1:], dtype=np.float32)
+
+    chosen = []
+    remaining = list(range(model.ensemble.num_trees))
+    for _ in range(min(k, len(remaining))):
+        scores = [np.count_nonzero(np.argmax(total + votes[t], axis=1) == target) for t in remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        chosen.append(best)
+        total += votes[best]
+    return chosen
+
+
+def reduce_forest(model, trees=None, depth=None, float16=False, int8=False):
+    """
+    Build a reduced copy of a RandomForestModel
+
+    The reduced ensemble keeps the normalized (or 8-bit) leaf probabilities
+    as its node values; the class counts are not needed for inference.
+
+    Args:
+        model: Full RandomForestModel
+        trees: Tree indices to keep (see select_trees)
+        depth: Depth cap
+        float16: Round the thresholds to float16
+        int8: Store leaf probabilities as round(p * 255) in uint8
+
+    Returns:
+        RandomForestModel
+    """
+    pruned = prune_ensemble(model.ensemble, trees, depth)
+    leaf_probability = RandomForestModel(pruned).leaf_probability
+
+    threshold = pruned.threshold
+    if float16:
+        threshold = threshold.astype(np.float16)
+        if np.count_nonzero(np.isinf(threshold)) != np.count_nonzero(np.isinf(pruned.threshold)):
+            raise ValueError("Thresholds out of float16 range")
+
+    scale = 1.0
+    if int8:
+        leaf_probability = np.rint(leaf_probability * PROBABILITY_LEVELS).astype(np.uint8)
+        scale = 1.0 / PROBABILITY_LEVELS
+
+    ensemble = TreeEnsemble(
+        feature=pruned.feature, threshold=threshold, left=pruned.left, right=pruned.right,
+        value=leaf_probability, roots=pruned.roots, tree_weights=pruned.tree_weights,
+        max_depth=pruned.max_depth, children=pruned.children, cover=pruned.cover
+    )
+    return RandomForestModel(ensemble, leaf_probability, scale)
+
+
+def save_variant(model_path, name, model, spec):
+    """
+    Write <model_path>/variants/<name>.bundle: the full bundle with the forest replaced
+
+    Returns:
+        str: Path of the written bundle
+    """
+    base_path = os.path.join(model_path, BUNDLE_FILENAME)
+    if not os.path.isfile(base_path) or bundle_is_stale(base_path, model_path):
+        export_bundle(model_path, base_path)
+    base = ModelBundle(base_path)
+
+    ensemble = model.ensemble
+    arrays = {key: array for key, array in base.arrays.items() if not key.startswith('rf/')}
+    arrays.update(_ensemble_arrays('rf', ensemble))
+    if spec.get('float16'):
+        arrays['rf/threshold'] = ensemble.threshold.astype(np.float16)  # float32 in memory, exact
+
+    header = {key: value for key, value in base.header.items() if key != 'arrays'}
+    header['variant'] = name
+    header['model_version'] = f"{base.header['model_version']}+{name}"
+    header['rf'] = {
+        'max_depth': ensemble.max_depth,
+        'probability_scale': model.probability_scale,
+        'spec': spec,
+    }
+
+    path = variant_path(model_path, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_bundle(path, header, arrays)
+    return path
+
+
+def list_variants(model_path):
+    directory = os.path.join(model_path, VARIANTS_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len('.bundle')] for name in os.listdir(directory) if name.endswith('.bundle'))
+
+
+def forest_nbytes(model):
+    """Bytes of the arrays the forest keeps in memory (shared arrays counted once)"""
+    ensemble = model.ensemble
+    arrays = (ensemble.feature, ensemble._feature, ensemble.threshold, ensemble.left, ensemble.right,
+              ensemble.children, ensemble.roots, ensemble._roots, ensemble.value, ensemble.tree_weights,
+              model.leaf_probability)
+    return sum({id(array): array.nbytes for array in arrays}.values())
+
+
+def _bundle_forest_nbytes(bundle):
+    """Bytes of the rf/ arrays as stored in a bundle file"""
+    return sum(
+        np.dtype(spec['dtype']).itemsize * int(np.prod(spec['shape']))
+        for key, spec in bundle.header['arrays'].items() if key.startswith('rf/')
+    )
+
+
+def read_labeled_csv(path, label_column='weather_main'):
+    """time / province / temperature / humidity / label columns of a CSV as NumPy arrays"""
+    import pyarrow.csv as pv
+
+    table = pv.read_csv(path, convert_options=pv.ConvertOptions(
+        column_types={'time': 'string', 'province': 'string', label_column: 'string'}
+    ))
+    columns = {}
+    for name in ('time', 'province', 'temperature', 'humidity', label_column):
+        if name in table.column_names:
+            columns[name] = table[name].to_numpy(zero_copy_only=False)
+    return columns
+
+
+def _load_rows(predictor, path, label_column, max_rows=None):
+    """(X, target class index or None) for a CSV; unknown labels map to -1"""
+    columns = read_labeled_csv(path, label_column)
+    if max_rows is not None:
+        columns = {name: values[:max_rows] for name, values in columns.items()}
+
+    X = predictor.feature_matrix(
+        columns['time'], columns['province'], columns.get('temperature'), columns.get('humidity')
+    )
+    labels = columns.get(label_column)
+    if labels is None:
+        return X, None
+    class_index = {name: i for i, name in enumerate(predictor.weather_classes)}
+    return X, np.array([class_index.get(label, -1) for label in labels], dtype=np.intp)
+
+
+def weighted_f1(target, predicted, num_classes):
+    """F1 averaged over classes weighted by support (Spark's MulticlassClassificationEvaluator 'f1')"""
+    f1 = 0.0
+    for c in range(num_classes):
+        support = np.count_nonzero(target == c)
+        if not support:
+            continue
+        true_positive = np.count_nonzero((target == c) & (predicted == c))
+        predicted_count = np.count_nonzero(predicted == c)
+        precision = true_positive / predicted_count if predicted_count else 0.0
+        recall = true_positive / support
+        if precision + recall:
+            f1 += support * 2 * precision * recall / (precision + recall)
+    return f1 / len(target)
+
+
+def _predictor(model_path, variant=None):
+    from utils.predictor import WeatherPredictor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return WeatherPredictor(model_path, cache_size=0, variant=variant)
+
+
+def evaluate(model, X, target, num_classes, repeat=3, single_rows=300):
+    """Accuracy / weighted F1 on (X, target) plus batch throughput and single-row latency"""
+    model.predict_proba(X[:1000])  # warm-up (JIT compile / page-in)
+    batch_seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        probabilities = model.predict_proba(X)
+        batch_seconds = min(batch_seconds, time.perf_counter() - start)
+    predicted = np.argmax(probabilities[:, :num_classes], axis=1)
+
+    latencies = np.empty(min(single_rows, len(X)))
+    for i in range(len(latencies)):
+        start = time.perf_counter()
+        model.predict_proba(X[i:i + 1])
+        latencies[i] = time.perf_counter() - start
+
+    return {
+        'accuracy': float(np.mean(predicted == target)),
+        'f1': weighted_f1(target, predicted, num_classes),
+        'rows_per_second': len(X) / batch_seconds,
+        'single_p50_us': float(np.median(latencies) * 1e6),
+    }
+
+
+def report(model_path, holdout_path, variants=None, label_column='weather_main'):
+    """
+    Accuracy / F1 drop vs the stated baseline next to latency and memory gains
+
+    Returns:
+        dict: baseline figures plus one entry per model ('full' + variants)
+    """
+    from utils import tree_kernels
+
+    full = _predictor(model_path)
+    X, target = _load_rows(full, holdout_path, label_column)
+    if target is None:
+        raise ValueError(f"'{holdout_path}' has no '{label_column}' column")
+    num_classes = len(full.weather_classes)
+
+    models = {'full': (full.rf_model, forest_nbytes(full.rf_model))}
+    for name in variants if variants is not None else list_variants(model_path):
+        predictor = _predictor(model_path, name)
+        models[name] = (predictor.rf_model, _bundle_forest_nbytes(predictor.bundle))
+
+    results = {}
+    for name, (model, disk_bytes) in models.items():
+        result = evaluate(model, X, target, num_classes)
+        result.update({
+            'trees': model.ensemble.num_trees,
+            'max_depth': model.ensemble.max_depth,
+            'nodes': model.ensemble.num_nodes,
+            'memory_mb': forest_nbytes(model) / 1e6,
+            'disk_mb': disk_bytes / 1e6,
+        })
+        results[name] = result
+
+    reference = results['full']
+    for result in results.values():
+        result['accuracy_drop_vs_baseline'] = BASELINE_ACCURACY - result['accuracy']
+        result['f1_drop_vs_baseline'] = BASELINE_F1 - result['f1']
+        result['accuracy_drop_vs_full'] = reference['accuracy'] - result['accuracy']
+        result['speedup'] = result['rows_per_second'] / reference['rows_per_second']
+        result['memory_ratio'] = result['memory_mb'] / reference['memory_mb']
+
+    return {
+        'holdout': holdout_path,
+        'rows': len(X),
+        'backend': tree_kernels.active_backend(),
+        'baseline': {'accuracy': BASELINE_ACCURACY, 'f1': BASELINE_F1},
+        'models': results,
+    }
+
+
+def build(args):
+    predictor = _predictor(args.model_path)
+    model = predictor.rf_model
+    spec = {'trees': args.trees, 'depth': args.depth, 'float16': args.float16, 'int8': args.int8}
+
+    trees = None
+    if args.trees is not None:
+        X, target = _load_rows(predictor, args.selection, args.label_column, args.selection_rows)
+        if target is None:
+            target = model.predict(X)  # agreement with the full forest
+        capped = RandomForestModel(prune_ensemble(model.ensemble, depth=args.depth))
+        trees = select_trees(capped, X, target, args.trees)
+        spec['selected_trees'] = [int(t) for t in trees]
+        spec['selection'] = os.path.basename(args.selection)
+
+    variant = reduce_forest(model, trees, args.depth, args.float16, args.int8)
+    path = save_variant(args.model_path, args.name, variant, spec)
+    print(f"✅ Wrote {path} ({variant.ensemble.num_trees} trees, depth {variant.ensemble.max_depth}, "
+          f"{variant.ensemble.num_nodes} nodes, forest {forest_nbytes(variant) / 1e6:.1f} MB "
+          f"vs {forest_nbytes(model) / 1e6:.1f} MB)")
+
+
+def print_report(args):
+    result = report(args.model_path, args.holdout, args.variants, args.label_column)
+    print(f"Holdout {result['rows']} rows, backend {result['backend']}, "
+          f"stated baseline accuracy {BASELINE_ACCURACY:.2%} / F1 {BASELINE_F1:.4f}")
+    print(f"{'model':12s} {'trees':>5s} {'depth':>5s} {'acc':>7s} {'Δacc':>7s} {'F1':>7s} {'ΔF1':>7s} "
+          f"{'rows/s':>9s} {'x':>5s} {'1-row µs':>8s} {'mem MB':>7s} {'disk MB':>7s}")
+    for name, m in result['models'].items():
+        print(f"{name:12s} {m['trees']:5d} {m['max_depth']:5d} {m['accuracy']:7.2%} "
+              f"{-m['accuracy_drop_vs_baseline']:+7.2%} {m['f1']:7.4f} {-m['f1_drop_vs_baseline']:+7.4f} "
+              f"{m['rows_per_second']:9.0f} {m['speedup']:5.2f} {m['single_p50_us']:8.0f} "
+              f"{m['memory_mb']:7.2f} {m['disk_mb']:7.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Saved {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reduced Random Forest variants')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='Build and save a variant')
+    build_parser.add_argument('model_path', nargs='?', default='weather_models')
+    build_parser.add_argument('--name', required=True)
+    build_parser.add_argument('--trees', type=int, default=None, help='Keep K greedily selected trees')
+    build_parser.add_argument('--depth', type=int, default=None, help='Cut trees at this depth')
+    build_parser.add_argument('--float16', action='store_true', help='float16 thresholds')
+    build_parser.add_argument('--int8', action='store_true', help='8-bit leaf probabilities')
+    build_parser.add_argument('--selection', help='CSV used to select trees (required with --trees)')
+    build_parser.add_argument('--selection-rows', type=int, default=20_000)
+    build_parser.add_argument('--label-column', default='weather_main')
+
+    report_parser = commands.add_parser('report', help='Accuracy vs speed / memory on a held-out CSV')
+    report_parser.add_argument('model_path', nargs='?', default='weather_models')
+    report_parser.add_argument('holdout')
+    report_parser.add_argument('--variants', nargs='+', default=None, help='Default: all saved variants')
+    report_parser.add_argument('--label-column', default='weather_main')
+    report_parser.add_argument('--output', help='Write the report as JSON')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        if args.trees is not None and not args.selection:
+            parser.error('--trees needs --selection')
+        build(args)
+    else:
+        print_report(args)
+
+
+if __name__ == '__main__':
+    main()
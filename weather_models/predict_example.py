@@ -1,32 +1,44 @@
 
 # ===== WEATHER PREDICTION EXAMPLE =====
 # File này hướng dẫn cách sử dụng models đã train
+# (Không cần Spark: xem WeatherPredictor trong utils/predictor.py)
 
-from pyspark.sql import SparkSession
-from pyspark.ml.classification import RandomForestClassificationModel
-from pyspark.ml.regression import GBTRegressionModel
-from pyspark.ml.feature import StandardScalerModel, StringIndexerModel, VectorAssembler
-import pandas as pd
 import json
 
-# 1. Khởi tạo Spark
-spark = SparkSession.builder.appName("WeatherPrediction").getOrCreate()
+spark = None
+metadata = weather_classes = features = None
+rf_model = province_indexer = city_indexer = scaler = None
+province_stats = None
 
-# 2. Load metadata
-with open('weather_models/metadata.json') as f:
-    metadata = json.load(f)
 
-weather_classes = metadata['classes']['weather_classes']
-features = metadata['features']['all_features']
-
-# 3. Load models
-rf_model = RandomForestClassificationModel.load("weather_models/rf_classifier")
-province_indexer = StringIndexerModel.load("weather_models/province_indexer")
-city_indexer = StringIndexerModel.load("weather_models/city_indexer")
-scaler = StandardScalerModel.load("weather_models/scaler")
-
-# 4. Load province statistics
-province_stats = pd.read_csv('weather_models/province_stats.csv')
+def init(model_dir='weather_models'):
+    """Khởi tạo Spark và load models (không chạy khi chỉ import file này)"""
+    global spark, metadata, weather_classes, features
+    global rf_model, province_indexer, city_indexer, scaler, province_stats
+    
+    from pyspark.sql import SparkSession
+    from pyspark.ml.classification import RandomForestClassificationModel
+    from pyspark.ml.feature import StandardScalerModel, StringIndexerModel
+    import pandas as pd
+    
+    # 1. Khởi tạo Spark
+    spark = SparkSession.builder.appName("WeatherPrediction").getOrCreate()
+    
+    # 2. Load metadata
+    with open(f'{model_dir}/metadata.json') as f:
+        metadata = json.load(f)
+    
+    weather_classes = metadata['classes']['weather_classes']
+    features = metadata['features']['all_features']
+    
+    # 3. Load models
+    rf_model = RandomForestClassificationModel.load(f"{model_dir}/rf_classifier")
+    province_indexer = StringIndexerModel.load(f"{model_dir}/province_indexer")
+    city_indexer = StringIndexerModel.load(f"{model_dir}/city_indexer")
+    scaler = StandardScalerModel.load(f"{model_dir}/scaler")
+    
+    # 4. Load province statistics
+    province_stats = pd.read_csv(f'{model_dir}/province_stats.csv')
 
 # ===== FUNCTION DỰ ĐOÁN =====
 def predict_weather(time_str, province_str, current_temp=None, current_humidity=None):
@@ -47,6 +59,11 @@ def predict_weather(time_str, province_str, current_temp=None, current_humidity=
         }
     """
     
+    from pyspark.ml.feature import VectorAssembler
+    
+    if spark is None:
+        init()
+    
     # Parse time
     from datetime import datetime
     dt = datetime.strptime(time_str, "%m/%d/%Y %H:%M")